@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+"""
+Benchmark database write throughput under parallel uploads.
+
+Each simulated upload runs the database half of `views.upload`: the patient
+upsert, the analysis text lookup and the detection INSERT with its stats
+rollup update. Model inference and PDF rendering are left out so the
+numbers show only the database.
+
+On SQLite (the default) every journal mode is run against a fresh
+throw-away database file. With DB_ENGINE=postgresql a temporary test
+database is created on the configured server and dropped afterwards.
+
+Usage:
+    python bench_concurrent_uploads.py
+    python bench_concurrent_uploads.py --uploads 5000 --threads 1 4 16
+    python bench_concurrent_uploads.py --modes delete wal
+    DB_ENGINE=postgresql DB_NAME=eye_detect_db python bench_concurrent_uploads.py
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+
+parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+parser.add_argument('--uploads', type=int, default=2000,
+                    help='Uploads per run, split across the threads (default 2000).')
+parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 8, 16])
+parser.add_argument('--patients', type=int, default=200,
+                    help='Distinct patient names the uploads are drawn from.')
+parser.add_argument('--modes', nargs='+', default=['delete', 'wal'],
+                    help='SQLite journal modes to compare (ignored on PostgreSQL).')
+args = parser.parse_args()
+
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import OperationalError, connection, connections, transaction
+
+from detection.models import AnalysisText, Detection, Patient
+from utils.ai_analyzer import FALLBACK_DATA, to_list
+
+DISEASES = list(FALLBACK_DATA)
+SEVERITIES = ['MILD', 'MODERATE', 'SEVERE']
+
+
+def upload(rng):
+    disease = rng.choice(DISEASES)
+    fb = FALLBACK_DATA[disease]
+    patient, _ = Patient.upsert(f'Bench Patient {rng.randrange(args.patients)}', age=40)
+    det = Detection(
+        patient=patient,
+        image='uploads/bench.jpg',
+        predicted_disease=disease,
+        confidence_score=80.0,
+        severity=rng.choice(SEVERITIES),
+        analysis=AnalysisText.intern(
+            english_explanation=fb['english'],
+            tamil_explanation=fb['tamil'],
+            symptoms=to_list(fb['symptoms']),
+            causes=to_list(fb['causes']),
+            treatment=to_list(fb['treatment']),
+            prevention=to_list(fb['prevention']),
+        ),
+        all_probabilities={disease: 80.0},
+        report_pdf='reports/bench.pdf',
+    )
+    with transaction.atomic():
+        det.save()
+
+
+def worker(count, seed, errors):
+    rng = random.Random(seed)
+    try:
+        for _ in range(count):
+            try:
+                upload(rng)
+            except OperationalError:
+                # "database is locked" once the SQLite busy timeout runs out
+                errors.append(1)
+    finally:
+        connections.close_all()
+
+
+def run(threads):
+    per_thread = [args.uploads // threads + (1 if i < args.uploads % threads else 0)
+                  for i in range(threads)]
+    errors = []
+    workers = [threading.Thread(target=worker, args=(n, i, errors))
+               for i, n in enumerate(per_thread)]
+    t0 = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - t0
+    return elapsed, len(errors)
+
+
+def reset_tables():
+    Detection.objects.all().delete()
+    Patient.objects.all().delete()
+
+
+def report(label):
+    print(f"\n[{label}]")
+    print(f"    {'threads':>7}  {'seconds':>8}  {'uploads/s':>10}  {'errors':>6}")
+    for threads in args.threads:
+        reset_tables()
+        elapsed, errors = run(threads)
+        ok = args.uploads - errors
+        print(f"    {threads:7d}  {elapsed:8.2f}  {ok / elapsed:10.1f}  {errors:6d}")
+
+
+print("\n" + "="*70)
+print(f"CONCURRENT UPLOAD WRITE BENCHMARK — {args.uploads:,} uploads per run")
+print("="*70)
+
+if connection.vendor == 'postgresql':
+    db = settings.DATABASES['default']
+    print(f"\nPostgreSQL {db['HOST']}:{db['PORT']}  CONN_MAX_AGE={db['CONN_MAX_AGE']}")
+    test_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        report(f'postgresql ({test_name})')
+    finally:
+        connections.close_all()
+        connection.creation.destroy_test_db(test_name, verbosity=0)
+else:
+    tmpdir = tempfile.mkdtemp(prefix='eyedetect_bench_')
+    print(f"\nSQLite busy timeout {settings.DATABASES['default']['OPTIONS']['timeout']}s, "
+          f"synchronous={settings.SQLITE_SYNCHRONOUS}")
+    for mode in args.modes:
+        # Fresh database file per journal mode; pragmas apply on connect
+        connections.close_all()
+        settings.SQLITE_JOURNAL_MODE = mode
+        settings.DATABASES['default']['NAME'] = os.path.join(tmpdir, f'bench_{mode}.sqlite3')
+        call_command('migrate', verbosity=0)
+        report(f'sqlite journal_mode={mode}')
+    connections.close_all()
+    for name in os.listdir(tmpdir):
+        os.remove(os.path.join(tmpdir, name))
+    os.rmdir(tmpdir)
+
+print("\n" + "="*70 + "\n")
+sys.exit(0)
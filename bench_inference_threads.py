@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+"""
+Benchmark prediction throughput and tail latency for workers × TF threads.
+
+For each combination, starts that many processes standing in for gunicorn
+workers, with TF_INTRA_OP_THREADS set to the thread count. Each process
+loads the model, then keeps --clients threads predicting until it has made
+--requests predictions. All processes start at the same moment. The table
+shows total throughput and p50/p95/p99 latency. Pick the row with the best
+throughput whose p95 you can live with; it is usually near
+workers × threads = cores.
+
+Without TensorFlow the predictor runs in demo mode and only image decoding
+is timed; install TensorFlow and place the model in ml_models/ for real
+numbers.
+
+Usage:
+    python bench_inference_threads.py
+    python bench_inference_threads.py --workers 1 2 4 8 --threads 1 2 4 --requests 100
+    TF_ENABLE_ONEDNN=False python bench_inference_threads.py --inter-threads 1
+"""
+import argparse
+import multiprocessing as mp
+import os
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+
+
+def web_worker(threads, inter_threads, clients, requests, image_path, ready, start, results):
+    """Child process: load the model, wait for the start signal, predict."""
+    os.environ.update(
+        INFERENCE_SOCKET='',
+        TF_INTRA_OP_THREADS=str(threads),
+        TF_INTER_OP_THREADS=str(inter_threads),
+        INFERENCE_CONCURRENCY=str(clients),
+    )
+    import django
+    django.setup()
+    from utils.predictor import predictor
+
+    predictor.wait_ready(timeout=600)
+    ready.put(predictor.status()['mode'])
+    start.wait()
+
+    latencies = []
+    remaining = [requests]
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            t0 = time.perf_counter()
+            predictor.predict(image_path)
+            latencies.append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=client) for _ in range(clients)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    results.put(latencies)
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def run(workers, threads, args, image_path):
+    ctx = mp.get_context('spawn')
+    ready, results, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    procs = [
+        ctx.Process(target=web_worker, args=(
+            threads, args.inter_threads, args.clients, args.requests,
+            image_path, ready, start, results,
+        ))
+        for _ in range(workers)
+    ]
+    try:
+        for p in procs:
+            p.start()
+        modes = {ready.get(timeout=600) for _ in procs}
+
+        t0 = time.perf_counter()
+        start.set()
+        latencies = []
+        for _ in procs:
+            latencies.extend(results.get(timeout=3600))
+        wall = time.perf_counter() - t0
+    finally:
+        for p in procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+    return modes, len(latencies) / wall, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4],
+                        help='TF_INTRA_OP_THREADS values to try (0 = TF default).')
+    parser.add_argument('--inter-threads', type=int, default=0,
+                        help='TF_INTER_OP_THREADS for every run (default 0 = TF default).')
+    parser.add_argument('--clients', type=int, default=1,
+                        help='Concurrent requests per worker (also INFERENCE_CONCURRENCY).')
+    parser.add_argument('--requests', type=int, default=50,
+                        help='Predictions per worker (default 50).')
+    args = parser.parse_args()
+
+    from PIL import Image
+
+    tmpdir = tempfile.mkdtemp(prefix='eyedetect_threads_')
+    image_path = os.path.join(tmpdir, 'eye_224.png')
+    Image.new('RGB', (224, 224), color=(180, 60, 60)).save(image_path)
+
+    print("\n" + "="*70)
+    print(f"INFERENCE THREADING BENCHMARK ({os.cpu_count()} CPU cores, "
+          f"{args.clients} client(s) × {args.requests} request(s) per worker)")
+    print("="*70)
+    print(f"{'workers':>7s} {'threads':>7s} {'w×t':>5s} {'pred/s':>9s} "
+          f"{'p50 ms':>8s} {'p95 ms':>8s} {'p99 ms':>8s}")
+
+    try:
+        seen_modes = set()
+        for workers in args.workers:
+            for threads in args.threads:
+                modes, throughput, latencies = run(workers, threads, args, image_path)
+                seen_modes |= modes
+                ms = [v * 1000 for v in latencies]
+                print(f"{workers:7d} {threads:7d} {workers * threads:5d} {throughput:9.1f} "
+                      f"{percentile(ms, 50):8.1f} {percentile(ms, 95):8.1f} {percentile(ms, 99):8.1f}")
+    finally:
+        os.remove(image_path)
+        os.rmdir(tmpdir)
+
+    print("="*70)
+    if seen_modes != {'model'}:
+        print("[WARNING] Predictor ran in demo mode; only preprocessing was timed.")
+    print()
+
+
+if __name__ == '__main__':
+    main()
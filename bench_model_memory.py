@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+"""
+Benchmark memory used by the model across web worker counts.
+
+For each worker count, starts that many processes standing in for gunicorn
+workers. Each one sets up Django, imports the views and makes one
+prediction. Two modes are compared:
+
+  in-process  every worker loads its own model (INFERENCE_SOCKET unset)
+  worker      one `run_inference_worker` process holds the model and the
+              workers forward predictions to it over a Unix socket
+
+Memory is the summed PSS of all processes (shared pages are split between
+the processes that map them), read from /proc, so Linux only. Without
+TensorFlow the predictor runs in demo mode and the gap shows only the
+Python side; install TensorFlow and place the model in ml_models/ for real
+numbers.
+
+Usage:
+    python bench_model_memory.py
+    python bench_model_memory.py --workers 1 2 4 8 --modes worker
+"""
+import argparse
+import multiprocessing as mp
+import os
+import secrets
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+# run_inference_worker refuses the insecure default key
+os.environ.setdefault('SECRET_KEY', secrets.token_urlsafe(50))
+
+
+def web_worker(socket_path, image_path, ready, stop):
+    """Child process: what one gunicorn worker does before serving."""
+    os.environ['INFERENCE_SOCKET'] = socket_path
+    import django
+    django.setup()
+    import detection.views  # noqa: F401
+    from utils.predictor import predictor
+
+    predictor.wait_ready(timeout=600)
+    predictor.predict(image_path)
+    ready.put(os.getpid())
+    stop.wait()
+
+
+def memory_kb(pid):
+    """PSS of a process in kB (RSS on kernels without smaps_rollup)."""
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                if line.startswith('Pss:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    with open(f'/proc/{pid}/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+def start_inference_worker(socket_path):
+    env = dict(os.environ, INFERENCE_SOCKET=socket_path)
+    proc = subprocess.Popen(
+        [sys.executable, 'manage.py', 'run_inference_worker'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 30
+    while not os.path.exists(socket_path):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            raise SystemExit('[ERROR] Inference worker did not start')
+        time.sleep(0.1)
+    return proc
+
+
+def run(mode, workers, tmpdir, image_path):
+    socket_path = os.path.join(tmpdir, 'inference.sock') if mode == 'worker' else ''
+    server = start_inference_worker(socket_path) if socket_path else None
+
+    ctx = mp.get_context('spawn')
+    ready, stop = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=web_worker, args=(socket_path, image_path, ready, stop))
+             for _ in range(workers)]
+    try:
+        t0 = time.perf_counter()
+        for p in procs:
+            p.start()
+        pids = [ready.get(timeout=600) for _ in procs]
+        startup = time.perf_counter() - t0
+
+        worker_kb = sum(memory_kb(pid) for pid in pids)
+        server_kb = memory_kb(server.pid) if server else 0
+        return startup, worker_kb, server_kb
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=10)
+            if p.is_alive():
+                p.terminate()
+        if server:
+            server.terminate()
+            server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--modes', nargs='+', default=['in-process', 'worker'],
+                        choices=['in-process', 'worker'])
+    args = parser.parse_args()
+
+    if not os.path.exists('/proc/self/status'):
+        raise SystemExit('[ERROR] This benchmark reads /proc and needs Linux.')
+
+    from PIL import Image
+
+    tmpdir = tempfile.mkdtemp(prefix='eyedetect_mem_')
+    image_path = os.path.join(tmpdir, 'eye_224.png')
+    Image.new('RGB', (224, 224), color=(180, 60, 60)).save(image_path)
+
+    print("\n" + "="*70)
+    print("MODEL MEMORY BENCHMARK (summed PSS)")
+    print("="*70)
+    print(f"{'mode':12s} {'workers':>7s} {'web MB':>9s} {'model MB':>9s} "
+          f"{'total MB':>9s} {'per wkr':>8s} {'startup':>8s}")
+
+    try:
+        for mode in args.modes:
+            for n in args.workers:
+                startup, worker_kb, server_kb = run(mode, n, tmpdir, image_path)
+                total = (worker_kb + server_kb) / 1024
+                print(f"{mode:12s} {n:7d} {worker_kb / 1024:9.1f} {server_kb / 1024:9.1f} "
+                      f"{total:9.1f} {total / n:8.1f} {startup:7.1f}s")
+    finally:
+        for name in os.listdir(tmpdir):
+            os.remove(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+
+    print("="*70 + "\n")
+
+
+if __name__ == '__main__':
+    main()
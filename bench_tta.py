@@ -0,0 +1,96 @@
+#!/usr/bin/env python
+"""
+Benchmark the latency cost of test-time augmentation (TTA_VIEWS).
+
+For each view count, times building the augmented batch (utils/tta.py),
+the single batched forward pass, and a full predictor.predict() call,
+and shows the added latency per extra view relative to one view. Use it
+to pick TTA_VIEWS / WEBCAM_TTA_VIEWS for the hardware you deploy on.
+
+Without TensorFlow the predictor runs in demo mode and only view
+generation is timed; install TensorFlow and place the model in
+ml_models/ for real numbers.
+
+Usage:
+    python bench_tta.py
+    python bench_tta.py --views 1 2 4 8 --repeat 50
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+os.environ['INFERENCE_SOCKET'] = ''
+
+
+def median_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    import django
+    django.setup()
+    import numpy as np
+    from PIL import Image
+
+    from utils.predictor import predictor
+    from utils.tta import MAX_VIEWS, make_views
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--views', type=int, nargs='+', default=list(range(1, MAX_VIEWS + 1)))
+    parser.add_argument('--repeat', type=int, default=20, help='Timed runs per view count.')
+    args = parser.parse_args()
+
+    predictor.wait_ready(timeout=600)
+    model, meta = predictor._current
+    size = meta['input_size']
+
+    tmpdir = tempfile.mkdtemp(prefix='eyedetect_tta_')
+    image_path = os.path.join(tmpdir, f'eye_{size}.png')
+    Image.new('RGB', (size, size), color=(180, 60, 60)).save(image_path)
+    arr = np.random.default_rng(0).random((size, size, 3), dtype=np.float32)
+
+    print("\n" + "="*70)
+    print(f"TTA BENCHMARK ({size}×{size} input, median of {args.repeat} runs)")
+    print("="*70)
+    print(f"{'views':>5s} {'views ms':>9s} {'forward ms':>11s} {'predict ms':>11s} {'+ms/view':>9s}")
+
+    try:
+        base = None
+        for views in sorted({max(1, min(v, MAX_VIEWS)) for v in args.views}):
+            gen_ms = median_ms(lambda: make_views(arr, views), args.repeat)
+            forward_ms = None
+            if model is not None:
+                batch = make_views(arr, views)
+                model.predict(batch, batch_size=views, verbose=0)  # trace this batch size
+                forward_ms = median_ms(
+                    lambda: model.predict(batch, batch_size=views, verbose=0), args.repeat
+                )
+            predict_ms = median_ms(lambda: predictor.predict(image_path, tta_views=views), args.repeat)
+            if base is None:
+                base = predict_ms
+            if model is None:
+                forward, per_view = f"{'-':>11s}", f"{'-':>9s}"
+            else:
+                forward = f"{forward_ms:11.2f}"
+                per_view = f"{(predict_ms - base) / (views - 1) if views > 1 else 0.0:9.2f}"
+            print(f"{views:5d} {gen_ms:9.2f} {forward} {predict_ms:11.2f} {per_view}")
+    finally:
+        os.remove(image_path)
+        os.rmdir(tmpdir)
+
+    print("="*70)
+    if model is None:
+        print("[WARNING] Predictor ran in demo mode; only view generation was timed.")
+    print()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Patient, Detection, ChatMessage
+from .models import Patient, Detection, ChatMessage, AnalysisText, StoredImage, ShadowPrediction
 
 
 @admin.register(Patient)
@@ -13,10 +13,37 @@ class PatientAdmin(admin.ModelAdmin):
 @admin.register(Detection)
 class DetectionAdmin(admin.ModelAdmin):
     list_display = ['detection_id', 'patient', 'predicted_disease',
-                    'confidence_score', 'severity', 'detection_date']
+                    'confidence_score', 'severity', 'model_version', 'detection_date']
     search_fields = ['detection_id', 'patient__name', 'predicted_disease']
-    list_filter = ['predicted_disease', 'severity', 'detection_date']
+    list_filter = ['predicted_disease', 'severity', 'model_version', 'detection_date']
     readonly_fields = ['detection_id', 'detection_date']
+    raw_id_fields = ['analysis']
+
+
+@admin.register(AnalysisText)
+class AnalysisTextAdmin(admin.ModelAdmin):
+    """
+    View-only: rows are addressed by content_hash and shared by every
+    detection with the same text, so an edit would leave the hash stale and
+    rewrite other detections' results.
+    """
+    list_display = ['content_hash', 'english_explanation', 'created_at']
+    search_fields = ['content_hash', 'english_explanation']
+    readonly_fields = ['content_hash', 'created_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StoredImage)
+class StoredImageAdmin(admin.ModelAdmin):
+    list_display = ['name', 'size', 'ref_count', 'updated_at']
+    list_filter = ['updated_at']
+    search_fields = ['sha256', 'name']
+    readonly_fields = ['sha256', 'name', 'size', 'ref_count', 'created_at', 'updated_at']
 
 
 @admin.register(ChatMessage)
@@ -24,3 +51,11 @@ class ChatMessageAdmin(admin.ModelAdmin):
     list_display = ['session_id', 'language', 'message', 'timestamp']
     list_filter = ['language', 'timestamp']
     search_fields = ['session_id', 'message']
+
+
+@admin.register(ShadowPrediction)
+class ShadowPredictionAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'primary_version', 'primary_disease', 'shadow_version',
+                    'shadow_disease', 'agree', 'primary_ms', 'shadow_ms']
+    list_filter = ['agree', 'shadow_version', 'created_at']
+    search_fields = ['image_digest']
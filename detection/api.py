@@ -0,0 +1,151 @@
+"""
+Read-only JSON API for history and dashboard data.
+
+Responses carry an ETag derived from the newest detection timestamp or
+detection/patient edit (updated_at), plus the detection count so deletes
+are noticed, and a short Cache-Control max-age. Pollers that send
+If-None-Match get a 304 without the list or stats being queried. There is
+no Last-Modified: a delete leaves the newest timestamp unchanged, so
+If-Modified-Since alone would be answered with stale data.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.db.models import Max
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+
+from . import stats
+from .models import Detection, Patient
+from .queries import HISTORY_FIELDS, filter_detections, keyset_page
+from .serializers import DetectionSerializer, PatientSerializer
+
+API_FIELDS = HISTORY_FIELDS + ('patient__patient_id', 'all_probabilities', 'model_version')
+
+
+# ── Validators ──────────────────────────────────────────────────────────────
+
+def _latest(detections, patients):
+    """
+    Newest change among `detections` and `patients`: a new detection
+    (detection_date) or an edit to either (updated_at). Each Max is
+    served by its own index.
+    """
+    values = [
+        detections.aggregate(v=Max('detection_date'))['v'],
+        detections.aggregate(v=Max('updated_at'))['v'],
+        patients.aggregate(v=Max('updated_at'))['v'],
+    ]
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def _etag(*parts):
+    return hashlib.md5('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def detections_etag(request, *args, **kwargs):
+    latest = _latest(Detection.objects.order_by(), Patient.objects.order_by())
+    return _etag(latest, stats.total_detections())
+
+
+def stats_etag(request, *args, **kwargs):
+    # The trend window moves at local midnight even when no data changes
+    return _etag(detections_etag(request), timezone.localdate())
+
+
+def timeline_etag(request, patient_id):
+    qs = Detection.objects.order_by().filter(patient__patient_id=patient_id)
+    latest = _latest(qs, Patient.objects.order_by().filter(patient_id=patient_id))
+    return _etag(patient_id, latest, qs.count())
+
+
+def _per_page(request):
+    try:
+        return min(max(int(request.GET.get('per_page', settings.HISTORY_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        return settings.HISTORY_PAGE_SIZE
+
+
+def _page_link(request, key, cursor):
+    if not cursor:
+        return None
+    params = request.GET.copy()
+    params.pop('before', None)
+    params.pop('after', None)
+    params[key] = cursor
+    return request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+
+
+def _page_response(request, qs):
+    page = keyset_page(
+        qs,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+        size=_per_page(request),
+    )
+    return Response({
+        'results': DetectionSerializer(page['items'], many=True).data,
+        'next': _page_link(request, 'before', page['next_cursor']),
+        'previous': _page_link(request, 'after', page['prev_cursor']),
+    })
+
+
+# ── Endpoints ──────────────────────────────────────────────────────────────
+
+@cache_control(private=True, max_age=settings.API_CACHE_MAX_AGE, must_revalidate=True)
+@condition(etag_func=detections_etag)
+@api_view(['GET'])
+def detection_list(request):
+    """Detections, newest first. Same filters and cursors as the history page."""
+    qs = filter_detections(
+        request.query_params,
+        Detection.objects.select_related('patient').only(*API_FIELDS),
+    )
+    return _page_response(request, qs)
+
+
+@cache_control(private=True, max_age=settings.API_CACHE_MAX_AGE, must_revalidate=True)
+@condition(etag_func=timeline_etag)
+@api_view(['GET'])
+def patient_timeline(request, patient_id):
+    """One patient's details and detections, newest first."""
+    patient = get_object_or_404(Patient, patient_id=patient_id)
+    qs = filter_detections(
+        request.query_params,
+        patient.detections.select_related('patient').only(*API_FIELDS),
+    )
+    response = _page_response(request, qs)
+    response.data['patient'] = PatientSerializer(patient).data
+    return response
+
+
+@cache_control(private=True, max_age=settings.API_CACHE_MAX_AGE, must_revalidate=True)
+@condition(etag_func=stats_etag)
+@api_view(['GET'])
+def stats_summary(request):
+    """Totals, disease/severity distributions and the detection trend."""
+    granularity = request.query_params.get('granularity', settings.DASHBOARD_TREND_GRANULARITY)
+    if granularity not in stats.TREND_GRANULARITIES:
+        granularity = settings.DASHBOARD_TREND_GRANULARITY
+    try:
+        days = min(max(int(request.query_params.get('range', settings.DASHBOARD_TREND_DAYS)), 1), 3650)
+    except ValueError:
+        days = settings.DASHBOARD_TREND_DAYS
+
+    return Response({
+        'total_detections': stats.total_detections(),
+        'total_patients': Patient.objects.count(),
+        'disease_distribution': stats.disease_distribution(),
+        'severity_distribution': stats.severity_distribution(),
+        'trend': {
+            'range_days': days,
+            'granularity': granularity,
+            'counts': stats.detection_trend(days, granularity),
+        },
+    })
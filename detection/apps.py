@@ -1,7 +1,33 @@
+import os
+import sys
+
 from django.apps import AppConfig
+from django.conf import settings
+
+
+# Set by the WSGI entry point (eye_detection/wsgi.py); export it for any
+# other server entry that should preload the model
+SERVER_ENV = 'EYEDETECT_SERVER'
+
+
+def _serves_requests():
+    """True in web server processes, not in scripts, tests or other commands."""
+    if os.environ.get(SERVER_ENV) == '1':
+        return True
+    if sys.argv[1:2] != ['runserver']:
+        return False
+    # The autoreloader's parent process only watches files
+    return os.environ.get('RUN_MAIN') == 'true' or '--noreload' in sys.argv
 
 
 class DetectionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'detection'
     verbose_name = 'Eye Disease Detection'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        if settings.MODEL_PRELOAD and _serves_requests():
+            from utils.predictor import predictor
+            predictor.start_loading()
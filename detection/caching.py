@@ -0,0 +1,43 @@
+"""
+Page cache helpers.
+
+Rendered result pages are cached per detection_id, and the home/dashboard
+template fragments are keyed by a "stats version" counter. Signal handlers
+in detection/signals.py delete result pages and bump the version whenever a
+Detection, Patient or AnalysisText changes, so cached HTML never outlives
+the data.
+
+With the default per-process LocMemCache each worker keeps its own copy and
+only the worker that saved a change sees the invalidation, so pages are
+kept for seconds rather than a day (RESULT_CACHE_TIMEOUT /
+STATS_CACHE_TIMEOUT). Set REDIS_URL to share one cache, and one
+invalidation, across workers.
+"""
+
+from django.core.cache import cache
+
+STATS_VERSION_KEY = 'stats:version'
+
+
+def stats_version():
+    version = cache.get(STATS_VERSION_KEY)
+    if version is None:
+        cache.add(STATS_VERSION_KEY, 1, None)
+        version = cache.get(STATS_VERSION_KEY, 1)
+    return version
+
+
+def bump_stats_version():
+    try:
+        cache.incr(STATS_VERSION_KEY)
+    except ValueError:
+        # Key missing (evicted or first write) — start a new version series
+        cache.set(STATS_VERSION_KEY, 1, None)
+
+
+def result_cache_key(detection_id):
+    return f'page:result:{detection_id}'
+
+
+def invalidate_results(detection_ids):
+    cache.delete_many([result_cache_key(d) for d in detection_ids])
@@ -0,0 +1,144 @@
+"""
+Image ingest — the one place an uploaded original is decoded.
+
+Each upload or webcam frame is:
+  1. checked by its magic bytes (JPEG / PNG / WEBP), not the client's
+     content_type, and against the byte and pixel caps
+  2. decoded once (JPEGs at reduced scale via draft mode), rotated upright
+     from its EXIF orientation and downsampled to IMAGE_ARCHIVE_MAX_SIDE
+  3. re-encoded as JPEG without EXIF/GPS metadata and stored by content hash
+  4. resized to the input size of the active model version and stored next
+     to it as a lossless PNG (…/<sha256>_224.png) for the predictor; after
+     a switch to a model with another input size, the new derivative is
+     built from the stored JPEG on first use
+
+Large uploads arrive as temp files (FILE_UPLOAD_MAX_MEMORY_SIZE), so the
+original is never held in memory as a whole, nor kept on disk afterwards.
+"""
+
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .storage import digest_from_name, image_storage
+
+# (magic prefix, offset) → format
+MAGIC_BYTES = [
+    (b'\xff\xd8\xff', 0, 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 0, 'PNG'),
+    (b'WEBP', 8, 'WEBP'),  # after the RIFF header
+]
+
+
+class InvalidImage(ValueError):
+    """Raised for uploads that are not a supported, decodable image."""
+
+
+def sniff_format(head):
+    for magic, offset, fmt in MAGIC_BYTES:
+        if head[offset:offset + len(magic)] == magic:
+            if fmt == 'WEBP' and not head.startswith(b'RIFF'):
+                continue
+            return fmt
+    return None
+
+
+def model_input_size():
+    """Input size of the active registry version (MODEL_INPUT_SIZE if unreadable)."""
+    from utils import model_registry
+    try:
+        return int(model_registry.resolve_active().get('input_size') or settings.MODEL_INPUT_SIZE)
+    except (model_registry.RegistryError, TypeError, ValueError):
+        return settings.MODEL_INPUT_SIZE
+
+
+def derivative_name(name, size=None):
+    """Name of the model-ready derivative stored alongside an image."""
+    root, _ = os.path.splitext(str(name))
+    return f'{root}_{size or model_input_size()}.png'
+
+
+def derivative_path(name, size=None):
+    return image_storage.path(derivative_name(name, size))
+
+
+def _save_derivative(img, model_name, size):
+    buf = io.BytesIO()
+    img.resize((size, size), Image.Resampling.LANCZOS).save(buf, 'PNG')
+    image_storage.save_derivative(model_name, ContentFile(buf.getvalue()))
+
+
+def ensure_derivative(name, size=None):
+    """
+    Path of the model-ready derivative of a stored image, building it
+    from the archival JPEG if this input size has none yet.
+    """
+    size = size or model_input_size()
+    model_name = derivative_name(name, size)
+    if not image_storage.exists(model_name):
+        with image_storage.open(name) as f, Image.open(f) as img:
+            _save_derivative(img.convert('RGB'), model_name, size)
+    return image_storage.path(model_name)
+
+
+def _open_upload(uploaded):
+    if uploaded.size and uploaded.size > settings.IMAGE_UPLOAD_MAX_BYTES:
+        limit_mb = settings.IMAGE_UPLOAD_MAX_BYTES // (1024 * 1024)
+        raise InvalidImage(f'Image is too large (max {limit_mb} MB).')
+
+    uploaded.seek(0)
+    head = uploaded.read(16)
+    uploaded.seek(0)
+    fmt = sniff_format(head)
+    if fmt is None:
+        raise InvalidImage('Invalid file type. Please upload JPG, PNG, or WEBP.')
+
+    try:
+        img = Image.open(uploaded)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise InvalidImage('The image file could not be read.') from e
+    if img.format != fmt:
+        raise InvalidImage('Invalid file type. Please upload JPG, PNG, or WEBP.')
+    if img.width * img.height > settings.IMAGE_MAX_PIXELS:
+        raise InvalidImage('Image dimensions are too large.')
+    return img
+
+
+def ingest_image(uploaded):
+    """
+    Validate, normalize and store an uploaded image.
+    Returns (name, digest) of the stored archival JPEG; the model-ready
+    derivative is at ensure_derivative(name). Raises InvalidImage.
+    """
+    img = _open_upload(uploaded)
+    max_side = settings.IMAGE_ARCHIVE_MAX_SIDE
+    try:
+        if img.format == 'JPEG':
+            # Let the decoder skip detail we would throw away (1/2 … 1/8 scale)
+            img.draft('RGB', (max_side, max_side))
+        img = ImageOps.exif_transpose(img)
+        if img.mode in ('RGBA', 'LA', 'P'):
+            img = img.convert('RGBA')
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.split()[-1])
+            img = background
+        else:
+            img = img.convert('RGB')
+        img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    except (OSError, ValueError) as e:
+        raise InvalidImage('The image file could not be read.') from e
+
+    # Re-encoding without exif= drops EXIF/GPS metadata
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=settings.IMAGE_ARCHIVE_QUALITY, optimize=True)
+    name = image_storage.save('image.jpg', ContentFile(buf.getvalue()))
+
+    size = model_input_size()
+    model_name = derivative_name(name, size)
+    if not image_storage.exists(model_name):
+        _save_derivative(img, model_name, size)
+
+    return name, digest_from_name(name)
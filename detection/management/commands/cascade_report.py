@@ -0,0 +1,156 @@
+"""
+Evaluate cascade mode: a cheap triage model in front of the active model.
+
+Scores every image of a labeled folder (dataset/test/<class>/...) with both
+the triage model (`model_registry triage <version>`) and the active model,
+then, for each pair of thresholds, shows how many images would escalate,
+the accuracy of the cascade against the active model alone, how many
+diseased eyes the triage model would have passed as normal, and the
+throughput gain. With --days it also shows the share of live detections
+the triage model answered.
+
+Usage:
+    python manage.py cascade_report --data dataset/test
+    python manage.py cascade_report --data dataset/test --thresholds 0.8 0.9 0.95 --max-disease 0.05 0.1
+    python manage.py cascade_report --days 7
+"""
+
+import os
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from detection.models import Detection
+from utils import model_registry
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+class Command(BaseCommand):
+    help = 'Report escalation rate, accuracy delta and throughput gain of cascade mode.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--data', default=None,
+                            help='Labeled folder with one subfolder per class.')
+        parser.add_argument('--limit', type=int, default=0,
+                            help='Images per class (default: all).')
+        parser.add_argument('--thresholds', type=float, nargs='+', default=None,
+                            help='CASCADE_NORMAL_THRESHOLD values to try (default: current).')
+        parser.add_argument('--max-disease', type=float, nargs='+', default=None,
+                            help='CASCADE_MAX_DISEASE_PROB values to try (default: current).')
+        parser.add_argument('--days', type=int, default=0,
+                            help='Also summarize live detections from the last N days.')
+
+    def handle(self, *args, **opts):
+        if not opts['data'] and not opts['days']:
+            raise CommandError('Give --data for an offline evaluation and/or --days for live traffic.')
+        self.stdout.write("\n" + "=" * 70)
+        self.stdout.write("CASCADE REPORT")
+        self.stdout.write("=" * 70)
+        if opts['data']:
+            self.offline(opts)
+        if opts['days']:
+            self.live(opts['days'])
+        self.stdout.write("")
+
+    def _images(self, root, limit):
+        if not os.path.isdir(root):
+            raise CommandError(f'No folder at {root}')
+        images = []
+        for cls in settings.DISEASE_CLASSES:
+            folder = os.path.join(root, cls)
+            if not os.path.isdir(folder):
+                continue
+            names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTENSIONS))
+            images += [(cls, os.path.join(folder, n)) for n in names[:limit or None]]
+        if not images:
+            raise CommandError(f'No images in {root}/<class>/')
+        return images
+
+    def offline(self, opts):
+        from utils.predictor import EyePredictor, is_confident_normal
+
+        images = self._images(opts['data'], opts['limit'])
+        predictor = EyePredictor(lazy=False)
+        if predictor.model is None or predictor.triage is None:
+            raise CommandError(
+                'Needs TensorFlow, an active model and a triage model '
+                '(`python manage.py model_registry triage <version>`).'
+            )
+
+        scored = []
+        for label, path in images:
+            t0 = time.perf_counter()
+            first = predictor._predict(path, predictor.triage, direct=True)
+            t1 = time.perf_counter()
+            full = predictor._predict(path, predictor._current, direct=True)
+            t2 = time.perf_counter()
+            if not (first.get('error') or full.get('error')):
+                scored.append((label, first, full, (t1 - t0) * 1000, (t2 - t1) * 1000))
+
+        n = len(scored)
+        if not n:
+            self.stdout.write(
+                f"\nNone of the {len(images)} image(s) in {opts['data']} could be scored by both "
+                "models (see the prediction errors above); nothing to report."
+            )
+            return
+        full_ms = statistics.mean(s[4] for s in scored)
+        full_correct = sum(label == full['disease'] for label, _, full, _, _ in scored)
+        diseased = sum(label != 'normal' for label, *_ in scored)
+
+        self.stdout.write(
+            f"\n{n} image(s) from {opts['data']} — triage {predictor.triage.meta['version']}, "
+            f"active {predictor.model_version}"
+        )
+        self.stdout.write(
+            f"  Active model alone:  accuracy {full_correct / n * 100:5.1f}%   "
+            f"{full_ms:7.1f} ms/image   triage model {statistics.mean(s[3] for s in scored):7.1f} ms/image"
+        )
+        self.stdout.write(
+            f"\n  {'normal≥':>7s} {'disease≤':>8s} {'escalated':>9s} {'accuracy':>8s} "
+            f"{'Δ pts':>6s} {'missed':>6s} {'ms/img':>7s} {'speedup':>7s}"
+        )
+        for threshold in opts['thresholds'] or [settings.CASCADE_NORMAL_THRESHOLD]:
+            for max_disease in opts['max_disease'] or [settings.CASCADE_MAX_DISEASE_PROB]:
+                escalated = correct = missed = 0
+                total_ms = 0.0
+                for label, first, full, first_ms, full_ms_i in scored:
+                    total_ms += first_ms
+                    if is_confident_normal(first, threshold, max_disease):
+                        answer = first['disease']
+                        missed += label != 'normal'
+                    else:
+                        answer = full['disease']
+                        escalated += 1
+                        total_ms += full_ms_i
+                    correct += label == answer
+                cascade_ms = total_ms / n
+                self.stdout.write(
+                    f"  {threshold:7.2f} {max_disease:8.2f} {escalated / n * 100:8.1f}% "
+                    f"{correct / n * 100:7.1f}% {(correct - full_correct) / n * 100:+6.1f} "
+                    f"{missed:3d}/{diseased:<3d}{cascade_ms:7.1f} {full_ms / cascade_ms:6.2f}×"
+                )
+        self.stdout.write(
+            "\n  missed = diseased images the triage model would have answered as normal"
+        )
+
+    def live(self, days):
+        triage = model_registry.triage_version()
+        since = timezone.now() - timedelta(days=days)
+        qs = Detection.objects.filter(detection_date__gte=since).exclude(model_version='')
+        total = qs.count()
+        self.stdout.write(f"\nLive detections, last {days} day(s): {total}")
+        if not triage:
+            self.stdout.write("  Cascade is off (no triage version set).")
+            return
+        if total:
+            answered = qs.filter(model_version=triage).count()
+            self.stdout.write(
+                f"  Answered by triage {triage}: {answered} ({answered / total * 100:.1f}%), "
+                f"escalated: {total - answered} ({(total - answered) / total * 100:.1f}%)"
+            )
@@ -0,0 +1,286 @@
+"""
+Garbage-collect media files nothing refers to.
+
+Removes, once older than the retention window:
+  * content-addressed images (images/ab/cd/<sha256>.jpg) with no
+    referencing detection — webcam snapshots and images of deleted
+    detections — together with their derived _224.png / _thumb.jpg files
+  * legacy uploads/ files not referenced by a Detection, and their thumbnails
+  * PDF thumbnail copies (*_thumb.jpg)
+  * reports of deleted detections, and reports untouched for
+    MEDIA_REPORT_RETENTION_DAYS (download_pdf regenerates them)
+  * temp files abandoned by interrupted uploads
+
+The media tree is listed through a manifest of directory mtimes: a directory
+whose mtime is unchanged since the last run is not listed again. Every
+candidate's mtime is checked again right before removal.
+
+Usage:
+    python manage.py gc_media
+    python manage.py gc_media --days 30 --dry-run
+    python manage.py gc_media --archive-dir /backups/media
+    python manage.py gc_media --full-scan
+"""
+
+import json
+import os
+import re
+import shutil
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from detection.models import Detection, StoredImage
+
+CAS_FILE_RE = re.compile(r'^images/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(_\w+)?\.\w+$')
+REPORT_RE = re.compile(r'^reports/report_(\w+)\.pdf$')
+TMP_MAX_AGE = 86400
+BATCH = 500
+
+
+def _batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH):
+        yield items[start:start + BATCH]
+
+
+def _join(rel, name):
+    return f'{rel}/{name}' if rel else name
+
+
+class Command(BaseCommand):
+    help = 'Delete or archive unreferenced uploads, thumbnails and stale reports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.MEDIA_ORPHAN_RETENTION_DAYS,
+            help='Keep unreferenced files younger than this many days '
+                 f'(default: {settings.MEDIA_ORPHAN_RETENTION_DAYS}).',
+        )
+        parser.add_argument(
+            '--report-days', type=int, default=settings.MEDIA_REPORT_RETENTION_DAYS,
+            help='Remove report PDFs untouched for this many days, 0 to keep them '
+                 f'(default: {settings.MEDIA_REPORT_RETENTION_DAYS}).',
+        )
+        parser.add_argument(
+            '--archive-dir', default=None,
+            help='Move files here (keeping their media paths) instead of deleting them.',
+        )
+        parser.add_argument(
+            '--manifest', default=str(settings.MEDIA_MANIFEST_PATH),
+            help='Directory manifest used to skip unchanged directories.',
+        )
+        parser.add_argument(
+            '--full-scan', action='store_true',
+            help='Ignore the manifest and list every directory.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be removed.',
+        )
+
+    # ── Scan ─────────────────────────────────────────────────────────────
+
+    def scan(self, root, cached_dirs):
+        """
+        Return ({relpath: (size, mtime)}, new manifest dirs, listed count).
+        Directories whose mtime matches the manifest reuse its listing.
+        """
+        files, dirs, listed = {}, {}, 0
+        stack = ['']
+        while stack:
+            rel = stack.pop()
+            try:
+                mtime_ns = os.stat(os.path.join(root, rel)).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            entry = cached_dirs.get(rel)
+            if entry is None or entry['mtime_ns'] != mtime_ns:
+                entry = {'mtime_ns': mtime_ns, 'dirs': [], 'files': {}}
+                with os.scandir(os.path.join(root, rel)) as it:
+                    for e in it:
+                        if e.is_dir(follow_symlinks=False):
+                            entry['dirs'].append(e.name)
+                        elif e.is_file(follow_symlinks=False):
+                            st = e.stat(follow_symlinks=False)
+                            entry['files'][e.name] = [st.st_size, st.st_mtime]
+                listed += 1
+            dirs[rel] = entry
+            for name, (size, mtime) in entry['files'].items():
+                files[_join(rel, name)] = (size, mtime)
+            stack.extend(_join(rel, d) for d in entry['dirs'])
+        return files, dirs, listed
+
+    def load_manifest(self, path, root, full_scan):
+        if full_scan or not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError) as e:
+            self.stderr.write(f"[WARNING] Ignoring unreadable manifest {path}: {e}")
+            return {}
+        if manifest.get('root') != str(root):
+            return {}
+        return manifest.get('dirs', {})
+
+    def save_manifest(self, path, root, dirs):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'root': str(root), 'dirs': dirs}, f)
+        os.replace(tmp_path, path)
+
+    # ── Classify ─────────────────────────────────────────────────────────
+
+    def find_candidates(self, files, now, orphan_cutoff, report_cutoff):
+        """
+        Return [(relpath, reason, cutoff, check_relpath)] of files that may be
+        removed if check_relpath is still older than cutoff.
+        """
+        candidates = []
+        cas_groups = {}      # digest → [relpath, ...]
+        legacy = []          # uploads/ originals
+        reports = {}         # detection_id → relpath
+
+        for rel, (size, mtime) in files.items():
+            if rel.startswith('images/tmp/'):
+                if mtime < now - TMP_MAX_AGE:
+                    candidates.append((rel, 'temp file', now - TMP_MAX_AGE, rel))
+            elif rel.endswith('_thumb.jpg'):
+                # Regenerated whenever a report needs it
+                if mtime < orphan_cutoff:
+                    candidates.append((rel, 'thumbnail', orphan_cutoff, rel))
+            elif (m := CAS_FILE_RE.match(rel)):
+                cas_groups.setdefault(m.group(1), []).append(rel)
+            elif rel.startswith('uploads/'):
+                if mtime < orphan_cutoff:
+                    legacy.append(rel)
+            elif (m := REPORT_RE.match(rel)):
+                reports[m.group(1)] = rel
+
+        # Content-addressed images: unreferenced once no StoredImage counts
+        # them and no Detection names them
+        stale = {
+            digest: rels for digest, rels in cas_groups.items()
+            if max(files[r][1] for r in rels) < orphan_cutoff
+        }
+        referenced = set()
+        for batch in _batches(stale):
+            referenced.update(
+                StoredImage.objects.filter(sha256__in=batch, ref_count__gt=0)
+                .values_list('sha256', flat=True)
+            )
+            # Safety net for rows the reference counts missed
+            originals = [
+                rel for digest in batch if digest not in referenced
+                for rel in stale[digest] if not CAS_FILE_RE.match(rel).group(2)
+            ]
+            for name in Detection.objects.filter(image__in=originals).values_list('image', flat=True):
+                referenced.add(CAS_FILE_RE.match(name).group(1))
+        for digest, rels in stale.items():
+            if digest in referenced:
+                continue
+            # Derived files first; all are judged by the original's mtime,
+            # which ingest refreshes whenever the image is uploaded again
+            originals = [r for r in rels if not CAS_FILE_RE.match(r).group(2)]
+            check = originals[0] if originals else None
+            for rel in sorted(rels, key=lambda r: r in originals):
+                candidates.append((rel, 'unreferenced image', orphan_cutoff, check or rel))
+
+        # Legacy uploads (uuid / webcam_ names) referenced by Detection.image
+        for batch in _batches(legacy):
+            used = set(Detection.objects.filter(image__in=batch).values_list('image', flat=True))
+            candidates.extend(
+                (rel, 'unreferenced upload', orphan_cutoff, rel) for rel in batch if rel not in used
+            )
+
+        # Reports: orphaned by a deleted detection, or simply old
+        for batch in _batches(reports):
+            existing = set(
+                Detection.objects.filter(detection_id__in=batch)
+                .values_list('detection_id', flat=True)
+            )
+            for detection_id in batch:
+                rel = reports[detection_id]
+                mtime = files[rel][1]
+                if detection_id not in existing:
+                    if mtime < orphan_cutoff:
+                        candidates.append((rel, 'orphaned report', orphan_cutoff, rel))
+                elif report_cutoff is not None and mtime < report_cutoff:
+                    candidates.append((rel, 'stale report', report_cutoff, rel))
+
+        return candidates
+
+    # ── Remove ───────────────────────────────────────────────────────────
+
+    def handle(self, *args, **opts):
+        root = os.path.abspath(settings.MEDIA_ROOT)
+        if not os.path.isdir(root):
+            self.stdout.write(f"No media directory at {root}.")
+            return
+
+        now = time.time()
+        orphan_cutoff = now - opts['days'] * 86400
+        report_cutoff = now - opts['report_days'] * 86400 if opts['report_days'] > 0 else None
+
+        t0 = time.perf_counter()
+        cached_dirs = self.load_manifest(opts['manifest'], root, opts['full_scan'])
+        files, dirs, listed = self.scan(root, cached_dirs)
+        self.stdout.write(
+            f"Scanned {len(files)} file(s) in {len(dirs)} director(ies); "
+            f"listed {listed}, reused {len(dirs) - listed} from the manifest "
+            f"({time.perf_counter() - t0:.2f}s)."
+        )
+
+        candidates = self.find_candidates(files, now, orphan_cutoff, report_cutoff)
+
+        removed, reclaimed = 0, 0
+        by_reason = {}
+        touched_dirs = set()
+        removed_digests = set()
+        for rel, reason, cutoff, check_rel in candidates:
+            full_path = os.path.join(root, rel)
+            try:
+                st = os.stat(full_path)
+                check_mtime = os.stat(os.path.join(root, check_rel)).st_mtime
+            except FileNotFoundError:
+                continue
+            if check_mtime >= cutoff:
+                continue  # Used again since the manifest was written
+
+            if not opts['dry_run']:
+                if opts['archive_dir']:
+                    target = os.path.join(opts['archive_dir'], rel)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(full_path, target)
+                else:
+                    os.remove(full_path)
+                touched_dirs.add(os.path.dirname(rel))
+                m = CAS_FILE_RE.match(rel)
+                if m and not m.group(2):
+                    removed_digests.add(m.group(1))
+
+            removed += 1
+            reclaimed += st.st_size
+            count, size = by_reason.get(reason, (0, 0))
+            by_reason[reason] = (count + 1, size + st.st_size)
+
+        if not opts['dry_run']:
+            for batch in _batches(removed_digests):
+                StoredImage.objects.filter(sha256__in=batch, ref_count=0).delete()
+            # Rescan changed directories next run
+            for rel in touched_dirs:
+                dirs.pop(rel, None)
+            self.save_manifest(opts['manifest'], root, dirs)
+
+        for reason, (count, size) in sorted(by_reason.items()):
+            self.stdout.write(f"  {reason:20s} {count:6d} file(s) {size / 1048576:10.2f} MB")
+
+        prefix = '[DRY RUN] Would remove' if opts['dry_run'] else (
+            'Archived' if opts['archive_dir'] else 'Deleted'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {prefix} {removed} file(s), reclaiming {reclaimed / 1048576:.2f} MB."
+        ))
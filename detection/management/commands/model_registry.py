@@ -0,0 +1,130 @@
+"""
+Manage versioned models in ML_MODEL_REGISTRY (see utils/model_registry.py).
+
+Running web and inference workers pick up a newly activated version within
+MODEL_RELOAD_INTERVAL seconds, without a restart.
+
+Usage:
+    python manage.py model_registry list
+    python manage.py model_registry register ml_models/eye_disease_model.h5
+    python manage.py model_registry register model.h5 --class-info class_info.json --activate
+    python manage.py model_registry activate 20261019-101500-3fa2c1d8
+    python manage.py model_registry shadow 20261020-090000-77c0ffee
+    python manage.py model_registry shadow --off
+    python manage.py model_registry triage 20261021-141000-5b1e9a02
+    python manage.py model_registry triage --off
+"""
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils import model_registry
+
+
+class Command(BaseCommand):
+    help = 'List, register and activate model versions.'
+
+    def add_arguments(self, parser):
+        sub = parser.add_subparsers(dest='action', required=True)
+
+        sub.add_parser('list', help='Show registered versions.')
+
+        register = sub.add_parser('register', help='Copy a model file into the registry.')
+        register.add_argument('model_path')
+        register.add_argument(
+            '--class-info', default=None,
+            help='class_info.json with class order and metrics (default: next to the model).',
+        )
+        register.add_argument('--version', default=None, help='Version name (default: date + hash).')
+        register.add_argument(
+            '--metric', action='append', default=[], metavar='NAME=VALUE',
+            help='Extra metric to record, e.g. --metric test_accuracy=0.91',
+        )
+        register.add_argument('--activate', action='store_true', help='Make it the active version.')
+
+        activate = sub.add_parser('activate', help='Switch running workers to a version.')
+        activate.add_argument('version')
+
+        shadow = sub.add_parser('shadow', help='Score a candidate on sampled live traffic.')
+        shadow.add_argument('version', nargs='?')
+        shadow.add_argument('--off', action='store_true', help='Stop shadowing.')
+
+        triage = sub.add_parser('triage', help='Run a cheap model first and escalate uncertain cases.')
+        triage.add_argument('version', nargs='?')
+        triage.add_argument('--off', action='store_true', help='Turn the cascade off.')
+
+    def handle(self, *args, **opts):
+        try:
+            getattr(self, f"handle_{opts['action']}")(opts)
+        except model_registry.RegistryError as e:
+            raise CommandError(str(e))
+
+    def handle_list(self, opts):
+        active = model_registry.active_version()
+        shadow = model_registry.shadow_version()
+        triage = model_registry.triage_version()
+        versions = model_registry.list_versions()
+        if not versions:
+            self.stdout.write(f"No registered models in {model_registry.registry_dir()}.")
+            return
+        for meta in versions:
+            marker = {active: '*', shadow: 's', triage: 't'}.get(meta['version'], ' ')
+            metrics = ', '.join(f'{k}={v}' for k, v in meta.get('metrics', {}).items())
+            self.stdout.write(
+                f"{marker} {meta['version']:28s} {meta.get('architecture') or '-':14s} "
+                f"{meta['size'] / 1048576:8.1f} MB  {metrics}"
+            )
+
+    def handle_register(self, opts):
+        metrics = {}
+        for item in opts['metric']:
+            name, sep, value = item.partition('=')
+            if not sep:
+                raise CommandError(f'Expected NAME=VALUE, got {item!r}')
+            try:
+                metrics[name] = json.loads(value)
+            except ValueError:
+                metrics[name] = value
+
+        meta = model_registry.register(
+            opts['model_path'], class_info_path=opts['class_info'],
+            version=opts['version'], metrics=metrics,
+        )
+        self.stdout.write(self.style.SUCCESS(f"[OK] Registered {meta['version']}"))
+        self.stdout.write(f"     classes: {', '.join(meta['classes'])}  input: {meta['input_size']}px")
+        if opts['activate']:
+            model_registry.activate(meta['version'])
+            self.stdout.write(self.style.SUCCESS(f"[OK] Activated {meta['version']}"))
+
+    def handle_activate(self, opts):
+        meta = model_registry.activate(opts['version'])
+        self.stdout.write(self.style.SUCCESS(f"[OK] Activated {meta['version']}"))
+
+    def handle_shadow(self, opts):
+        if opts['off']:
+            model_registry.set_shadow(None)
+            self.stdout.write(self.style.SUCCESS("[OK] Shadow mode off"))
+            return
+        if not opts['version']:
+            current = model_registry.shadow_version()
+            self.stdout.write(f"Shadow version: {current or 'none'}")
+            return
+        meta = model_registry.set_shadow(opts['version'])
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] Shadowing {meta['version']}; see `python manage.py shadow_report`"
+        ))
+
+    def handle_triage(self, opts):
+        if opts['off']:
+            model_registry.set_triage(None)
+            self.stdout.write(self.style.SUCCESS("[OK] Cascade off"))
+            return
+        if not opts['version']:
+            current = model_registry.triage_version()
+            self.stdout.write(f"Triage version: {current or 'none'}")
+            return
+        meta = model_registry.set_triage(opts['version'])
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] Triaging with {meta['version']}; see `python manage.py cascade_report`"
+        ))
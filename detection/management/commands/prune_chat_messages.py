@@ -0,0 +1,124 @@
+"""
+Archive and prune old chatbot sessions.
+
+A session is archived once its latest message is older than the retention
+window, so live conversations are never split. Archived turns are appended
+to a gzipped JSONL file (one JSON object per line) and deleted from the
+ChatMessage table, keeping the hot table small.
+
+Usage:
+    python manage.py prune_chat_messages
+    python manage.py prune_chat_messages --days 30 --dry-run
+    python manage.py prune_chat_messages --no-archive
+"""
+
+import gzip
+import json
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from detection.models import ChatMessage
+
+
+class Command(BaseCommand):
+    help = 'Archive chat sessions idle longer than the retention window and delete them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.CHAT_RETENTION_DAYS,
+            help='Archive sessions with no message in this many days '
+                 f'(default: {settings.CHAT_RETENTION_DAYS}).',
+        )
+        parser.add_argument(
+            '--archive-dir', default=str(settings.CHAT_ARCHIVE_DIR),
+            help='Directory for the gzipped JSONL archives.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Sessions archived and deleted per transaction.',
+        )
+        parser.add_argument(
+            '--no-archive', action='store_true',
+            help='Delete old sessions without writing an archive.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report what would be archived.',
+        )
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(days=opts['days'])
+
+        stale_qs = (
+            ChatMessage.objects
+            .order_by()
+            .values('session_id')
+            .annotate(last=Max('timestamp'))
+            .filter(last__lt=cutoff)
+            .values('session_id')
+        )
+        stale_sessions = [row['session_id'] for row in stale_qs]
+
+        if not stale_sessions:
+            self.stdout.write(f"No sessions idle since {cutoff:%Y-%m-%d}.")
+            return
+
+        if opts['dry_run']:
+            count = ChatMessage.objects.filter(session_id__in=stale_qs).count()
+            self.stdout.write(
+                f"[DRY RUN] {len(stale_sessions)} session(s) idle since {cutoff:%Y-%m-%d}; "
+                f"{count} message(s) would be archived."
+            )
+            return
+
+        archive_path = None
+        archive = None
+        if not opts['no_archive']:
+            os.makedirs(opts['archive_dir'], exist_ok=True)
+            archive_path = os.path.join(
+                opts['archive_dir'],
+                f"chat_{timezone.now():%Y%m%d_%H%M%S}.jsonl.gz",
+            )
+            archive = gzip.open(archive_path, 'at', encoding='utf-8')
+
+        archived = 0
+        batch_size = max(1, opts['batch_size'])
+        try:
+            for start in range(0, len(stale_sessions), batch_size):
+                batch = stale_sessions[start:start + batch_size]
+                with transaction.atomic():
+                    rows = (
+                        ChatMessage.objects
+                        .filter(session_id__in=batch)
+                        .order_by('session_id', 'timestamp', 'id')
+                        .values('id', 'session_id', 'message', 'response', 'language', 'timestamp')
+                    )
+                    count = 0
+                    max_id = 0
+                    for row in rows.iterator(chunk_size=2000):
+                        max_id = max(max_id, row.pop('id'))
+                        count += 1
+                        if archive is not None:
+                            row['timestamp'] = row['timestamp'].isoformat()
+                            archive.write(json.dumps(row, ensure_ascii=False) + '\n')
+                    if archive is not None:
+                        archive.flush()
+                    # Rows added to a revived session after the read have a
+                    # higher id and are left alone
+                    ChatMessage.objects.filter(session_id__in=batch, id__lte=max_id).delete()
+                    archived += count
+        finally:
+            if archive is not None:
+                archive.close()
+
+        verb = 'Archived' if archive_path else 'Deleted'
+        where = f" to {archive_path}" if archive_path else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] {verb} {archived} message(s) from {len(stale_sessions)} session(s){where}."
+        ))
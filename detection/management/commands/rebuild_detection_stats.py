@@ -0,0 +1,22 @@
+"""
+Rebuild the DailyDetectionStat rollup from the Detection table.
+
+Run after bulk imports/deletes that bypass model signals, or to repair drift.
+
+Usage:
+    python manage.py rebuild_detection_stats
+"""
+
+from django.core.management.base import BaseCommand
+
+from detection import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute per-day disease/severity detection counts from scratch.'
+
+    def handle(self, *args, **opts):
+        buckets = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"[OK] Rebuilt {buckets} daily bucket(s); {stats.total_detections()} detection(s) counted."
+        ))
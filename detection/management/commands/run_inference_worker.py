@@ -0,0 +1,51 @@
+"""
+Run the shared inference worker.
+
+Loads the model once and answers predictions from the web workers over
+INFERENCE_SOCKET (see utils/inference_server.py). Start it before gunicorn,
+under the same user and with the same MEDIA_ROOT, e.g. from systemd:
+
+    INFERENCE_SOCKET=/run/eyedetect/inference.sock python manage.py run_inference_worker
+    INFERENCE_SOCKET=/run/eyedetect/inference.sock gunicorn eye_detection.wsgi:application -w 8
+
+Refuses to start with the default SECRET_KEY (the socket key is derived from
+it) or on a TCP address other than loopback.
+
+Usage:
+    python manage.py run_inference_worker
+    python manage.py run_inference_worker --socket 127.0.0.1:8765
+"""
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.inference_server import InferenceServer, is_loopback, parse_address
+
+
+class Command(BaseCommand):
+    help = 'Load the model once and serve predictions to the web workers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--socket', default=settings.INFERENCE_SOCKET,
+            help='Unix socket path or host:port (default: INFERENCE_SOCKET).',
+        )
+
+    def handle(self, *args, **opts):
+        if not opts['socket']:
+            raise CommandError('Set INFERENCE_SOCKET or pass --socket.')
+        if settings.SECRET_KEY.startswith('django-insecure'):
+            raise CommandError(
+                'SECRET_KEY is the insecure default; set a secret SECRET_KEY '
+                '(shared with the web workers) before starting the inference worker.'
+            )
+        address = parse_address(opts['socket'])
+        if not is_loopback(address):
+            raise CommandError(
+                f'{opts["socket"]} is not a loopback address; use a Unix socket '
+                'path or 127.0.0.1:<port>.'
+            )
+        try:
+            InferenceServer(opts['socket']).serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write('Inference worker stopped.')
@@ -0,0 +1,91 @@
+"""
+Compare a shadow candidate with the active model on live traffic.
+
+Summarizes ShadowPrediction rows (see utils/shadow.py) per primary/shadow
+version pair: how often the two agree on the diagnosis, where they disagree,
+how far their confidences differ, and the latency of each.
+
+Usage:
+    python manage.py shadow_report
+    python manage.py shadow_report --days 1 --shadow-version 20261020-090000-77c0ffee
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from detection.models import ShadowPrediction
+
+
+def _percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+class Command(BaseCommand):
+    help = 'Report agreement and latency of shadow predictions against the active model.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=7,
+            help='Only include predictions from the last N days (default: 7, 0 = all).',
+        )
+        parser.add_argument('--shadow-version', default=None, help='Only this shadow version.')
+        parser.add_argument(
+            '--top', type=int, default=5,
+            help='Disagreement pairs to list per version (default: 5).',
+        )
+
+    def handle(self, *args, **opts):
+        qs = ShadowPrediction.objects.order_by()
+        if opts['days'] > 0:
+            qs = qs.filter(created_at__gte=timezone.now() - timedelta(days=opts['days']))
+        if opts['shadow_version']:
+            qs = qs.filter(shadow_version=opts['shadow_version'])
+
+        groups = {}
+        rows = qs.values_list(
+            'primary_version', 'shadow_version', 'primary_disease', 'shadow_disease',
+            'primary_confidence', 'shadow_confidence', 'primary_ms', 'shadow_ms',
+        )
+        for (p_ver, s_ver, p_dis, s_dis, p_conf, s_conf, p_ms, s_ms) in rows.iterator(chunk_size=2000):
+            g = groups.setdefault((p_ver, s_ver), {
+                'n': 0, 'agree': 0, 'conf_diff': 0.0, 'pairs': Counter(),
+                'primary_ms': [], 'shadow_ms': [],
+            })
+            g['n'] += 1
+            if p_dis == s_dis:
+                g['agree'] += 1
+            else:
+                g['pairs'][(p_dis, s_dis)] += 1
+            g['conf_diff'] += abs(p_conf - s_conf)
+            g['primary_ms'].append(p_ms)
+            g['shadow_ms'].append(s_ms)
+
+        if not groups:
+            self.stdout.write("No shadow predictions recorded.")
+            return
+
+        self.stdout.write("\n" + "=" * 70)
+        self.stdout.write("SHADOW MODEL REPORT")
+        self.stdout.write("=" * 70)
+        for (p_ver, s_ver), g in sorted(groups.items()):
+            n = g['n']
+            self.stdout.write(f"\n{s_ver} (shadow) vs {p_ver} (active) — {n} prediction(s)")
+            self.stdout.write(f"  Agreement:            {g['agree'] / n * 100:6.1f}%")
+            self.stdout.write(f"  Mean |confidence Δ|:  {g['conf_diff'] / n:6.1f} pts")
+            for label, key in (('Active', 'primary_ms'), ('Shadow', 'shadow_ms')):
+                ms = g[key]
+                self.stdout.write(
+                    f"  {label} latency ms:    p50 {_percentile(ms, 50):7.1f}   "
+                    f"p95 {_percentile(ms, 95):7.1f}   p99 {_percentile(ms, 99):7.1f}"
+                )
+            if g['pairs']:
+                self.stdout.write("  Top disagreements (active → shadow):")
+                for (p_dis, s_dis), count in g['pairs'].most_common(opts['top']):
+                    self.stdout.write(f"    {p_dis:22s} → {s_dis:22s} {count:6d}")
+        self.stdout.write("")
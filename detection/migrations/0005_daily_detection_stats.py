@@ -0,0 +1,50 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:47
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_stats(apps, schema_editor):
+    Detection = apps.get_model('detection', 'Detection')
+    DailyDetectionStat = apps.get_model('detection', 'DailyDetectionStat')
+
+    rows = (
+        Detection.objects
+        .order_by()
+        .annotate(day=TruncDate('detection_date', tzinfo=timezone.get_default_timezone()))
+        .values('day', 'predicted_disease', 'severity')
+        .annotate(count=Count('id'))
+    )
+    DailyDetectionStat.objects.bulk_create(
+        [DailyDetectionStat(**r) for r in rows], batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0004_detection_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDetectionStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('predicted_disease', models.CharField(max_length=100)),
+                ('severity', models.CharField(choices=[('MILD', 'Mild'), ('MODERATE', 'Moderate'), ('SEVERE', 'Severe')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailydetectionstat',
+            constraint=models.UniqueConstraint(fields=('day', 'predicted_disease', 'severity'), name='daily_stat_unique_bucket'),
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0005_daily_detection_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='detection',
+            name='det_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='detection',
+            index=models.Index(fields=['detection_date', 'id'], name='det_date_idx'),
+        ),
+    ]
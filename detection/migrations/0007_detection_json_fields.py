@@ -0,0 +1,139 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:20
+
+import json
+
+from django.db import migrations, models
+
+
+SECTIONS = ['symptoms', 'causes', 'treatment', 'prevention']
+
+
+def split_lines(text):
+    if not text:
+        return []
+    return [l.strip().lstrip('•-*').strip() for l in text.split('\n') if l.strip()]
+
+
+def parse_probabilities(text):
+    try:
+        probs = json.loads(text) if text else {}
+    except ValueError:
+        return {}
+    return probs if isinstance(probs, dict) else {}
+
+
+def text_to_json(apps, schema_editor):
+    Detection = apps.get_model('detection', 'Detection')
+    old_fields = SECTIONS + ['all_probabilities']
+    new_fields = [f'{name}_json' for name in old_fields]
+
+    batch = []
+    for det in Detection.objects.only('id', *old_fields).iterator(chunk_size=2000):
+        for name in SECTIONS:
+            setattr(det, f'{name}_json', split_lines(getattr(det, name)))
+        det.all_probabilities_json = parse_probabilities(det.all_probabilities)
+        batch.append(det)
+        if len(batch) == 1000:
+            Detection.objects.bulk_update(batch, new_fields)
+            batch = []
+    if batch:
+        Detection.objects.bulk_update(batch, new_fields)
+
+
+def json_to_text(apps, schema_editor):
+    Detection = apps.get_model('detection', 'Detection')
+    old_fields = SECTIONS + ['all_probabilities']
+    new_fields = [f'{name}_json' for name in old_fields]
+
+    batch = []
+    for det in Detection.objects.only('id', *new_fields).iterator(chunk_size=2000):
+        for name in SECTIONS:
+            setattr(det, name, '\n'.join(getattr(det, f'{name}_json') or []))
+        det.all_probabilities = json.dumps(det.all_probabilities_json or {})
+        batch.append(det)
+        if len(batch) == 1000:
+            Detection.objects.bulk_update(batch, old_fields)
+            batch = []
+    if batch:
+        Detection.objects.bulk_update(batch, old_fields)
+
+
+# PostgreSQL only: btree indexes on (all_probabilities -> '<class>') match the
+# SQL the ORM emits for all_probabilities__<class>__gt/__lt lookups. SQLite
+# wraps the key in a CASE expression that an expression index can't serve.
+PROBABILITY_INDEXES = {
+    'det_prob_cataract_idx': 'cataract',
+    'det_prob_diabetic_idx': 'diabetic_retinopathy',
+    'det_prob_glaucoma_idx': 'glaucoma',
+    'det_prob_normal_idx': 'normal',
+}
+
+
+def create_probability_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, key in PROBABILITY_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+            f'ON "detection_detection" (("all_probabilities" -> \'{key}\'))'
+        )
+
+
+def drop_probability_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name in PROBABILITY_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+
+
+class Migration(migrations.Migration):
+    """
+    Text → JSON columns. Copied through temporary columns rather than altered
+    in place: the old section text is newline-joined, not valid JSON, so a
+    direct column type change would fail on PostgreSQL (and SQLite's
+    JSON_VALID check).
+    """
+
+    dependencies = [
+        ('detection', '0006_detection_date_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='detection',
+            name='symptoms_json',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='detection',
+            name='causes_json',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='detection',
+            name='treatment_json',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='detection',
+            name='prevention_json',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='detection',
+            name='all_probabilities_json',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(text_to_json, json_to_text),
+        migrations.RemoveField(model_name='detection', name='symptoms'),
+        migrations.RemoveField(model_name='detection', name='causes'),
+        migrations.RemoveField(model_name='detection', name='treatment'),
+        migrations.RemoveField(model_name='detection', name='prevention'),
+        migrations.RemoveField(model_name='detection', name='all_probabilities'),
+        migrations.RenameField(model_name='detection', old_name='symptoms_json', new_name='symptoms'),
+        migrations.RenameField(model_name='detection', old_name='causes_json', new_name='causes'),
+        migrations.RenameField(model_name='detection', old_name='treatment_json', new_name='treatment'),
+        migrations.RenameField(model_name='detection', old_name='prevention_json', new_name='prevention'),
+        migrations.RenameField(model_name='detection', old_name='all_probabilities_json', new_name='all_probabilities'),
+        migrations.RunPython(create_probability_indexes, drop_probability_indexes),
+    ]
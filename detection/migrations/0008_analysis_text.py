@@ -0,0 +1,104 @@
+# Generated by Django 4.2.7 on 2026-10-19 05:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+import hashlib
+import json
+
+
+TEXT_FIELDS = ('english_explanation', 'tamil_explanation', 'disclaimer')
+LIST_FIELDS = ('symptoms', 'causes', 'treatment', 'prevention')
+FIELDS = TEXT_FIELDS + LIST_FIELDS
+
+
+def content_hash(content):
+    # Must match AnalysisText.hash_content
+    canonical = json.dumps(content, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def move_text_to_analysis(apps, schema_editor):
+    Detection = apps.get_model('detection', 'Detection')
+    AnalysisText = apps.get_model('detection', 'AnalysisText')
+
+    # content hash → (content, detection ids)
+    groups = {}
+    for row in Detection.objects.values('id', *FIELDS).iterator(chunk_size=2000):
+        content = {name: row[name] or '' for name in TEXT_FIELDS}
+        content.update({name: list(row[name] or []) for name in LIST_FIELDS})
+        key = content_hash(content)
+        groups.setdefault(key, (content, []))[1].append(row['id'])
+
+    for key, (content, ids) in groups.items():
+        analysis = AnalysisText.objects.create(content_hash=key, **content)
+        for start in range(0, len(ids), 500):
+            Detection.objects.filter(id__in=ids[start:start + 500]).update(analysis=analysis)
+
+
+def move_text_to_detection(apps, schema_editor):
+    Detection = apps.get_model('detection', 'Detection')
+    AnalysisText = apps.get_model('detection', 'AnalysisText')
+
+    for analysis in AnalysisText.objects.iterator():
+        Detection.objects.filter(analysis=analysis).update(
+            **{name: getattr(analysis, name) for name in FIELDS}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0007_detection_json_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalysisText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('content_hash', models.CharField(max_length=64, unique=True)),
+                ('english_explanation', models.TextField(blank=True)),
+                ('tamil_explanation', models.TextField(blank=True)),
+                ('symptoms', models.JSONField(blank=True, default=list)),
+                ('causes', models.JSONField(blank=True, default=list)),
+                ('treatment', models.JSONField(blank=True, default=list)),
+                ('prevention', models.JSONField(blank=True, default=list)),
+                ('disclaimer', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='detection',
+            name='analysis',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='detections', to='detection.analysistext'),
+        ),
+        migrations.RunPython(move_text_to_analysis, move_text_to_detection),
+        migrations.RemoveField(
+            model_name='detection',
+            name='causes',
+        ),
+        migrations.RemoveField(
+            model_name='detection',
+            name='disclaimer',
+        ),
+        migrations.RemoveField(
+            model_name='detection',
+            name='english_explanation',
+        ),
+        migrations.RemoveField(
+            model_name='detection',
+            name='prevention',
+        ),
+        migrations.RemoveField(
+            model_name='detection',
+            name='symptoms',
+        ),
+        migrations.RemoveField(
+            model_name='detection',
+            name='tamil_explanation',
+        ),
+        migrations.RemoveField(
+            model_name='detection',
+            name='treatment',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:45
+
+from django.db import migrations, models
+
+
+KEY_MAX_LENGTH = 200
+
+
+def populate_lookup_keys(apps, schema_editor):
+    Patient = apps.get_model('detection', 'Patient')
+
+    seen = set()
+    batch = []
+    # Oldest patient keeps the plain key; later same-name rows get a suffix
+    for patient in Patient.objects.order_by('id').only('id', 'name').iterator(chunk_size=2000):
+        key = ' '.join(patient.name.split()).casefold()[:KEY_MAX_LENGTH]
+        if key in seen:
+            suffix = f'#{patient.id}'
+            key = key[:KEY_MAX_LENGTH - len(suffix)] + suffix
+        seen.add(key)
+        patient.lookup_key = key
+        batch.append(patient)
+        if len(batch) == 1000:
+            Patient.objects.bulk_update(batch, ['lookup_key'])
+            batch = []
+    if batch:
+        Patient.objects.bulk_update(batch, ['lookup_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0008_analysis_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='lookup_key',
+            field=models.CharField(editable=False, max_length=200, null=True),
+        ),
+        migrations.RunPython(populate_lookup_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='patient',
+            name='lookup_key',
+            field=models.CharField(editable=False, max_length=200, unique=True),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-19 06:18
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0011_detection_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShadowPrediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('image_digest', models.CharField(blank=True, max_length=64)),
+                ('primary_version', models.CharField(max_length=64)),
+                ('shadow_version', models.CharField(max_length=64)),
+                ('primary_disease', models.CharField(max_length=100)),
+                ('shadow_disease', models.CharField(max_length=100)),
+                ('primary_confidence', models.FloatField()),
+                ('shadow_confidence', models.FloatField()),
+                ('primary_probabilities', models.JSONField(default=dict)),
+                ('shadow_probabilities', models.JSONField(default=dict)),
+                ('primary_ms', models.FloatField()),
+                ('shadow_ms', models.FloatField()),
+                ('agree', models.BooleanField()),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['shadow_version', 'created_at'], name='shadow_version_ts_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+# PostgreSQL only: the history search matches detection IDs and patient
+# lookup keys by prefix (LIKE 'x%'). The unique indexes on those columns use
+# the database collation, which LIKE can't use outside the C locale;
+# pattern_ops indexes can. SQLite searches with a range on the unique
+# indexes instead (see detection/queries.py).
+PREFIX_INDEXES = {
+    'det_detection_id_prefix_idx': ('detection_detection', 'detection_id'),
+    'patient_lookup_prefix_idx': ('detection_patient', 'lookup_key'),
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name, (table, column) in PREFIX_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{index_name}" '
+            f'ON "{table}" ("{column}" varchar_pattern_ops)'
+        )
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for index_name in PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{index_name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('detection', '0012_shadow_predictions'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -1,7 +1,12 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import connection, models
 from django.utils import timezone
+import hashlib
+import json
 import uuid
 
+from .storage import get_image_storage
+
 
 def generate_patient_id():
     return 'PT' + uuid.uuid4().hex[:8].upper()
@@ -19,19 +24,147 @@ class Patient(models.Model):
         default=generate_patient_id
     )
     name = models.CharField(max_length=200)
+    # Normalized name — the key uploads use to find a returning patient
+    lookup_key = models.CharField(max_length=200, unique=True, editable=False)
     age = models.IntegerField(default=0)
     gender = models.CharField(max_length=1, choices=GENDER_CHOICES, default='O')
     phone = models.CharField(max_length=15, blank=True)
     email = models.EmailField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped on every save; part of the API's ETag
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.patient_id} – {self.name}"
 
+    LOOKUP_KEY_MAX_LENGTH = 200
+
+    @classmethod
+    def make_lookup_key(cls, name):
+        return ' '.join(name.split()).casefold()[:cls.LOOKUP_KEY_MAX_LENGTH]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_name = instance.__dict__.get('name')
+        return instance
+
+    def _new_lookup_key(self):
+        """
+        The key to save, or None to keep the stored one. Patients that shared
+        a name before lookup keys existed keep their '<key>#<id>' key (see
+        migration 0009) until they are renamed.
+        """
+        if self.lookup_key and self.name == getattr(self, '_loaded_name', self.name):
+            return None
+        return self.make_lookup_key(self.name)
+
+    def clean(self):
+        super().clean()
+        key = self._new_lookup_key()
+        if key is None:
+            return
+        existing = Patient.objects.filter(lookup_key=key).exclude(pk=self.pk).first()
+        if existing is not None:
+            raise ValidationError({
+                'name': f'A patient with this name already exists ({existing.patient_id}).'
+            })
+
+    def save(self, *args, **kwargs):
+        key = self._new_lookup_key()
+        if key is not None:
+            self.lookup_key = key
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'lookup_key'}
+        super().save(*args, **kwargs)
+        self._loaded_name = self.name
+
+    @classmethod
+    def upsert(cls, name, age=0, gender='O', phone=''):
+        """
+        Find the patient by name or create them, in one INSERT ... ON CONFLICT
+        ... RETURNING statement where the database supports it (SQLite 3.35+,
+        PostgreSQL). Returns (patient, created).
+        """
+        lookup_key = cls.make_lookup_key(name)
+        if not connection.features.can_return_columns_from_insert:
+            return cls.objects.get_or_create(
+                lookup_key=lookup_key,
+                defaults={'name': name, 'age': age, 'gender': gender, 'phone': phone},
+            )
+
+        # Columns and values come from the model, as Model.save() would
+        # prepare them, so new fields (and their defaults) are included
+        new = cls(name=name, lookup_key=lookup_key, age=age, gender=gender, phone=phone)
+        fields = [f for f in cls._meta.local_concrete_fields if not f.primary_key]
+        columns = ', '.join(connection.ops.quote_name(f.column) for f in fields)
+        params = [f.get_db_prep_save(f.pre_save(new, True), connection) for f in fields]
+        table = connection.ops.quote_name(cls._meta.db_table)
+        # The no-op DO UPDATE makes RETURNING yield the existing row too
+        sql = (
+            f"INSERT INTO {table} ({columns}) "
+            f"VALUES ({', '.join(['%s'] * len(fields))}) "
+            "ON CONFLICT (lookup_key) DO UPDATE SET lookup_key = excluded.lookup_key "
+            "RETURNING *"
+        )
+        patient = list(cls.objects.raw(sql, params))[0]
+        return patient, patient.patient_id == new.patient_id
+
     class Meta:
         ordering = ['-created_at']
 
 
+class AnalysisText(models.Model):
+    """
+    Explanation text shown on a result page and report, stored once per
+    distinct content and shared by every detection with the same analysis
+    (the fallback analyses are identical for each disease).
+    """
+    TEXT_FIELDS = ('english_explanation', 'tamil_explanation', 'disclaimer')
+    LIST_FIELDS = ('symptoms', 'causes', 'treatment', 'prevention')
+
+    content_hash = models.CharField(max_length=64, unique=True)
+    english_explanation = models.TextField(blank=True)
+    tamil_explanation = models.TextField(blank=True)
+    # Analysis sections as lists of plain-text points
+    symptoms = models.JSONField(default=list, blank=True)
+    causes = models.JSONField(default=list, blank=True)
+    treatment = models.JSONField(default=list, blank=True)
+    prevention = models.JSONField(default=list, blank=True)
+    disclaimer = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.content_hash[:12]} – {self.english_explanation[:50]}"
+
+    @classmethod
+    def normalize(cls, fields):
+        content = {name: fields.get(name) or '' for name in cls.TEXT_FIELDS}
+        content.update({name: list(fields.get(name) or []) for name in cls.LIST_FIELDS})
+        return content
+
+    @staticmethod
+    def hash_content(content):
+        canonical = json.dumps(content, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def intern(cls, **fields):
+        """Return the stored row for this content, creating it on first use."""
+        content = cls.normalize(fields)
+        analysis, _ = cls.objects.get_or_create(
+            content_hash=cls.hash_content(content), defaults=content
+        )
+        return analysis
+
+
+def _analysis_field(name, empty):
+    def getter(self):
+        return getattr(self.analysis, name) if self.analysis_id else empty
+    return property(getter)
+
+
 class Detection(models.Model):
     SEVERITY_CHOICES = [
         ('MILD', 'Mild'),
@@ -46,26 +179,52 @@ class Detection(models.Model):
         max_length=50, unique=True,
         default=generate_detection_id
     )
-    image = models.ImageField(upload_to='uploads/%Y/%m/%d/')
+    # Named by content hash (images/ab/cd/<sha256>.jpg); see detection/storage.py
+    image = models.ImageField(upload_to='images/', storage=get_image_storage)
     predicted_disease = models.CharField(max_length=100)
     confidence_score = models.FloatField()
     severity = models.CharField(max_length=10, choices=SEVERITY_CHOICES)
-    english_explanation = models.TextField(blank=True)
-    tamil_explanation = models.TextField(blank=True)
-    symptoms = models.TextField(blank=True)
-    causes = models.TextField(blank=True)
-    treatment = models.TextField(blank=True)
-    prevention = models.TextField(blank=True)
-    disclaimer = models.TextField(blank=True)
+    analysis = models.ForeignKey(
+        AnalysisText, on_delete=models.PROTECT, null=True, blank=True,
+        related_name='detections'
+    )
     report_pdf = models.FileField(upload_to='reports/', null=True, blank=True)
     detection_date = models.DateTimeField(default=timezone.now)
 
-    # Store all class probabilities as JSON-like string
-    all_probabilities = models.TextField(blank=True, default='{}')
+    # Class probabilities in percent, e.g. {"glaucoma": 85.5, "normal": 2.2};
+    # query with all_probabilities__glaucoma__gt=30 (expression-indexed per
+    # class on PostgreSQL, see migration 0007)
+    all_probabilities = models.JSONField(default=dict, blank=True)
+    # Registry version that made the prediction ('demo' without a model)
+    model_version = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    # Bumped on every save; part of the API's ETag
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # Read-through accessors for the shared analysis text
+    english_explanation = _analysis_field('english_explanation', '')
+    tamil_explanation = _analysis_field('tamil_explanation', '')
+    symptoms = _analysis_field('symptoms', [])
+    causes = _analysis_field('causes', [])
+    treatment = _analysis_field('treatment', [])
+    prevention = _analysis_field('prevention', [])
+    disclaimer = _analysis_field('disclaimer', '')
 
     def __str__(self):
         return f"{self.detection_id} – {self.predicted_disease}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored date/disease/severity so the stats rollup can
+        # move the row to another bucket if they are edited, and the image
+        # so its reference count can follow a replaced image
+        instance._loaded_stat_values = {
+            name: value for name, value in zip(field_names, values)
+            if name in ('detection_date', 'predicted_disease', 'severity')
+        }
+        instance._loaded_image = dict(zip(field_names, values)).get('image')
+        return instance
+
     def get_disease_display_name(self):
         return self.predicted_disease.replace('_', ' ').title()
 
@@ -75,6 +234,32 @@ class Detection(models.Model):
 
     class Meta:
         ordering = ['-detection_date']
+        indexes = [
+            # Default ordering, recent lists, date-range filters and
+            # (detection_date, id) keyset pagination
+            models.Index(fields=['detection_date', 'id'], name='det_date_idx'),
+            # Disease / severity distributions, optionally within a date range
+            models.Index(fields=['predicted_disease', 'detection_date'], name='det_disease_date_idx'),
+            models.Index(fields=['severity', 'detection_date'], name='det_severity_date_idx'),
+            # Per-patient timelines (the FK index alone can't serve the ordering)
+            models.Index(fields=['patient', 'detection_date'], name='det_patient_date_idx'),
+        ]
+
+
+class StoredImage(models.Model):
+    """
+    One content-addressed image file and the number of detections using it.
+    Maintained by signals in detection/signals.py.
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=255)
+    size = models.BigIntegerField(default=0)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(default=timezone.now)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} ref)"
 
 
 class ChatMessage(models.Model):
@@ -82,10 +267,72 @@ class ChatMessage(models.Model):
     message = models.TextField()
     response = models.TextField()
     language = models.CharField(max_length=5, default='en')
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the turn happens, not when the write-behind buffer flushes it
+    timestamp = models.DateTimeField(default=timezone.now)
 
     def __str__(self):
         return f"[{self.language}] {self.session_id[:8]} — {self.message[:50]}"
 
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            # Session context lookups: filter by session, order by time
+            models.Index(fields=['session_id', 'timestamp'], name='chat_session_ts_idx'),
+            # Retention scans by age
+            models.Index(fields=['timestamp'], name='chat_timestamp_idx'),
+        ]
+
+
+class DailyDetectionStat(models.Model):
+    """
+    Pre-aggregated detection counts per local day × disease × severity.
+    Kept up to date by signals in detection/stats.py; rebuild with
+    `python manage.py rebuild_detection_stats`.
+    """
+    day = models.DateField()
+    predicted_disease = models.CharField(max_length=100)
+    severity = models.CharField(max_length=10, choices=Detection.SEVERITY_CHOICES)
+    count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.day} {self.predicted_disease}/{self.severity}: {self.count}"
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'predicted_disease', 'severity'],
+                name='daily_stat_unique_bucket',
+            ),
+        ]
+
+
+class ShadowPrediction(models.Model):
+    """
+    One sampled request scored by both the active model and a shadow
+    candidate (see utils/shadow.py). Only the primary result was served.
+    Summarize with `python manage.py shadow_report`.
+    """
+    created_at = models.DateTimeField(default=timezone.now)
+    image_digest = models.CharField(max_length=64, blank=True)
+    primary_version = models.CharField(max_length=64)
+    shadow_version = models.CharField(max_length=64)
+    primary_disease = models.CharField(max_length=100)
+    shadow_disease = models.CharField(max_length=100)
+    primary_confidence = models.FloatField()
+    shadow_confidence = models.FloatField()
+    primary_probabilities = models.JSONField(default=dict)
+    shadow_probabilities = models.JSONField(default=dict)
+    primary_ms = models.FloatField()
+    shadow_ms = models.FloatField()
+    agree = models.BooleanField()
+
+    def __str__(self):
+        return (f"{self.primary_version}:{self.primary_disease} vs "
+                f"{self.shadow_version}:{self.shadow_disease}")
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['shadow_version', 'created_at'], name='shadow_version_ts_idx'),
+        ]
@@ -0,0 +1,148 @@
+"""
+Shared Detection list queries — filtering and keyset (cursor) pagination.
+Pages are addressed by the (detection_date, id) of their edge rows, so every
+page costs one index range scan no matter how deep into history it is.
+"""
+
+import base64
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import Detection, Patient
+
+# Columns the history table actually renders
+HISTORY_FIELDS = (
+    'detection_id', 'predicted_disease', 'confidence_score', 'severity',
+    'detection_date', 'report_pdf', 'patient__name',
+)
+
+
+def encode_cursor(detection):
+    raw = f"{detection.detection_date.isoformat()}|{detection.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (detection_date, id) or None for a malformed cursor."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        stamp, pk = raw.rsplit('|', 1)
+        when = parse_datetime(stamp)
+        if when is None:
+            return None
+        return when, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _prefix(field, value):
+    """
+    `field` starts with `value`, in a form the column's unique index serves.
+    SQLite only uses an index for LIKE under case_sensitive_like, so add the
+    equivalent range on the (binary-collated) index there; PostgreSQL uses
+    the pattern_ops indexes from migration 0013.
+    """
+    cond = Q(**{f'{field}__startswith': value})
+    if connection.vendor == 'sqlite':
+        cond &= Q(**{f'{field}__gte': value, f'{field}__lt': value + '\U0010ffff'})
+    return cond
+
+
+def _day_bound(value, end=False):
+    day = parse_date(value or '')
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day, time.max if end else time.min))
+
+
+def filter_detections(params, qs=None):
+    """
+    Apply list filters from a GET-style mapping:
+        disease, severity, patient (patient_id), q (detection ID or patient
+        name prefix), date_from / date_to (YYYY-MM-DD, local time),
+        prob_disease + prob_min (class probability above a percentage,
+        e.g. prob_disease=glaucoma&prob_min=30).
+    """
+    if qs is None:
+        qs = Detection.objects.all()
+
+    disease = params.get('disease')
+    if disease:
+        qs = qs.filter(predicted_disease=disease)
+
+    severity = params.get('severity')
+    if severity:
+        qs = qs.filter(severity=severity)
+
+    patient = params.get('patient')
+    if patient:
+        qs = qs.filter(patient__patient_id=patient)
+
+    q = (params.get('q') or '').strip()
+    if q:
+        # Prefix matches on indexed columns: IDs are upper-case, names are
+        # matched through their normalized lookup_key
+        patients = Patient.objects.filter(_prefix('lookup_key', Patient.make_lookup_key(q)))
+        qs = qs.filter(
+            _prefix('detection_id', q.upper()) | Q(patient__in=patients.values('id'))
+        )
+
+    date_from = _day_bound(params.get('date_from'))
+    if date_from:
+        qs = qs.filter(detection_date__gte=date_from)
+
+    date_to = _day_bound(params.get('date_to'), end=True)
+    if date_to:
+        qs = qs.filter(detection_date__lte=date_to)
+
+    prob_disease = params.get('prob_disease')
+    if prob_disease in settings.DISEASE_CLASSES:
+        try:
+            prob_min = float(params.get('prob_min') or 0)
+        except ValueError:
+            prob_min = 0
+        qs = qs.filter(**{f'all_probabilities__{prob_disease}__gt': prob_min})
+
+    return qs
+
+
+def keyset_page(qs, before=None, after=None, size=25):
+    """
+    One page of `qs`, newest first.
+    `before` — cursor of the last row on the current page (older page)
+    `after`  — cursor of the first row on the current page (newer page)
+    Returns dict with items, next_cursor (older) and prev_cursor (newer).
+    """
+    before_key = decode_cursor(before)
+    after_key = decode_cursor(after)
+
+    if after_key and not before_key:
+        when, pk = after_key
+        rows = list(
+            qs.filter(Q(detection_date__gt=when) | Q(detection_date=when, pk__gt=pk))
+            .order_by('detection_date', 'id')[:size + 1]
+        )
+        has_newer = len(rows) > size
+        items = rows[:size][::-1]
+        has_older = bool(items)
+    else:
+        if before_key:
+            when, pk = before_key
+            qs = qs.filter(Q(detection_date__lt=when) | Q(detection_date=when, pk__lt=pk))
+        rows = list(qs.order_by('-detection_date', '-id')[:size + 1])
+        has_older = len(rows) > size
+        items = rows[:size]
+        has_newer = before_key is not None and bool(items)
+
+    return {
+        'items': items,
+        'next_cursor': encode_cursor(items[-1]) if items and has_older else None,
+        'prev_cursor': encode_cursor(items[0]) if items and has_newer else None,
+    }
@@ -0,0 +1,36 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from .models import Detection, Patient
+
+
+class DetectionSerializer(serializers.ModelSerializer):
+    patient_id = serializers.CharField(source='patient.patient_id', read_only=True)
+    patient_name = serializers.CharField(source='patient.name', read_only=True)
+    disease_name = serializers.CharField(source='get_disease_display_name', read_only=True)
+    result_url = serializers.SerializerMethodField()
+    report_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Detection
+        fields = [
+            'detection_id', 'patient_id', 'patient_name', 'predicted_disease',
+            'disease_name', 'confidence_score', 'severity', 'all_probabilities',
+            'model_version', 'detection_date', 'result_url', 'report_url',
+        ]
+        read_only_fields = fields
+
+    def get_result_url(self, obj):
+        return reverse('result', args=[obj.detection_id])
+
+    def get_report_url(self, obj):
+        if not obj.report_pdf:
+            return None
+        return reverse('download_pdf', args=[obj.detection_id])
+
+
+class PatientSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Patient
+        fields = ['patient_id', 'name', 'age', 'gender', 'created_at']
+        read_only_fields = fields
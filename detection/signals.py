@@ -0,0 +1,134 @@
+"""
+Model signal handlers — keep the DailyDetectionStat rollup and StoredImage
+reference counts in step with the Detection table, and drop cached pages
+that show changed rows.
+Also applies the configured SQLite pragmas to each new connection.
+"""
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import stats
+from .caching import bump_stats_version, invalidate_results
+from .storage import add_reference, release_reference
+from .models import AnalysisText, Detection, Patient
+
+STAT_FIELDS = ('detection_date', 'predicted_disease', 'severity')
+
+SQLITE_JOURNAL_MODES = {'delete', 'truncate', 'persist', 'memory', 'wal', 'off'}
+SQLITE_SYNCHRONOUS_LEVELS = {'off', 'normal', 'full', 'extra'}
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    journal_mode = str(settings.SQLITE_JOURNAL_MODE).lower()
+    synchronous = str(settings.SQLITE_SYNCHRONOUS).lower()
+    with connection.cursor() as cursor:
+        if journal_mode in SQLITE_JOURNAL_MODES:
+            cursor.execute(f'PRAGMA journal_mode = {journal_mode}')
+        else:
+            print(f"[WARNING] Unknown SQLITE_JOURNAL_MODE {journal_mode!r} — left unchanged")
+        if synchronous in SQLITE_SYNCHRONOUS_LEVELS:
+            cursor.execute(f'PRAGMA synchronous = {synchronous}')
+        else:
+            print(f"[WARNING] Unknown SQLITE_SYNCHRONOUS {synchronous!r} — left unchanged")
+
+
+def _loaded_key(instance):
+    loaded = getattr(instance, '_loaded_stat_values', None) or {}
+    if not all(f in loaded for f in STAT_FIELDS):
+        return None
+    return (
+        timezone.localdate(loaded['detection_date']),
+        loaded['predicted_disease'],
+        loaded['severity'],
+    )
+
+
+@receiver(post_save, sender=Detection)
+def update_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.get_deferred_fields() & set(STAT_FIELDS):
+        return
+
+    new_key = stats.stat_key(instance)
+    if created:
+        stats.increment(new_key)
+    else:
+        old_key = _loaded_key(instance)
+        if old_key is not None and old_key != new_key:
+            stats.decrement(old_key)
+            stats.increment(new_key)
+
+    instance._loaded_stat_values = {f: getattr(instance, f) for f in STAT_FIELDS}
+
+
+@receiver(post_delete, sender=Detection)
+def update_stats_on_delete(sender, instance, **kwargs):
+    key = _loaded_key(instance)
+    if key is None and not (instance.get_deferred_fields() & set(STAT_FIELDS)):
+        key = stats.stat_key(instance)
+    if key is not None:
+        stats.decrement(key)
+
+
+@receiver(post_save, sender=Detection)
+def update_image_refs_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or 'image' in instance.get_deferred_fields():
+        return
+    name = instance.image.name or ''
+    old_name = None if created else getattr(instance, '_loaded_image', None)
+    if created or (old_name is not None and old_name != name):
+        if old_name:
+            release_reference(old_name)
+        add_reference(name)
+    instance._loaded_image = name
+
+
+@receiver(post_delete, sender=Detection)
+def update_image_refs_on_delete(sender, instance, **kwargs):
+    if 'image' not in instance.get_deferred_fields():
+        release_reference(instance.image.name)
+
+
+@receiver(post_save, sender=Detection)
+@receiver(post_delete, sender=Detection)
+def invalidate_detection_pages(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate_results([instance.detection_id])
+    bump_stats_version()
+
+
+@receiver(post_save, sender=Patient)
+def invalidate_patient_pages_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    # Result pages show the patient's name/age; a new patient has none yet
+    if not created:
+        invalidate_results(
+            instance.detections.values_list('detection_id', flat=True)
+        )
+    bump_stats_version()
+
+
+@receiver(post_save, sender=AnalysisText)
+def invalidate_analysis_pages_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    # Shared text: every detection pointing at it renders the edit
+    invalidate_results(
+        instance.detections.values_list('detection_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Patient)
+def invalidate_patient_pages_on_delete(sender, instance, **kwargs):
+    # Cascaded detection deletes invalidate their own result pages
+    bump_stats_version()
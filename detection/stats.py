@@ -0,0 +1,163 @@
+"""
+Detection statistics rollup.
+Maintains DailyDetectionStat (local day × disease × severity counts) as
+detections are created, edited or deleted, and serves the totals and
+distributions shown on the home page and dashboard from it.
+"""
+
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate, TruncDay, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import Detection, DailyDetectionStat
+
+
+def stat_key(detection):
+    """Rollup bucket (local day, disease, severity) for a detection."""
+    return (
+        timezone.localdate(detection.detection_date),
+        detection.predicted_disease,
+        detection.severity,
+    )
+
+
+def _bucket(key):
+    day, disease, severity = key
+    return DailyDetectionStat.objects.filter(
+        day=day, predicted_disease=disease, severity=severity
+    )
+
+
+def increment(key, amount=1):
+    """Add `amount` to a bucket, creating it if needed (safe under concurrency)."""
+    if _bucket(key).update(count=F('count') + amount):
+        return
+    day, disease, severity = key
+    try:
+        with transaction.atomic():
+            DailyDetectionStat.objects.create(
+                day=day, predicted_disease=disease, severity=severity, count=amount
+            )
+    except IntegrityError:
+        # Another writer created the bucket first
+        _bucket(key).update(count=F('count') + amount)
+
+
+def decrement(key, amount=1):
+    _bucket(key).filter(count__gte=amount).update(count=F('count') - amount)
+
+
+def rebuild():
+    """
+    Recompute the whole rollup from the Detection table in one grouped query.
+    Returns the number of buckets written.
+    """
+    rows = (
+        Detection.objects
+        .order_by()
+        .annotate(day=TruncDate('detection_date', tzinfo=timezone.get_current_timezone()))
+        .values('day', 'predicted_disease', 'severity')
+        .annotate(count=Count('id'))
+    )
+    stats = [
+        DailyDetectionStat(
+            day=r['day'], predicted_disease=r['predicted_disease'],
+            severity=r['severity'], count=r['count'],
+        )
+        for r in rows
+    ]
+    with transaction.atomic():
+        DailyDetectionStat.objects.all().delete()
+        DailyDetectionStat.objects.bulk_create(stats, batch_size=1000)
+    return len(stats)
+
+
+# ── Readers ───────────────────────────────────────────────────────────────
+
+def total_detections():
+    return DailyDetectionStat.objects.aggregate(total=Sum('count'))['total'] or 0
+
+
+def disease_distribution():
+    """[{'predicted_disease': ..., 'count': ...}] ordered by count, largest first."""
+    return list(
+        DailyDetectionStat.objects
+        .order_by()
+        .values('predicted_disease')
+        .annotate(count=Sum('count'))
+        .filter(count__gt=0)
+        .order_by('-count')
+    )
+
+
+def severity_distribution():
+    """[{'severity': ..., 'count': ...}]"""
+    return list(
+        DailyDetectionStat.objects
+        .order_by()
+        .values('severity')
+        .annotate(count=Sum('count'))
+        .filter(count__gt=0)
+        .order_by('severity')
+    )
+
+
+# granularity → (database truncation, chart label format)
+TREND_GRANULARITIES = {
+    'day': (TruncDay, '%d %b %y'),
+    'week': (TruncWeek, 'Wk %d %b %y'),
+    'month': (TruncMonth, '%b %Y'),
+}
+
+
+def _period_start(day, granularity):
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def _next_period(day, granularity):
+    if granularity == 'month':
+        return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+    if granularity == 'week':
+        return day + timedelta(days=7)
+    return day + timedelta(days=1)
+
+
+def detection_trend(days=180, granularity='month'):
+    """
+    Detection counts over the last `days` days, bucketed by day/week/month
+    in local time. Aggregated in the database from the daily rollup, so only
+    one row per period is read. Returns {label: count} in date order with
+    empty periods filled with 0 ({} when there is no data at all).
+    """
+    if granularity not in TREND_GRANULARITIES:
+        raise ValueError(f"Unknown trend granularity: {granularity!r}")
+    trunc, fmt = TREND_GRANULARITIES[granularity]
+
+    today = timezone.localdate()
+    start = today - timedelta(days=days)
+
+    rows = (
+        DailyDetectionStat.objects
+        .filter(day__gte=start)
+        .order_by()
+        .annotate(period=trunc('day'))
+        .values('period')
+        .annotate(count=Sum('count'))
+    )
+    counts = {r['period']: r['count'] for r in rows if r['count']}
+    if not counts:
+        return {}
+
+    trend = {}
+    period = _period_start(start, granularity)
+    while period <= today:
+        trend[period.strftime(fmt)] = counts.get(period, 0)
+        period = _next_period(period, granularity)
+    return trend
@@ -0,0 +1,152 @@
+"""
+Content-addressed image storage.
+
+Images are named by the SHA-256 of their bytes in sharded directories
+(images/ab/cd/<sha256>.jpg), so the same image uploaded twice is stored
+once. Each file is written to a temp file while it is hashed, then
+hard-linked into place; if the name already exists the copy is dropped.
+
+StoredImage rows count the detections that reference each file. Files with
+no references (webcam snapshots, deleted detections) are left for the
+media garbage collector.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+CHUNK_SIZE = 64 * 1024
+EXTENSION_ALIASES = {'.jpeg': '.jpg'}
+CAS_NAME_RE = re.compile(r'^images/[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})\.\w+$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that ignores the requested name and stores by content hash."""
+
+    prefix = 'images'
+
+    def name_for(self, digest, ext):
+        return f'{self.prefix}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+    def get_available_name(self, name, max_length=None):
+        # Same name means same bytes — never rename
+        return name
+
+    def _save(self, name, content):
+        ext = os.path.splitext(name)[1].lower() or '.jpg'
+        ext = EXTENSION_ALIASES.get(ext, ext)
+
+        tmp_dir = self.path(os.path.join(self.prefix, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir, suffix=ext)
+        try:
+            digest = hashlib.sha256()
+            if hasattr(content, 'seek'):
+                content.seek(0)
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    out.write(chunk)
+            # mkstemp creates 0600 files; match normal uploads
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+
+            name = self.name_for(digest.hexdigest(), ext)
+            full_path = self.path(name)
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            try:
+                os.link(tmp_path, full_path)
+            except FileExistsError:
+                # Already stored — refresh its mtime so media GC sees it in use
+                os.utime(full_path)
+            except OSError:
+                # Filesystem without hard links
+                if not os.path.exists(full_path):
+                    os.replace(tmp_path, full_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return name
+
+    def save_derivative(self, name, content):
+        """Write a file derived from a stored image under the exact `name`."""
+        full_path = self.path(name)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(full_path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    out.write(chunk)
+            os.chmod(tmp_path, self.file_permissions_mode or 0o644)
+            os.replace(tmp_path, full_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return name
+
+
+image_storage = ContentAddressedStorage()
+
+
+def get_image_storage():
+    return image_storage
+
+
+def digest_from_name(name):
+    """SHA-256 of a content-addressed image name, or None for legacy names."""
+    match = CAS_NAME_RE.match(str(name or ''))
+    return match.group(1) if match else None
+
+
+# ── Reference counts ──────────────────────────────────────────────────────
+
+def add_reference(name):
+    """Count one more detection using `name` (single upsert where supported)."""
+    digest = digest_from_name(name)
+    if digest is None:
+        return
+    from .models import StoredImage
+
+    now = timezone.now()
+    try:
+        size = image_storage.size(name)
+    except OSError:
+        size = 0
+
+    if connection.features.supports_update_conflicts_with_target:
+        table = connection.ops.quote_name(StoredImage._meta.db_table)
+        sql = (
+            f"INSERT INTO {table} (sha256, name, size, ref_count, created_at, updated_at) "
+            "VALUES (%s, %s, %s, 1, %s, %s) "
+            f"ON CONFLICT (sha256) DO UPDATE SET ref_count = {table}.ref_count + 1, "
+            "updated_at = excluded.updated_at"
+        )
+        stamp = connection.ops.adapt_datetimefield_value(now)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [digest, str(name), size, stamp, stamp])
+        return
+
+    if not StoredImage.objects.filter(sha256=digest).update(
+        ref_count=F('ref_count') + 1, updated_at=now
+    ):
+        StoredImage.objects.get_or_create(
+            sha256=digest,
+            defaults={'name': str(name), 'size': size, 'ref_count': 1},
+        )
+
+
+def release_reference(name):
+    """Count one fewer detection using `name`; the file is kept for GC."""
+    digest = digest_from_name(name)
+    if digest is None:
+        return
+    from .models import StoredImage
+
+    StoredImage.objects.filter(sha256=digest, ref_count__gt=0).update(
+        ref_count=F('ref_count') - 1, updated_at=timezone.now()
+    )
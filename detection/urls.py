@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import views, api
 
 urlpatterns = [
     path('',                              views.home,           name='home'),
@@ -12,4 +12,10 @@ urlpatterns = [
     path('history/',                      views.history,        name='history'),
     path('api/chat/',                     views.chat_api,       name='chat_api'),
     path('api/webcam-predict/',           views.webcam_predict, name='webcam_predict'),
+    path('api/detections/',               api.detection_list,   name='api_detections'),
+    path('api/patients/<str:patient_id>/timeline/', api.patient_timeline, name='api_patient_timeline'),
+    path('api/stats/',                    api.stats_summary,    name='api_stats'),
+    # No trailing slash: load balancer probes don't follow redirects
+    path('health',                        views.health,         name='health'),
+    path('ready',                         views.ready,          name='ready'),
 ]
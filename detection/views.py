@@ -1,13 +1,24 @@
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, FileResponse, Http404
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.template.loader import render_to_string
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+from django.views.decorators.cache import never_cache
 from django.views.decorators.csrf import csrf_exempt
 from django.core.files.storage import default_storage
-from django.db.models import Count
+from django.conf import settings
+from django.db import transaction
 import json
 import uuid
 import os
 
-from .models import Patient, Detection, ChatMessage
+from .models import Patient, Detection, ChatMessage, AnalysisText
+from . import stats
+from .caching import result_cache_key, stats_version
+from .queries import HISTORY_FIELDS, filter_detections, keyset_page
+from .ingest import InvalidImage, ensure_derivative, ingest_image
+from utils.predictor import InferenceBusy, ModelNotReady
 
 
 # ── Lazy load utilities to avoid startup crash if TF not installed ──────────
@@ -34,21 +45,22 @@ def generate_report(detection):
 # ── VIEWS ───────────────────────────────────────────────────────────────────
 
 def home(request):
-    total_patients = Patient.objects.count()
-    total_detections = Detection.objects.count()
+    # Values are lazy: while the cached hero-stats fragment is fresh the
+    # template never evaluates them and the page renders without queries
+    total_patients = SimpleLazyObject(Patient.objects.count)
+
+    # Counts come from the daily rollup, not a scan of Detection
+    total_detections = SimpleLazyObject(stats.total_detections)
 
     # Disease distribution for hero stats
-    disease_stats = (
-        Detection.objects
-        .values('predicted_disease')
-        .annotate(count=Count('id'))
-        .order_by('-count')
-    )
+    disease_stats = SimpleLazyObject(stats.disease_distribution)
 
     context = {
         'total_patients': total_patients,
         'total_detections': total_detections,
-        'disease_stats': list(disease_stats),
+        'disease_stats': disease_stats,
+        'stats_version': stats_version(),
+        'stats_cache_timeout': settings.STATS_CACHE_TIMEOUT,
     }
     return render(request, 'home.html', context)
 
@@ -59,12 +71,11 @@ def upload(request):
         if not eye_image:
             return render(request, 'upload.html', {'error': 'Please upload an eye image.'})
 
-        # Validate file type
-        allowed_types = ['image/jpeg', 'image/png', 'image/jpg', 'image/webp']
-        if eye_image.content_type not in allowed_types:
-            return render(request, 'upload.html', {
-                'error': 'Invalid file type. Please upload JPG, PNG, or WEBP.'
-            })
+        # Validate (by magic bytes), normalize and store the image once
+        try:
+            path, digest = ingest_image(eye_image)
+        except InvalidImage as e:
+            return render(request, 'upload.html', {'error': str(e)})
 
         # Patient info
         name = request.POST.get('patient_name', 'Anonymous').strip() or 'Anonymous'
@@ -72,50 +83,54 @@ def upload(request):
         gender = request.POST.get('patient_gender', 'O')
         phone = request.POST.get('patient_phone', '').strip()
 
-        # Save image
-        ext = os.path.splitext(eye_image.name)[1].lower() or '.jpg'
-        filename = f'uploads/{uuid.uuid4().hex}{ext}'
-        path = default_storage.save(filename, eye_image)
-        full_path = default_storage.path(path)
-
-        # Run prediction
+        # Run prediction on the model-size derivative (cached per image content)
         predictor = get_predictor()
-        pred = predictor.predict(full_path)
+        try:
+            pred = predictor.predict_cached(ensure_derivative(path), digest)
+        except InferenceBusy:
+            return render(request, 'upload.html', {
+                'error': 'The AI model is busy with other scans. Please try again in a few seconds.'
+            })
+        except ModelNotReady:
+            return render(request, 'upload.html', {
+                'error': 'The AI model is still starting up. Please try again in a moment.'
+            })
 
         # Run AI analysis
         analyze = get_analyzer()
         info = analyze(pred['disease'], pred['confidence'])
 
-        # Get or create patient
-        patient, _ = Patient.objects.get_or_create(
-            name=name,
-            defaults={'age': age, 'gender': gender, 'phone': phone}
-        )
-        if patient.age == 0 and age > 0:
+        # Find or create the patient in one upsert
+        patient, created = Patient.upsert(name, age=age, gender=gender, phone=phone)
+        if not created and patient.age == 0 and age > 0:
             patient.age = age
-            patient.save()
+            patient.save(update_fields=['age'])
 
-        # Create detection record
-        det = Detection.objects.create(
+        det = Detection(
             patient=patient,
             image=path,
             predicted_disease=pred['disease'],
             confidence_score=pred['confidence'],
             severity=pred['severity'],
-            english_explanation=info.get('english', ''),
-            tamil_explanation=info.get('tamil', ''),
-            symptoms=info.get('symptoms', ''),
-            causes=info.get('causes', ''),
-            treatment=info.get('treatment', ''),
-            prevention=info.get('prevention', ''),
-            disclaimer=info.get('disclaimer', ''),
-            all_probabilities=json.dumps(pred.get('all_probs', {})),
+            analysis=AnalysisText.intern(
+                english_explanation=info.get('english', ''),
+                tamil_explanation=info.get('tamil', ''),
+                symptoms=info.get('symptoms', []),
+                causes=info.get('causes', []),
+                treatment=info.get('treatment', []),
+                prevention=info.get('prevention', []),
+                disclaimer=info.get('disclaimer', ''),
+            ),
+            all_probabilities=pred.get('all_probs', {}),
+            model_version=pred.get('model_version', ''),
         )
 
-        # Generate PDF report
+        # Render the report before saving so the detection and its report
+        # path go in with a single INSERT (plus its stats rollup update)
         pdf_path = generate_report(det)
         if pdf_path:
             det.report_pdf = pdf_path.replace(str(default_storage.location) + '/', '')
+        with transaction.atomic():
             det.save()
 
         return redirect('result', detection_id=det.detection_id)
@@ -124,31 +139,28 @@ def upload(request):
 
 
 def result(request, detection_id):
-    det = get_object_or_404(Detection, detection_id=detection_id)
-
-    # Parse all probabilities
-    try:
-        all_probs = json.loads(det.all_probabilities) if det.all_probabilities else {}
-    except Exception:
-        all_probs = {}
-
-    # Format symptoms / causes / treatment / prevention as lists
-    def to_list(text):
-        if not text:
-            return []
-        lines = [l.strip().lstrip('•-*').strip() for l in text.split('\n') if l.strip()]
-        return lines
+    # Rendered pages are cached until the detection or its patient changes
+    cache_key = result_cache_key(detection_id)
+    html = cache.get(cache_key)
+    if html is not None:
+        return HttpResponse(html)
+
+    det = get_object_or_404(
+        Detection.objects.select_related('patient', 'analysis'), detection_id=detection_id
+    )
 
     context = {
         'det': det,
-        'all_probs': all_probs,
-        'symptoms_list': to_list(det.symptoms),
-        'causes_list': to_list(det.causes),
-        'treatment_list': to_list(det.treatment),
-        'prevention_list': to_list(det.prevention),
+        'all_probs': det.all_probabilities,
+        'symptoms_list': det.symptoms,
+        'causes_list': det.causes,
+        'treatment_list': det.treatment,
+        'prevention_list': det.prevention,
         'disease_name': det.predicted_disease.replace('_', ' ').title(),
     }
-    return render(request, 'result.html', context)
+    html = render_to_string('result.html', context, request)
+    cache.set(cache_key, html, settings.RESULT_CACHE_TIMEOUT)
+    return HttpResponse(html)
 
 
 def download_pdf(request, detection_id):
@@ -189,12 +201,24 @@ def webcam_predict(request):
         if not image_file:
             return JsonResponse({'error': 'No image provided'}, status=400)
 
-        filename = f'uploads/webcam_{uuid.uuid4().hex}.jpg'
-        path = default_storage.save(filename, image_file)
-        full_path = default_storage.path(path)
+        try:
+            path, digest = ingest_image(image_file)
+        except InvalidImage as e:
+            return JsonResponse({'error': str(e)}, status=400)
 
         predictor = get_predictor()
-        pred = predictor.predict(full_path)
+        try:
+            pred = predictor.predict_cached(
+                ensure_derivative(path), digest, tta_views=settings.WEBCAM_TTA_VIEWS
+            )
+        except InferenceBusy:
+            response = JsonResponse({'error': 'The AI model is busy. Please retry in a few seconds.'}, status=503)
+            response['Retry-After'] = '2'
+            return response
+        except ModelNotReady as e:
+            response = JsonResponse({'error': str(e)}, status=503)
+            response['Retry-After'] = '10'
+            return response
 
         return JsonResponse({
             'disease': pred['disease'],
@@ -202,6 +226,7 @@ def webcam_predict(request):
             'confidence': pred['confidence'],
             'severity': pred['severity'],
             'all_probs': pred.get('all_probs', {}),
+            'model_version': pred.get('model_version', ''),
         })
     return JsonResponse({'error': 'POST only'}, status=405)
 
@@ -248,38 +273,31 @@ def chat_api(request):
 
 
 def dashboard(request):
-    total = Detection.objects.count()
-    patients_total = Patient.objects.count()
+    # Lazy like home(): skipped entirely when the cached fragments are fresh
+    total = SimpleLazyObject(stats.total_detections)
+    patients_total = SimpleLazyObject(Patient.objects.count)
 
     # Disease distribution
-    disease_stats = list(
-        Detection.objects
-        .values('predicted_disease')
-        .annotate(count=Count('id'))
-        .order_by('-count')
-    )
+    disease_stats = SimpleLazyObject(stats.disease_distribution)
 
     # Severity distribution
-    severity_stats = list(
-        Detection.objects
-        .values('severity')
-        .annotate(count=Count('id'))
-    )
+    severity_stats = SimpleLazyObject(stats.severity_distribution)
 
     # Recent detections
     recent = Detection.objects.select_related('patient').all()[:15]
 
-    # Monthly trend (last 6 months)
-    from django.utils import timezone
-    from datetime import timedelta
-    import json as _json
-
-    six_months_ago = timezone.now() - timedelta(days=180)
-    monthly = {}
-    detections_range = Detection.objects.filter(detection_date__gte=six_months_ago)
-    for d in detections_range:
-        key = d.detection_date.strftime('%b %Y')
-        monthly[key] = monthly.get(key, 0) + 1
+    # Detection trend — aggregated in the database, range/granularity from query string
+    granularity = request.GET.get('granularity', settings.DASHBOARD_TREND_GRANULARITY)
+    if granularity not in stats.TREND_GRANULARITIES:
+        granularity = settings.DASHBOARD_TREND_GRANULARITY
+    try:
+        trend_days = int(request.GET.get('range', settings.DASHBOARD_TREND_DAYS))
+    except ValueError:
+        trend_days = settings.DASHBOARD_TREND_DAYS
+    trend_days = min(max(trend_days, 1), 3650)
+    trend_json = SimpleLazyObject(
+        lambda: json.dumps(stats.detection_trend(trend_days, granularity))
+    )
 
     context = {
         'total': total,
@@ -287,16 +305,85 @@ def dashboard(request):
         'disease_stats': disease_stats,
         'severity_stats': severity_stats,
         'recent': recent,
-        'monthly_json': _json.dumps(monthly),
-        'disease_json': _json.dumps({
+        'trend_json': trend_json,
+        'trend_granularity': granularity,
+        'trend_days': trend_days,
+        'trend_ranges': sorted({30, 90, 180, 365, trend_days}),
+        'disease_json': SimpleLazyObject(lambda: json.dumps({
             d['predicted_disease'].replace('_', ' ').title(): d['count']
             for d in disease_stats
-        }),
+        })),
+        'stats_version': stats_version(),
+        'stats_day': timezone.localdate().isoformat(),
+        'stats_cache_timeout': settings.STATS_CACHE_TIMEOUT,
     }
     return render(request, 'dashboard.html', context)
 
 
 def history(request):
-    """All detections list."""
-    detections = Detection.objects.select_related('patient').all()
-    return render(request, 'history.html', {'detections': detections})
+    """Detections list — filtered, keyset-paginated, only the shown columns."""
+    try:
+        per_page = min(max(int(request.GET.get('per_page', settings.HISTORY_PAGE_SIZE)), 1), 100)
+    except ValueError:
+        per_page = settings.HISTORY_PAGE_SIZE
+
+    qs = filter_detections(
+        request.GET,
+        Detection.objects.select_related('patient').only(*HISTORY_FIELDS),
+    )
+    page = keyset_page(
+        qs,
+        before=request.GET.get('before'),
+        after=request.GET.get('after'),
+        size=per_page,
+    )
+
+    # Filters are carried over to the older/newer links
+    filters = request.GET.copy()
+    for key in ('before', 'after'):
+        filters.pop(key, None)
+
+    context = {
+        'detections': page['items'],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor'],
+        'filter_query': filters.urlencode(),
+        'filters': request.GET,
+        'disease_choices': settings.DISEASE_CLASSES,
+        'severity_choices': Detection.SEVERITY_CHOICES,
+        'is_filtered': any(request.GET.get(k) for k in
+                           ('q', 'disease', 'severity', 'patient', 'date_from', 'date_to')),
+    }
+    return render(request, 'history.html', context)
+
+
+# ── Health checks ───────────────────────────────────────────────────────────
+
+def _predictor_status():
+    predictor = get_predictor()
+    try:
+        return predictor.status()
+    except (ModelNotReady, RuntimeError) as e:
+        # Inference worker down or not answering
+        return {'ready': False, 'mode': 'unavailable', 'error': str(e)}
+
+
+@never_cache
+def health(request):
+    """Liveness: the process answers. Includes the predictor's status."""
+    return JsonResponse({'status': 'ok', 'predictor': _predictor_status()})
+
+
+@never_cache
+def ready(request):
+    """Readiness: 200 once the model is loaded and warmed up, else 503."""
+    predictor = get_predictor()
+    predictor.start_loading()  # no-op once started; covers MODEL_PRELOAD=False
+    status = _predictor_status()
+    is_ready = status['ready'] and not (
+        settings.READY_REQUIRES_MODEL and status.get('mode') != 'model'
+    )
+    return JsonResponse(
+        {'status': 'ready' if is_ready else 'not ready', 'predictor': status},
+        status=200 if is_ready else 503,
+    )
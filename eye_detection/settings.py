@@ -23,6 +23,7 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
     'corsheaders',
+    'rest_framework',
     'detection',
 ]
 
@@ -58,12 +59,46 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'eye_detection.wsgi.application'
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Database — SQLite by default; set DB_ENGINE=postgresql for production.
+# Connections are kept open for DB_CONN_MAX_AGE seconds (0 = per request).
+DB_ENGINE = config('DB_ENGINE', default='sqlite')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': config('DB_NAME', default='eye_detect_db'),
+            'USER': config('DB_USER', default='postgres'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+            # Behind PgBouncer in transaction mode, server-side cursors
+            # (.iterator()) can't outlive a transaction
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_PGBOUNCER', default=False, cast=bool),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'OPTIONS': {
+                # Seconds a writer waits for the lock before "database is locked"
+                'timeout': config('SQLITE_TIMEOUT', default=20, cast=int),
+            },
+        }
     }
-}
+
+# SQLite pragmas applied to every new connection (see detection/signals.py).
+# WAL lets readers run alongside the single writer; NORMAL sync is safe in WAL.
+SQLITE_JOURNAL_MODE = config('SQLITE_JOURNAL_MODE', default='wal')
+SQLITE_SYNCHRONOUS = config('SQLITE_SYNCHRONOUS', default='normal')
 
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -92,15 +127,155 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # CORS
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Cache — per-process memory by default; set REDIS_URL to share cached pages
+# (and their invalidation) across gunicorn workers
+REDIS_URL = config('REDIS_URL', default='')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'eyedetect',
+            'OPTIONS': {'MAX_ENTRIES': 5000},
+        }
+    }
+# Seconds a rendered result page / home & dashboard fragment may be reused;
+# saves and deletes invalidate them earlier. Without REDIS_URL every worker
+# has its own cache and only the one that saved a change drops its copy, so
+# the defaults are kept short enough for other workers to catch up
+RESULT_CACHE_TIMEOUT = config('RESULT_CACHE_TIMEOUT', default=86400 if REDIS_URL else 15, cast=int)
+STATS_CACHE_TIMEOUT = config('STATS_CACHE_TIMEOUT', default=600 if REDIS_URL else 15, cast=int)
+
+# REST API — read-only JSON endpoints under /api/
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': ['rest_framework.renderers.JSONRenderer'],
+    'DEFAULT_AUTHENTICATION_CLASSES': [],
+    'UNAUTHENTICATED_USER': None,
+}
+# Seconds clients may reuse an API response before revalidating (ETag / 304)
+API_CACHE_MAX_AGE = config('API_CACHE_MAX_AGE', default=30, cast=int)
+
 # OpenAI
 OPENAI_API_KEY = config('OPENAI_API_KEY', default='')
 
-# ML Model path
+# Chatbot answer pipeline — stages run in this order until one answers
+# (the fallback stage always runs last)
+CHATBOT_PIPELINE_STAGES = config(
+    'CHATBOT_PIPELINE_STAGES',
+    default='cache,knowledge_base,llm,fallback',
+    cast=lambda v: [s.strip() for s in v.split(',') if s.strip()],
+)
+# Per-stage latency budgets in milliseconds: the LLM budget is its request
+# timeout; for the other stages slower runs are only counted (over_budget)
+CHATBOT_STAGE_BUDGETS_MS = {
+    'cache': 5,
+    'knowledge_base': 25,
+    'llm': config('CHATBOT_LLM_BUDGET_MS', default=8000, cast=int),
+    'fallback': 25,
+}
+CHATBOT_CACHE_TIMEOUT = config('CHATBOT_CACHE_TIMEOUT', default=3600, cast=int)
+# Share of a question's content words the knowledge base keywords (both
+# engines) must cover before a canned answer ends the pipeline (and is cached)
+CHATBOT_KB_MIN_CONFIDENCE = config('CHATBOT_KB_MIN_CONFIDENCE', default=0.6, cast=float)
+
+# Chat history write-behind buffer — turns are saved with bulk_create once
+# CHAT_BUFFER_MAX_SIZE turns are queued or every CHAT_BUFFER_FLUSH_INTERVAL seconds
+CHAT_BUFFER_ENABLED = config('CHAT_BUFFER_ENABLED', default=True, cast=bool)
+CHAT_BUFFER_MAX_SIZE = config('CHAT_BUFFER_MAX_SIZE', default=50, cast=int)
+CHAT_BUFFER_FLUSH_INTERVAL = config('CHAT_BUFFER_FLUSH_INTERVAL', default=2.0, cast=float)
+
+# Dashboard detection trend defaults (overridable with ?range=<days>&granularity=day|week|month)
+DASHBOARD_TREND_DAYS = 180
+DASHBOARD_TREND_GRANULARITY = 'month'
+
+# Detection history page size (?per_page= up to 100)
+HISTORY_PAGE_SIZE = 25
+
+# Chat history retention — sessions idle longer than this are moved to
+# gzipped JSONL archives by `manage.py prune_chat_messages`
+CHAT_RETENTION_DAYS = config('CHAT_RETENTION_DAYS', default=90, cast=int)
+CHAT_ARCHIVE_DIR = BASE_DIR / 'archive' / 'chat'
+
+# Media garbage collection (`manage.py gc_media`) — unreferenced images,
+# webcam snapshots and thumbnails are removed once this many days old;
+# report PDFs once untouched this long (they are regenerated on download)
+MEDIA_ORPHAN_RETENTION_DAYS = config('MEDIA_ORPHAN_RETENTION_DAYS', default=7, cast=int)
+MEDIA_REPORT_RETENTION_DAYS = config('MEDIA_REPORT_RETENTION_DAYS', default=90, cast=int)
+MEDIA_MANIFEST_PATH = BASE_DIR / 'archive' / 'media_manifest.json'
+
+# ML Model path — used until a version is activated in the registry
 ML_MODEL_PATH = BASE_DIR / 'ml_models' / 'eye_disease_model.h5'
+# Versioned models (`manage.py model_registry`); running workers check the
+# active version every MODEL_RELOAD_INTERVAL seconds (0 = never) and swap it in
+ML_MODEL_REGISTRY = Path(config('ML_MODEL_REGISTRY', default=str(BASE_DIR / 'ml_models' / 'registry')))
+MODEL_RELOAD_INTERVAL = config('MODEL_RELOAD_INTERVAL', default=5, cast=int)
+# Test-time augmentation: average this many flipped/cropped/brightness-shifted
+# views per prediction, scored in one batch (1 = off, max 8). Webcam frames
+# are often blurry or badly lit, so they can use more views than uploads.
+TTA_VIEWS = config('TTA_VIEWS', default=1, cast=int)
+WEBCAM_TTA_VIEWS = config('WEBCAM_TTA_VIEWS', default=1, cast=int)
+# Cascade mode (`manage.py model_registry triage <version>`): the triage
+# model's answer is served when it says 'normal' with at least this
+# probability and no disease class scores above CASCADE_MAX_DISEASE_PROB;
+# anything else escalates to the active model
+CASCADE_NORMAL_THRESHOLD = config('CASCADE_NORMAL_THRESHOLD', default=0.9, cast=float)
+CASCADE_MAX_DISEASE_PROB = config('CASCADE_MAX_DISEASE_PROB', default=0.05, cast=float)
+# Share of predictions also scored by the registry's shadow candidate
+# (`manage.py model_registry shadow <version>`), off the request path
+MODEL_SHADOW_SAMPLE_RATE = config('MODEL_SHADOW_SAMPLE_RATE', default=0.1, cast=float)
+
+# Load the model in a background thread when a server process starts;
+# predictions arriving earlier wait up to MODEL_READY_TIMEOUT seconds
+MODEL_PRELOAD = config('MODEL_PRELOAD', default=True, cast=bool)
+MODEL_READY_TIMEOUT = config('MODEL_READY_TIMEOUT', default=60, cast=int)
+# Dummy batch sizes run once after loading, before the worker reports ready
+MODEL_WARMUP_BATCH_SIZES = config(
+    'MODEL_WARMUP_BATCH_SIZES', default='1', cast=lambda v: [int(n) for n in v.split(',') if n.strip()]
+)
+# Report /ready as 503 while running in demo mode (no model file / TensorFlow)
+READY_REQUIRES_MODEL = config('READY_REQUIRES_MODEL', default=False, cast=bool)
+
+# TensorFlow CPU threading per process (0 = TF default, one thread per core).
+# With several gunicorn workers keep workers × intra-op threads ≈ cores;
+# `python bench_inference_threads.py` measures the combinations.
+TF_INTRA_OP_THREADS = config('TF_INTRA_OP_THREADS', default=0, cast=int)
+TF_INTER_OP_THREADS = config('TF_INTER_OP_THREADS', default=0, cast=int)
+# oneDNN (MKL) kernels: True/False sets TF_ENABLE_ONEDNN_OPTS, unset keeps TF's default
+TF_ENABLE_ONEDNN = config(
+    'TF_ENABLE_ONEDNN', default=None,
+    cast=lambda v: None if v in (None, '') else v.lower() in ('1', 'true', 'yes', 'on'),
+)
+# Model calls run at once per process, and how many more may wait before
+# requests are turned away with "try again"
+INFERENCE_CONCURRENCY = config('INFERENCE_CONCURRENCY', default=1, cast=int)
+INFERENCE_QUEUE_SIZE = config('INFERENCE_QUEUE_SIZE', default=16, cast=int)
+
+# Set to a Unix socket path (or host:port) to keep a single copy of the model
+# in `manage.py run_inference_worker` instead of one per web worker
+INFERENCE_SOCKET = config('INFERENCE_SOCKET', default='')
+# Seconds a web worker waits for the inference worker's answer
+INFERENCE_TIMEOUT = config('INFERENCE_TIMEOUT', default=90, cast=int)
+
+# Predictions are cached by image content hash for this long (seconds)
+PREDICTION_CACHE_TIMEOUT = config('PREDICTION_CACHE_TIMEOUT', default=7 * 86400, cast=int)
 
 # Disease categories (must match training folder names)
 DISEASE_CLASSES = ['cataract', 'diabetic_retinopathy', 'glaucoma', 'normal']
 
-# File upload size limit (50 MB)
+# Non-file request body limit (50 MB)
 DATA_UPLOAD_MAX_MEMORY_SIZE = 52428800
-FILE_UPLOAD_MAX_MEMORY_SIZE = 52428800
+# Files above this stream to a temp file instead of being held in memory
+FILE_UPLOAD_MAX_MEMORY_SIZE = 2621440
+
+# Image ingest (detection/ingest.py)
+IMAGE_UPLOAD_MAX_BYTES = config('IMAGE_UPLOAD_MAX_BYTES', default=52428800, cast=int)
+IMAGE_MAX_PIXELS = config('IMAGE_MAX_PIXELS', default=50_000_000, cast=int)
+IMAGE_ARCHIVE_MAX_SIDE = config('IMAGE_ARCHIVE_MAX_SIDE', default=1600, cast=int)
+IMAGE_ARCHIVE_QUALITY = config('IMAGE_ARCHIVE_QUALITY', default=90, cast=int)
+MODEL_INPUT_SIZE = 224
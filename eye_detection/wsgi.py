@@ -2,4 +2,5 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+os.environ.setdefault('EYEDETECT_SERVER', '1')  # preload the model (detection/apps.py)
 application = get_wsgi_application()
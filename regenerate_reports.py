@@ -14,7 +14,7 @@ print("REGENERATING DETECTION REPORTS - NEW ADVANCED FORMAT")
 print("="*70)
 
 # Find all existing detections
-detections = Detection.objects.all().order_by('-detection_date')
+detections = Detection.objects.select_related('patient', 'analysis').order_by('-detection_date')
 
 if not detections.exists():
     print("\n[INFO] No detections found in database. Run upload test first.")
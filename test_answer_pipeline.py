@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+"""Test the shared chatbot answer pipeline (stage order, early exit, metrics)"""
+import os
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+django.setup()
+
+from utils.answer_pipeline import (
+    AnswerPipeline, CacheStage, KnowledgeBaseStage, FallbackStage
+)
+from utils.realtime_chatbot import get_premium_response, get_pipeline
+
+print("\n" + "="*70)
+print("DR. EYEBOT - ANSWER PIPELINE TEST")
+print("="*70)
+
+# 1. Early exit: a knowledge base hit must skip the later stages
+print("\n[1] Early exit on knowledge base hit")
+calls = []
+
+
+def kb(message, language, history):
+    calls.append('kb')
+    return "kb answer" if 'glaucoma' in message else None
+
+
+def fallback(message, language, history):
+    calls.append('fallback')
+    return "fallback answer"
+
+
+pipeline = AnswerPipeline([
+    CacheStage('test'),
+    KnowledgeBaseStage(kb),
+    FallbackStage(fallback),
+], name='test')
+
+result = pipeline.run("What is glaucoma?")
+print(f"    Answered by: {result['stage']} in {result['latency_ms']} ms")
+print(f"    Timings: {result['timings']}")
+print("    ✅ Early exit" if result['stage'] == 'knowledge_base' and 'fallback' not in calls
+      else "    ❌ Later stages ran after a hit")
+
+# 2. Repeat question is served from cache
+print("\n[2] Repeat question served from cache")
+result = pipeline.run("what is   GLAUCOMA")
+print("    ✅ Cache hit" if result['stage'] == 'cache' else f"    ❌ Answered by {result['stage']}")
+
+# 3. Fallback answers are never cached
+print("\n[3] Fallback answers are not cached")
+pipeline.run("hello")
+result = pipeline.run("hello")
+print("    ✅ Not cached" if result['stage'] == 'fallback' else f"    ❌ Answered by {result['stage']}")
+
+# 4. Multi-turn questions bypass the cache
+print("\n[4] Session history bypasses the cache")
+history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+result = pipeline.run("What is glaucoma?", session_history=history)
+print("    ✅ Bypassed" if result['stage'] == 'knowledge_base' else f"    ❌ Answered by {result['stage']}")
+
+# 5. Stage metrics
+print("\n[5] Per-stage metrics")
+for name, st in pipeline.stats().items():
+    print(f"    {name:15s} calls={st['calls']} hits={st['hits']} "
+          f"avg={st['avg_ms']}ms share={st['hit_share']}")
+
+# 6. Premium engine runs through the same pipeline
+print("\n[6] Premium engine")
+response = get_premium_response("Tell me about cataract", language='en')
+print(f"    Response: {response[:60]}...")
+print(f"    Stages: {list(get_pipeline().stats().keys())}")
+
+# 7. Premium knowledge base only ends the pipeline on confident matches
+print("\n[7] Premium knowledge base ignores passing keyword mentions")
+for question in ("Can I wear contact lenses overnight?",
+                 "Does high blood pressure affect vision?",
+                 "What is cloud computing?"):
+    result = get_pipeline().run(question)
+    print(f"    {'✅' if result['stage'] != 'knowledge_base' else '❌'} "
+          f"{question!r} → {result['stage']}")
+result = get_pipeline().run("What is glaucoma?")
+print("    ✅ 'What is glaucoma?' → knowledge_base" if result['stage'] == 'knowledge_base'
+      else f"    ❌ 'What is glaucoma?' → {result['stage']}")
+
+print("\n" + "="*70 + "\n")
@@ -24,6 +24,8 @@ if os.path.exists(settings.ML_MODEL_PATH):
 # 2. Check predictor instance
 print(f"\n[2] Predictor Status:")
 print(f"    Predictor initialized: {predictor is not None}")
+predictor.wait_ready()
+print(f"    Ready: {predictor.is_ready}")
 print(f"    Model loaded: {predictor.model is not None}")
 if predictor.model is None:
     print(f"    Mode: DEMO (falls back gracefully)")
@@ -7,7 +7,7 @@ from PIL import Image as PILImage
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
 django.setup()
 
-from detection.models import Patient, Detection
+from detection.models import Patient, Detection, AnalysisText
 from utils.pdf_generator import generate_pdf
 from django.conf import settings
 
@@ -29,6 +29,16 @@ img = PILImage.new('RGB', (224, 224), color='blue')
 img.save(test_image_path, 'PNG')
 print(f"[2] Test image created: {test_image_path}")
 
+# Shared analysis text
+analysis = AnalysisText.intern(
+    english_explanation="Glaucoma is a group of eye diseases that damage the optic nerve due to elevated intraocular pressure. Early treatment can halt progression.",
+    tamil_explanation="கண் அழுத்த நோய் என்பது கண்ணினுள் அதிகரித்த அழுத்தம் பார்வை நரம்பை பாதிக்கும் ஒரு கண் நோய். ஆரம்பகால சிகிச்சை முக்கியம்.",
+    symptoms=["Gradual loss of peripheral vision", "Tunnel vision in advanced stages", "Severe eye pain", "Headache and nausea", "Halos around lights"],
+    causes=["Elevated intraocular pressure", "Family history", "Age above 60", "Thin cornea", "Steroid use"],
+    treatment=["Eye drop medications", "Laser trabeculoplasty", "Glaucoma surgery", "Regular monitoring"],
+    prevention=["Regular eye exams after age 40", "Know family history", "Exercise regularly", "Protect eyes from injury", "Take medications consistently"],
+)
+
 # Create a detection record
 detection, created = Detection.objects.get_or_create(
     detection_id="TEST001",
@@ -38,13 +48,8 @@ detection, created = Detection.objects.get_or_create(
         'predicted_disease': 'glaucoma',
         'confidence_score': 85.5,
         'severity': 'SEVERE',
-        'english_explanation': "Glaucoma is a group of eye diseases that damage the optic nerve due to elevated intraocular pressure. Early treatment can halt progression.",
-        'tamil_explanation': "கண் அழுத்த நோய் என்பது கண்ணினுள் அதிகரித்த அழுத்தம் பார்வை நரம்பை பாதிக்கும் ஒரு கண் நோய். ஆரம்பகால சிகிச்சை முக்கியம்.",
-        'symptoms': "Gradual loss of peripheral vision\nTunnel vision in advanced stages\nSevere eye pain\nHeadache and nausea\nHalos around lights",
-        'causes': "Elevated intraocular pressure\nFamily history\nAge above 60\nThin cornea\nSteroid use",
-        'treatment': "Eye drop medications\nLaser trabeculoplasty\nGlaucoma surgery\nRegular monitoring",
-        'prevention': "Regular eye exams after age 40\nKnow family history\nExercise regularly\nProtect eyes from injury\nTake medications consistently",
-        'all_probabilities': '{"glaucoma": 85.5, "cataract": 8.2, "diabetic_retinopathy": 4.1, "normal": 2.2}',
+        'analysis': analysis,
+        'all_probabilities': {"glaucoma": 85.5, "cataract": 8.2, "diabetic_retinopathy": 4.1, "normal": 2.2},
     }
 )
 print(f"[3] Detection created: {detection.detection_id}")
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+"""
+Test the number of SQL statements one upload costs.
+
+Runs against a throw-away SQLite database and media directory. A returning
+patient must be found with the single upsert statement, and the detection
+must be written (report path included) with one INSERT and no UPDATE.
+Exits with status 1 if an upload goes over budget.
+"""
+import io
+import os
+import shutil
+import sys
+import tempfile
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
+django.setup()
+
+from django.conf import settings
+
+# Never touch the real database or media — point both at a temp dir before
+# the first connection / storage access. Reports are written under ./media.
+tmpdir = tempfile.mkdtemp(prefix='eyedetect_upload_')
+settings.DATABASES['default']['NAME'] = os.path.join(tmpdir, 'test.sqlite3')
+settings.MEDIA_ROOT = os.path.join(tmpdir, 'media')
+os.chdir(tmpdir)
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+
+from detection.models import Detection, Patient
+
+# Patient upsert + analysis lookup + detection insert + rollup update +
+# image reference upsert, with one extra INSERT each the first time an
+# analysis or rollup bucket appears
+UPLOAD_QUERY_BUDGET = 7
+TRANSACTION_SQL = ('BEGIN', 'COMMIT', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+
+print("\n" + "="*70)
+print("UPLOAD QUERY COUNT TEST")
+print("="*70)
+
+call_command('migrate', verbosity=0)
+
+buf = io.BytesIO()
+Image.new('RGB', (300, 300), color='red').save(buf, 'JPEG')
+
+client = Client()
+failures = 0
+
+for i in range(1, 4):
+    with CaptureQueriesContext(connection) as ctx:
+        response = client.post('/upload/', {
+            'eye_image': SimpleUploadedFile('eye.jpg', buf.getvalue(), 'image/jpeg'),
+            'patient_name': 'Query  Test' if i == 2 else 'Query Test',
+            'patient_age': '40',
+        })
+    statements = [
+        q['sql'] for q in ctx.captured_queries
+        if not q['sql'].upper().startswith(TRANSACTION_SQL)
+    ]
+    patient_sql = [s for s in statements if '"detection_patient"' in s.split(' WHERE ')[0]]
+    detection_sql = [s for s in statements if s.startswith(('INSERT INTO "detection_detection"',
+                                                             'UPDATE "detection_detection"'))]
+
+    ok = (
+        response.status_code == 302
+        and len(statements) <= UPLOAD_QUERY_BUDGET
+        and len(patient_sql) == 1
+        and len(detection_sql) == 1 and detection_sql[0].startswith('INSERT')
+    )
+    failures += 0 if ok else 1
+    print(f"\n[{i}] Upload #{i}: HTTP {response.status_code}, {len(statements)} statement(s) "
+          f"(budget {UPLOAD_QUERY_BUDGET})")
+    for sql in statements:
+        print(f"    | {sql[:100]}")
+    print("    ✅ Within budget" if ok else "    ❌ Over budget or extra patient/detection writes")
+
+patients = Patient.objects.count()
+with_report = Detection.objects.exclude(report_pdf='').exclude(report_pdf__isnull=True).count()
+ok = patients == 1 and with_report == Detection.objects.count() == 3
+failures += 0 if ok else 1
+print(f"\n[4] {patients} patient(s), {with_report}/3 detection(s) saved with a report path")
+print("    ✅ Returning patient reused" if ok else "    ❌ Unexpected rows")
+
+connection.close()
+os.chdir(settings.BASE_DIR)
+shutil.rmtree(tmpdir, ignore_errors=True)
+
+print("\n" + "="*70)
+print(f"RESULT: {'PASS' if not failures else f'{failures} check(s) failed'}")
+print("="*70 + "\n")
+
+sys.exit(1 if failures else 0)
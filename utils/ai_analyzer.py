@@ -78,10 +78,23 @@ DISCLAIMER = (
 )
 
 
+SECTIONS = ('symptoms', 'causes', 'treatment', 'prevention')
+
+
+def to_list(value) -> list:
+    """Section content (list or newline-separated text) → list of clean points."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split('\n')
+    return [str(l).strip().lstrip('•-*').strip() for l in value if str(l).strip()]
+
+
 def analyze(disease: str, confidence: float) -> dict:
     """
     Generate bilingual medical analysis for the detected disease.
     Tries GPT-4 first, falls back to pre-written content.
+    Symptoms / causes / treatment / prevention are returned as lists.
     """
     if disease == 'normal':
         severity = 'MILD'
@@ -112,10 +125,10 @@ Respond ONLY with a valid JSON object using these EXACT keys:
 {{
   "english": "2-3 sentence clear patient-friendly explanation in English",
   "tamil": "Same explanation fully translated in Tamil script",
-  "symptoms": "5 symptoms, one per line (no bullets/numbers)",
-  "causes": "5 causes, one per line (no bullets/numbers)",
-  "treatment": "4 treatment options, one per line",
-  "prevention": "5 prevention tips, one per line",
+  "symptoms": ["5 symptoms, one short string each (no bullets/numbers)"],
+  "causes": ["5 causes, one short string each (no bullets/numbers)"],
+  "treatment": ["4 treatment options, one short string each"],
+  "prevention": ["5 prevention tips, one short string each"],
   "disclaimer": "Standard medical disclaimer"
 }}
 
@@ -136,6 +149,8 @@ Keep language simple for a general patient audience. Be accurate and compassiona
         data = json.loads(raw)
         data['severity'] = severity
         data.setdefault('disclaimer', DISCLAIMER)
+        for key in SECTIONS:
+            data[key] = to_list(data.get(key))
         return data
 
     except Exception as e:
@@ -146,10 +161,10 @@ Keep language simple for a general patient audience. Be accurate and compassiona
     return {
         'english': fb['english'],
         'tamil': fb['tamil'],
-        'symptoms': fb['symptoms'],
-        'causes': fb['causes'],
-        'treatment': fb['treatment'],
-        'prevention': fb['prevention'],
+        'symptoms': to_list(fb['symptoms']),
+        'causes': to_list(fb['causes']),
+        'treatment': to_list(fb['treatment']),
+        'prevention': to_list(fb['prevention']),
         'severity': severity,
         'disclaimer': DISCLAIMER,
     }
@@ -0,0 +1,319 @@
+"""
+Dr. EyeBot - Pluggable Answer Pipeline
+One ordered chain of answer stages (cache → knowledge base → LLM → fallback)
+shared by the simple and premium chatbot engines.
+
+The first stage that produces an answer ends the run. Per-stage
+call/hit/latency counters are kept so we can see where answers actually
+come from. Each stage has a latency budget: only the LLM stage enforces it
+(as the OpenAI request timeout); for the others it is a monitoring
+threshold, and runs that exceed it are counted in the stage's over_budget.
+"""
+
+import hashlib
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+
+
+DEFAULT_STAGE_ORDER = ['cache', 'knowledge_base', 'llm', 'fallback']
+
+# Latency budgets (ms): the LLM request timeout, and an over_budget
+# threshold for every stage
+DEFAULT_STAGE_BUDGETS_MS = {
+    'cache': 5,
+    'knowledge_base': 25,
+    'llm': 8000,
+    'fallback': 25,
+}
+
+
+def get_stage_budget_ms(name):
+    budgets = getattr(settings, 'CHATBOT_STAGE_BUDGETS_MS', {}) or {}
+    return budgets.get(name, DEFAULT_STAGE_BUDGETS_MS.get(name, 1000))
+
+
+def normalize_message(message):
+    """
+    Lower-case and collapse whitespace/punctuation for cache keys.
+    Only Unicode punctuation is dropped; combining marks (Tamil vowel
+    signs, virama) are part of the word and must stay.
+    """
+    text = unicodedata.normalize('NFC', (message or '').lower())
+    text = ''.join(' ' if unicodedata.category(c).startswith('P') else c for c in text)
+    return ' '.join(text.split())
+
+
+# ==================== SHARED OPENAI CLIENT ====================
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+
+
+def get_openai_client():
+    """
+    Return a process-wide OpenAI client, or None if no API key is configured.
+    The client keeps its HTTP connection pool between chat turns.
+    """
+    global _client, _client_key
+
+    api_key = getattr(settings, 'OPENAI_API_KEY', '')
+    if not api_key:
+        return None
+
+    with _client_lock:
+        if _client is None or _client_key != api_key:
+            from openai import OpenAI
+            _client = OpenAI(api_key=api_key)
+            _client_key = api_key
+        return _client
+
+
+def complete_chat(system_prompt, message, session_history=None, model='gpt-4',
+                  max_tokens=200, temperature=0.7, timeout=None, **extra):
+    """
+    Run one chat completion through the shared client.
+    Returns the answer text, or None if the API is unavailable or fails.
+    """
+    try:
+        client = get_openai_client()
+        if client is None:
+            return None
+
+        messages = [{"role": "system", "content": system_prompt}]
+        if session_history:
+            messages.extend(session_history)
+        messages.append({"role": "user", "content": message})
+
+        kwargs = dict(model=model, messages=messages,
+                      max_tokens=max_tokens, temperature=temperature, **extra)
+        if timeout:
+            kwargs['timeout'] = timeout
+
+        response = client.chat.completions.create(**kwargs)
+        return response.choices[0].message.content
+
+    except Exception as e:
+        print(f"[INFO] OpenAI API failed: {str(e)[:100]}")
+        return None
+
+
+# ==================== STAGES ====================
+
+class Stage:
+    """
+    Base answer stage. Subclasses implement answer(); returning a non-empty
+    string ends the pipeline, returning None passes to the next stage.
+    """
+    name = 'stage'
+
+    def __init__(self, budget_ms=None):
+        self.budget_ms = budget_ms if budget_ms is not None else get_stage_budget_ms(self.name)
+
+    def answer(self, query):
+        raise NotImplementedError
+
+
+class CacheStage(Stage):
+    """
+    Serve repeated first-turn questions from Django's cache.
+    Multi-turn questions are never cached because the answer depends on history.
+    """
+    name = 'cache'
+
+    def __init__(self, profile, timeout=None, budget_ms=None):
+        super().__init__(budget_ms)
+        self.profile = profile
+        self.timeout = timeout if timeout is not None else getattr(
+            settings, 'CHATBOT_CACHE_TIMEOUT', 3600)
+
+    def key(self, query):
+        if query.get('session_history'):
+            return None
+        text = normalize_message(query['message'])
+        if not text:
+            return None
+        digest = hashlib.md5(text.encode('utf-8')).hexdigest()
+        return f"chatbot:{self.profile}:{query['language']}:{digest}"
+
+    def answer(self, query):
+        key = self.key(query)
+        if key is None:
+            return None
+        from django.core.cache import cache
+        return cache.get(key)
+
+    def store(self, query, answer):
+        key = self.key(query)
+        if key is None or not answer:
+            return
+        from django.core.cache import cache
+        cache.set(key, answer, self.timeout)
+
+
+class KnowledgeBaseStage(Stage):
+    """Answer locally when the knowledge base has a confident keyword match."""
+    name = 'knowledge_base'
+
+    def __init__(self, lookup, budget_ms=None):
+        super().__init__(budget_ms)
+        self.lookup = lookup
+
+    def answer(self, query):
+        return self.lookup(query['message'], query['language'], query.get('session_history'))
+
+
+class LLMStage(Stage):
+    """Ask the OpenAI chat model; the stage budget becomes the request timeout."""
+    name = 'llm'
+
+    def __init__(self, build_prompt, model='gpt-4', max_tokens=200,
+                 temperature=0.7, history_limit=None, budget_ms=None, **extra):
+        super().__init__(budget_ms)
+        self.build_prompt = build_prompt
+        self.model = model
+        self.max_tokens = max_tokens
+        self.temperature = temperature
+        self.history_limit = history_limit
+        self.extra = extra
+
+    def answer(self, query):
+        history = query.get('session_history')
+        if history and self.history_limit:
+            history = history[-self.history_limit:]
+        return complete_chat(
+            self.build_prompt(query['language']),
+            query['message'],
+            session_history=history,
+            model=self.model,
+            max_tokens=self.max_tokens,
+            temperature=self.temperature,
+            timeout=self.budget_ms / 1000.0 if self.budget_ms else None,
+            **self.extra
+        )
+
+
+class FallbackStage(Stage):
+    """Last resort; must always return an answer."""
+    name = 'fallback'
+
+    def __init__(self, respond, budget_ms=None):
+        super().__init__(budget_ms)
+        self.respond = respond
+
+    def answer(self, query):
+        return self.respond(query['message'], query['language'], query.get('session_history'))
+
+
+# ==================== PIPELINE ====================
+
+class AnswerPipeline:
+    """
+    Ordered chain of stages with early exit and per-stage latency metrics.
+    """
+
+    def __init__(self, stages, name='chatbot'):
+        self.name = name
+        self.stages = list(stages)
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats = {
+                s.name: {'calls': 0, 'hits': 0, 'errors': 0, 'over_budget': 0, 'total_ms': 0.0}
+                for s in self.stages
+            }
+
+    def _record(self, stage, elapsed_ms, hit, error=False):
+        with self._lock:
+            st = self._stats.setdefault(
+                stage.name,
+                {'calls': 0, 'hits': 0, 'errors': 0, 'over_budget': 0, 'total_ms': 0.0}
+            )
+            st['calls'] += 1
+            st['total_ms'] += elapsed_ms
+            if hit:
+                st['hits'] += 1
+            if error:
+                st['errors'] += 1
+            if stage.budget_ms and elapsed_ms > stage.budget_ms:
+                st['over_budget'] += 1
+
+    def run(self, message, language='en', session_history=None):
+        """
+        Run the stages in order until one answers.
+        Returns dict with answer, stage, latency_ms and per-stage timings.
+        """
+        query = {
+            'message': message,
+            'language': language,
+            'session_history': session_history,
+        }
+        timings = {}
+        started = time.perf_counter()
+        answer = None
+        answered_by = None
+
+        for stage in self.stages:
+            t0 = time.perf_counter()
+            error = False
+            try:
+                answer = stage.answer(query)
+            except Exception as e:
+                print(f"[WARNING] {self.name} stage '{stage.name}' failed: {str(e)[:80]}")
+                answer = None
+                error = True
+            elapsed_ms = (time.perf_counter() - t0) * 1000
+            timings[stage.name] = round(elapsed_ms, 2)
+            self._record(stage, elapsed_ms, bool(answer), error)
+
+            if answer:
+                answered_by = stage.name
+                break
+
+        # Populate the cache with answers from the KB/LLM stages; fallback
+        # answers are not cached so a transient LLM outage does not stick
+        if answered_by and answered_by not in ('cache', 'fallback'):
+            for stage in self.stages:
+                if isinstance(stage, CacheStage):
+                    stage.store(query, answer)
+
+        return {
+            'answer': answer,
+            'stage': answered_by,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 2),
+            'timings': timings,
+        }
+
+    def answer(self, message, language='en', session_history=None):
+        return self.run(message, language, session_history)['answer']
+
+    def stats(self):
+        """Per-stage counters plus average latency and hit share."""
+        with self._lock:
+            total_hits = sum(s['hits'] for s in self._stats.values()) or 1
+            report = {}
+            for name, st in self._stats.items():
+                report[name] = dict(st)
+                report[name]['total_ms'] = round(st['total_ms'], 2)
+                report[name]['avg_ms'] = round(st['total_ms'] / st['calls'], 2) if st['calls'] else 0.0
+                report[name]['hit_share'] = round(st['hits'] / total_hits, 3)
+            return report
+
+
+def build_pipeline(name, available):
+    """
+    Assemble a pipeline from a {stage_name: Stage} mapping, ordered by
+    settings.CHATBOT_PIPELINE_STAGES. The fallback stage is always kept last
+    so every run produces an answer.
+    """
+    order = getattr(settings, 'CHATBOT_PIPELINE_STAGES', None) or DEFAULT_STAGE_ORDER
+    stages = [available[n] for n in order if n in available and n != 'fallback']
+    if 'fallback' in available:
+        stages.append(available['fallback'])
+    return AnswerPipeline(stages, name=name)
@@ -0,0 +1,116 @@
+"""
+Write-behind buffer for chatbot turns.
+Chat turns are queued in memory and written with one bulk_create per batch
+(on a size or time threshold, and at process exit) instead of one INSERT
+per request, so busy chat traffic doesn't queue up on SQLite write locks.
+"""
+
+import atexit
+import threading
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class ChatMessageBuffer:
+    """
+    Accumulates unsaved ChatMessage rows and flushes them from a background
+    thread. Turns not yet flushed are still visible through pending_for(),
+    so multi-turn context in the same process never misses a message.
+    """
+
+    def __init__(self, max_size=50, flush_interval=2.0):
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = None
+
+    def _ensure_worker(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name='chat-buffer-flush', daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        from django.db import connections
+
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            finally:
+                # This thread owns its own DB connection; don't leave it open
+                connections.close_all()
+
+    def add(self, session_id, message, response, language='en'):
+        """Queue one chat turn; returns immediately."""
+        from detection.models import ChatMessage
+
+        msg = ChatMessage(
+            session_id=session_id,
+            message=message,
+            response=response,
+            language=language,
+            timestamp=timezone.now(),
+        )
+        with self._lock:
+            self._pending.append(msg)
+            full = len(self._pending) >= self.max_size
+            self._ensure_worker()
+        if full:
+            self._wakeup.set()
+        return msg
+
+    def pending_for(self, session_id):
+        with self._lock:
+            return [m for m in self._pending if m.session_id == session_id]
+
+    def flush(self):
+        """Write all queued turns in one bulk_create. Returns rows written."""
+        from detection.models import ChatMessage
+
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                ChatMessage.objects.bulk_create(batch, batch_size=self.max_size)
+                return len(batch)
+            except Exception as e:
+                print(f"[WARNING] Chat buffer flush failed ({len(batch)} turns): {str(e)[:80]}")
+                # Put the batch back in front so the next flush retries it,
+                # but never hold more than a few batches in memory
+                with self._lock:
+                    self._pending = (batch + self._pending)[-self.max_size * 10:]
+                return 0
+
+    def close(self):
+        self._stopped = True
+        self._wakeup.set()
+        self.flush()
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_chat_buffer():
+    """Process-wide buffer, or None when write-behind is disabled."""
+    global _buffer
+    if not getattr(settings, 'CHAT_BUFFER_ENABLED', True):
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = ChatMessageBuffer(
+                max_size=getattr(settings, 'CHAT_BUFFER_MAX_SIZE', 50),
+                flush_interval=getattr(settings, 'CHAT_BUFFER_FLUSH_INTERVAL', 2.0),
+            )
+            atexit.register(_buffer.close)
+        return _buffer
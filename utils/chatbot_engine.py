@@ -3,8 +3,14 @@ Dr. EyeBot - Smart Bilingual Eye Health Chatbot
 Works with or without OpenAI API using intelligent fallback knowledge base
 """
 
+import random
+
 from django.conf import settings
-import re
+
+from utils.answer_pipeline import (
+    build_pipeline, complete_chat, normalize_message,
+    CacheStage, KnowledgeBaseStage, LLMStage, FallbackStage,
+)
 
 # Comprehensive Eye Health Knowledge Base
 KNOWLEDGE_BASE_EN = {
@@ -124,85 +130,143 @@ KNOWLEDGE_BASE_TA = {
 }
 
 
-def get_smart_response(message, language='en'):
+# Words that don't change which canned answer fits a question
+KB_STOPWORDS = {
+    'a', 'about', 'am', 'an', 'and', 'any', 'are', 'as', 'at', 'be', 'by', 'can',
+    'could', 'did', 'do', 'does', 'eye', 'eyes', 'for', 'from', 'get', 'has', 'have',
+    'how', 'i', 'if', 'in', 'is', 'it', 'its', 'me', 'my', 'of', 'on', 'or', 'please',
+    'should', 'so', 'some', 'tell', 'that', 'the', 'there', 'this', 'to', 'was',
+    'were', 'what', 'when', 'which', 'who', 'why', 'will', 'with', 'would', 'you', 'your',
+    'என்ன', 'எப்படி', 'ஏன்', 'எது', 'என்று', 'என்', 'எனக்கு', 'கண்', 'கண்கள்',
+    'கண்ணின்', 'கண்ணில்', 'பற்றி', 'உள்ளது', 'இருக்கிறது', 'சொல்லுங்கள்',
+}
+# Endings an English keyword may take and still match ('prevent' → 'prevention')
+KB_SUFFIXES = ('', 's', 'es', 'd', 'ed', 'ing', 'ion', 'ions', 'ment', 'ments')
+
+
+def _keyword_matches(word, keyword):
+    if keyword.isascii():
+        return any(word == keyword + suffix for suffix in KB_SUFFIXES)
+    # Tamil attaches case endings to the stem, so match on the prefix
+    return word.startswith(keyword)
+
+
+def score_keywords(message, keywords_by_category):
+    """
+    Best-matching category of `keywords_by_category` and the share of the
+    question's content words (stopwords aside) that the keywords cover,
+    from 0 to 1. Keywords match whole words, so 'red' doesn't match
+    'reduce'; multi-word keywords match as a phrase.
+    """
+    words = normalize_message(message).split()
+    content = {i for i, word in enumerate(words) if word not in KB_STOPWORDS}
+    if not content:
+        return None, 0.0
+
+    best, best_hits, covered = None, 0, set()
+    for category, keywords in keywords_by_category.items():
+        hits = set()
+        for keyword in keywords:
+            parts = keyword.split()
+            for i in range(len(words) - len(parts) + 1):
+                if words[i:i + len(parts) - 1] == parts[:-1] and \
+                        _keyword_matches(words[i + len(parts) - 1], parts[-1]):
+                    hits.update(range(i, i + len(parts)))
+        if len(hits & content) > best_hits:
+            best, best_hits = category, len(hits & content)
+        covered |= hits
+    return best, len(covered & content) / len(content)
+
+
+def score_knowledge_base(message, language='en'):
+    """score_keywords() against the knowledge base for `language`."""
+    kb = KNOWLEDGE_BASE_TA if language == 'ta' else KNOWLEDGE_BASE_EN
+    return score_keywords(message, {
+        category: data.get('keywords', []) for category, data in kb.items()
+    })
+
+
+def match_knowledge_base(message, language='en', session_history=None, min_confidence=None):
+    """
+    Return a knowledge base response if the message matches a category's
+    keywords and they cover at least min_confidence of it (default
+    CHATBOT_KB_MIN_CONFIDENCE), or None. A question like "symptoms of
+    glaucoma" is only half covered by the generic symptoms answer, so the
+    pipeline passes it on to the LLM.
+    """
+    if min_confidence is None:
+        min_confidence = settings.CHATBOT_KB_MIN_CONFIDENCE
+    category, confidence = score_knowledge_base(message, language)
+    if category is None or confidence < min_confidence:
+        return None
+    kb = KNOWLEDGE_BASE_TA if language == 'ta' else KNOWLEDGE_BASE_EN
+    return random.choice(kb[category]['responses'])
+
+
+def get_smart_response(message, language='en', session_history=None):
     """
     Get intelligent chatbot response using knowledge base.
     Matches keywords and returns contextual responses.
     """
-    kb = KNOWLEDGE_BASE_TA if language == 'ta' else KNOWLEDGE_BASE_EN
-    message_lower = message.lower()
-    
-    # Find matching category
-    for category, data in kb.items():
-        keywords = data.get('keywords', [])
-        if keywords:
-            if any(keyword in message_lower for keyword in keywords):
-                import random
-                return random.choice(data['responses'])
-    
+    # Last resort: any whole-word match beats the generic answer
+    response = match_knowledge_base(message, language, min_confidence=0.0)
+    if response:
+        return response
+
     # Default response
-    import random
+    kb = KNOWLEDGE_BASE_TA if language == 'ta' else KNOWLEDGE_BASE_EN
     return random.choice(kb['general']['responses'])
 
 
+def build_system_prompt(language='en'):
+    lang_name = 'Tamil' if language == 'ta' else 'English'
+    return (
+        f"You are Dr. EyeBot, a friendly and expert ophthalmology assistant. "
+        f"Answer ONLY eye health related questions. Be concise, warm, and practical. "
+        f"Always recommend consulting a certified ophthalmologist for diagnosis. "
+        f"Respond ENTIRELY in {lang_name}. "
+        f"Keep responses under 150 words."
+    )
+
+
 def get_openai_response(message, language='en', session_history=None):
     """
     Try to get response from OpenAI GPT-4.
     Returns None if API unavailable.
     """
-    try:
-        from openai import OpenAI
-        
-        api_key = settings.OPENAI_API_KEY
-        if not api_key or api_key == '':
-            return None  # No API key configured
-        
-        client = OpenAI(api_key=api_key)
-        
-        lang_name = 'Tamil' if language == 'ta' else 'English'
-        system_msg = (
-            f"You are Dr. EyeBot, a friendly and expert ophthalmology assistant. "
-            f"Answer ONLY eye health related questions. Be concise, warm, and practical. "
-            f"Always recommend consulting a certified ophthalmologist for diagnosis. "
-            f"Respond ENTIRELY in {lang_name}. "
-            f"Keep responses under 150 words."
-        )
-        
-        # Build message history
-        messages = [{"role": "system", "content": system_msg}]
-        if session_history:
-            messages.extend(session_history)
-        messages.append({"role": "user", "content": message})
-        
-        response = client.chat.completions.create(
-            model="gpt-4",
-            messages=messages,
-            max_tokens=200,
-            temperature=0.7
-        )
-        
-        return response.choices[0].message.content
-        
-    except Exception as e:
-        print(f"[INFO] OpenAI API failed: {str(e)[:100]}")
-        return None
+    return complete_chat(
+        build_system_prompt(language),
+        message,
+        session_history=session_history,
+        model="gpt-4",
+        max_tokens=200,
+        temperature=0.7,
+    )
+
+
+_pipeline = None
+
+
+def get_pipeline():
+    """Answer pipeline for the simple engine (built once per process)."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = build_pipeline('chatbot_engine', {
+            'cache': CacheStage('engine'),
+            'knowledge_base': KnowledgeBaseStage(match_knowledge_base),
+            'llm': LLMStage(build_system_prompt, model="gpt-4", max_tokens=200, temperature=0.7),
+            'fallback': FallbackStage(get_smart_response),
+        })
+    return _pipeline
 
 
 def get_chatbot_response(message, language='en', session_history=None):
     """
     Main chatbot response function.
-    Tries OpenAI first, falls back to knowledge base.
+    Runs the answer pipeline: cache, knowledge base, OpenAI, then fallback.
     """
     if not message or not message.strip():
         return "Please ask a question about eye health." if language == 'en' else "கண் ஆரோக்கியம் பற்றி கேட்கவும்."
-    
+
     message = message.strip()
-    
-    # Try OpenAI first
-    openai_response = get_openai_response(message, language, session_history)
-    if openai_response:
-        return openai_response
-    
-    # Fall back to knowledge base
-    kb_response = get_smart_response(message, language)
-    return kb_response
+    return get_pipeline().answer(message, language, session_history)
@@ -0,0 +1,228 @@
+"""
+Inference worker — one process owns the model, web workers send it requests.
+
+Every gunicorn worker that imports utils.predictor would otherwise hold its
+own TensorFlow runtime and copy of the ResNet50 weights. With INFERENCE_SOCKET
+set, `manage.py run_inference_worker` loads the model once, and the web
+workers' `predictor` becomes a RemotePredictor that forwards each prediction
+over a local socket (multiprocessing.connection, authenticated with a key
+derived from SECRET_KEY). Only the image path crosses the socket: both sides
+share MEDIA_ROOT.
+
+Messages are JSON objects sent as raw bytes (send_bytes/recv_bytes), never
+pickles, so a peer that gets hold of the key still cannot run code in the
+other process.
+
+INFERENCE_SOCKET is a Unix socket path (/run/eyedetect/inference.sock) or,
+where Unix sockets are unavailable, a loopback host:port.
+"""
+
+import hashlib
+import ipaddress
+import json
+import os
+import socket
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+
+# Requests and replies are small; anything larger is not ours
+MAX_MESSAGE_BYTES = 1 << 20
+
+
+def parse_address(value):
+    """'host:port' → (host, port); anything else is a Unix socket path."""
+    host, sep, port = str(value).rpartition(':')
+    if sep and port.isdigit() and host and os.sep not in host:
+        return host, int(port)
+    return str(value)
+
+
+def is_loopback(address):
+    """True for Unix socket paths and host:port addresses that resolve only to loopback."""
+    if isinstance(address, str):
+        return True
+    try:
+        infos = socket.getaddrinfo(address[0], address[1], proto=socket.IPPROTO_TCP)
+    except OSError:
+        return False
+    return all(ipaddress.ip_address(info[4][0].split('%')[0]).is_loopback for info in infos)
+
+
+def _authkey():
+    from django.conf import settings
+    return hashlib.sha256(f'inference:{settings.SECRET_KEY}'.encode()).digest()
+
+
+def send_message(conn, message):
+    conn.send_bytes(json.dumps(message).encode('utf-8'))
+
+
+def recv_message(conn):
+    """Next JSON message from `conn`; OSError if oversized, ValueError if malformed."""
+    return json.loads(conn.recv_bytes(MAX_MESSAGE_BYTES).decode('utf-8'))
+
+
+def _optional(value, kind):
+    if value is not None and (not isinstance(value, kind) or isinstance(value, bool)):
+        raise ValueError(f'Expected {kind.__name__} or null, got {type(value).__name__}')
+    return value
+
+
+# ── Server ────────────────────────────────────────────────────────────────
+
+class InferenceServer:
+    def __init__(self, address):
+        self.address = parse_address(address)
+        # Its InferenceExecutor bounds how many predictions run at once
+        self.predictor = EyePredictor(lazy=True)
+
+    def status(self):
+        return {**self.predictor.status(), 'pid': os.getpid()}
+
+    def handle(self, conn):
+        with conn:
+            while True:
+                try:
+                    request = recv_message(conn)
+                except (EOFError, OSError, ValueError):
+                    return  # closed, oversized or not JSON
+                try:
+                    op = request.get('op') if isinstance(request, dict) else None
+                    if op == 'predict':
+                        image_path = request.get('image_path')
+                        if not isinstance(image_path, str):
+                            raise ValueError('image_path must be a string')
+                        result = self.predictor.predict_cached(
+                            image_path,
+                            _optional(request.get('digest'), str),
+                            _optional(request.get('tta_views'), int),
+                        )
+                        reply = {'status': 'ok', 'result': result}
+                    elif op == 'status':
+                        reply = {'status': 'ok', 'result': self.status()}
+                    else:
+                        reply = {'status': 'error', 'error': f'Unknown operation {op!r}'}
+                except InferenceBusy as e:
+                    reply = {'status': 'busy', 'error': str(e)}
+                except ModelNotReady as e:
+                    reply = {'status': 'not_ready', 'error': str(e)}
+                except Exception as e:
+                    reply = {'status': 'error', 'error': str(e)[:200]}
+                try:
+                    send_message(conn, reply)
+                except (TypeError, ValueError) as e:
+                    # A result JSON can't carry
+                    send_message(conn, {'status': 'error', 'error': str(e)[:200]})
+                except (EOFError, OSError):
+                    return
+
+    def serve_forever(self):
+        if isinstance(self.address, str) and os.path.exists(self.address):
+            os.remove(self.address)  # left by a previous worker
+        self.predictor.start_loading()
+        with Listener(self.address, authkey=_authkey()) as listener:
+            if isinstance(self.address, str):
+                os.chmod(self.address, 0o660)
+            print(f"[OK] Inference worker {os.getpid()} listening on {self.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except OSError as e:
+                    # Includes failed authentication
+                    print(f"[WARNING] Rejected inference connection: {e}")
+                    continue
+                threading.Thread(target=self.handle, args=(conn,), daemon=True).start()
+
+
+# ── Client ────────────────────────────────────────────────────────────────
+
+class RemotePredictor:
+    """Drop-in for EyePredictor that forwards to the inference worker."""
+
+    def __init__(self, address):
+        self.address = parse_address(address)
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            try:
+                conn = Client(self.address, authkey=_authkey())
+            except OSError as e:
+                raise ModelNotReady('The inference worker is not reachable.') from e
+            self._local.conn = conn
+        return conn
+
+    def _drop_connection(self):
+        conn = getattr(self._local, 'conn', None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _call(self, op, **fields):
+        from django.conf import settings
+
+        for attempt in (1, 2):
+            conn = self._connection()
+            try:
+                send_message(conn, {'op': op, **fields})
+                if not conn.poll(settings.INFERENCE_TIMEOUT):
+                    # The reply would arrive on the next call otherwise
+                    self._drop_connection()
+                    raise ModelNotReady('The inference worker did not answer in time.')
+                reply = recv_message(conn)
+                break
+            except (EOFError, OSError):
+                # Worker restarted since this connection was opened
+                self._drop_connection()
+                if attempt == 2:
+                    raise ModelNotReady('The inference worker is not reachable.')
+            except ValueError:
+                self._drop_connection()
+                raise RuntimeError('Inference worker sent a malformed reply.')
+
+        status = reply.get('status') if isinstance(reply, dict) else None
+        if status == 'ok':
+            return reply.get('result')
+        if status == 'busy':
+            raise InferenceBusy(reply.get('error'))
+        if status == 'not_ready':
+            raise ModelNotReady(reply.get('error'))
+        error = reply.get('error') if isinstance(reply, dict) else reply
+        raise RuntimeError(f'Inference worker error: {error}')
+
+    def predict(self, image_path: str, tta_views: int = None) -> dict:
+        return self._call('predict', image_path=str(image_path), digest=None, tta_views=tta_views)
+
+    def predict_cached(self, image_path: str, digest: str = None, tta_views: int = None) -> dict:
+        return self._call('predict', image_path=str(image_path), digest=digest, tta_views=tta_views)
+
+    def status(self) -> dict:
+        return self._call('status')
+
+    @property
+    def is_ready(self) -> bool:
+        try:
+            return self.status()['ready']
+        except (ModelNotReady, RuntimeError):
+            return False
+
+    def start_loading(self):
+        """The inference worker loads the model itself."""
+
+    def wait_ready(self, timeout: float = None):
+        from django.conf import settings
+
+        deadline = time.monotonic() + (settings.MODEL_READY_TIMEOUT if timeout is None else timeout)
+        while not self.is_ready:
+            if time.monotonic() >= deadline:
+                raise ModelNotReady('The inference worker is not ready.')
+            time.sleep(0.2)
+
+
+# Imported last: utils.predictor imports RemotePredictor from this module
+from .predictor import EyePredictor, InferenceBusy, ModelNotReady  # noqa: E402
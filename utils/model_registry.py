@@ -0,0 +1,261 @@
+"""
+Model registry — versioned model artifacts and the pointer to the active one.
+
+Layout under ML_MODEL_REGISTRY (default ml_models/registry/):
+
+    registry/
+      ACTIVE                       name of the active version
+      SHADOW                       optional candidate scored in shadow mode
+      TRIAGE                       optional cheap model run first (cascade mode)
+      20261019-101500-3fa2c1d8/
+        model.h5                   the artifact, never modified once registered
+        metadata.json              classes, input size, backend, metrics, sha256
+
+Registering copies the artifact in. Activating rewrites ACTIVE atomically;
+running predictors notice within MODEL_RELOAD_INTERVAL seconds, load and
+warm up the new version in the background and then swap it in, so no
+request waits or fails during the switch. With no ACTIVE file the predictor
+keeps using ML_MODEL_PATH.
+
+    python manage.py model_registry register ml_models/eye_disease_model.h5 --activate
+    python manage.py model_registry list
+    python manage.py model_registry activate 20261019-101500-3fa2c1d8
+    python manage.py model_registry shadow 20261020-090000-77c0ffee
+    python manage.py model_registry triage 20261021-141000-5b1e9a02
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.utils import timezone
+
+ACTIVE_FILE = 'ACTIVE'
+SHADOW_FILE = 'SHADOW'
+TRIAGE_FILE = 'TRIAGE'
+METADATA_FILE = 'metadata.json'
+
+
+class RegistryError(ValueError):
+    """Raised for unknown versions and artifacts that don't fit this app."""
+
+
+def registry_dir():
+    return str(settings.ML_MODEL_REGISTRY)
+
+
+def _sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_atomic(path, text):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def read_class_info(path):
+    """classes / input size / metrics from a training run's class_info.json."""
+    with open(path, encoding='utf-8') as f:
+        info = json.load(f)
+    if info.get('class_names'):
+        classes = list(info['class_names'])
+    else:
+        indices = info.get('class_indices', {})
+        classes = sorted(indices, key=indices.get)
+    metrics = {
+        key: info[key] for key in ('test_accuracy', 'test_auc', 'val_accuracy')
+        if key in info
+    }
+    return {
+        'classes': classes,
+        'input_size': int(info.get('img_size', settings.MODEL_INPUT_SIZE)),
+        'architecture': info.get('model_type', ''),
+        'metrics': metrics,
+    }
+
+
+# ── Versions ──────────────────────────────────────────────────────────────
+
+def get_version(version):
+    """Metadata of a registered version, with 'path' to its artifact."""
+    version_dir = os.path.join(registry_dir(), os.path.basename(str(version)))
+    try:
+        with open(os.path.join(version_dir, METADATA_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError) as e:
+        raise RegistryError(f'Unknown model version {version!r}') from e
+    meta['path'] = os.path.join(version_dir, meta['file'])
+    return meta
+
+
+def list_versions():
+    root = registry_dir()
+    if not os.path.isdir(root):
+        return []
+    versions = []
+    for name in os.listdir(root):
+        if os.path.isfile(os.path.join(root, name, METADATA_FILE)):
+            versions.append(get_version(name))
+    return sorted(versions, key=lambda meta: meta['created_at'])
+
+
+def register(model_path, class_info_path=None, version=None, metrics=None):
+    """
+    Copy `model_path` into the registry as a new version and return its
+    metadata. The class info defaults to <model>.class_info.json, then
+    class_info.json, next to the model.
+    """
+    if not os.path.isfile(model_path):
+        raise RegistryError(f'No model file at {model_path}')
+    if class_info_path is None:
+        root = os.path.splitext(os.path.abspath(model_path))[0]
+        for candidate in (f'{root}.class_info.json',
+                          os.path.join(os.path.dirname(root), 'class_info.json')):
+            if os.path.exists(candidate):
+                class_info_path = candidate
+                break
+
+    info = read_class_info(class_info_path) if class_info_path else {
+        'classes': list(settings.DISEASE_CLASSES),
+        'input_size': settings.MODEL_INPUT_SIZE,
+        'architecture': '',
+        'metrics': {},
+    }
+    if sorted(info['classes']) != sorted(settings.DISEASE_CLASSES):
+        raise RegistryError(
+            f"Model classes {info['classes']} don't match DISEASE_CLASSES {settings.DISEASE_CLASSES}"
+        )
+
+    sha256 = _sha256(model_path)
+    created = timezone.now()
+    version = version or f"{created:%Y%m%d-%H%M%S}-{sha256[:8]}"
+    root = registry_dir()
+    version_dir = os.path.join(root, version)
+    if os.path.exists(version_dir):
+        raise RegistryError(f'Model version {version!r} already exists')
+
+    ext = os.path.splitext(model_path)[1] or '.h5'
+    meta = {
+        'version': version,
+        'file': f'model{ext}',
+        'sha256': sha256,
+        'size': os.path.getsize(model_path),
+        'classes': info['classes'],
+        'input_size': info['input_size'],
+        'backend': 'tensorflow',
+        'format': ext.lstrip('.'),
+        'architecture': info['architecture'],
+        'metrics': {**info['metrics'], **(metrics or {})},
+        'source': os.path.abspath(model_path),
+        'created_at': created.isoformat(),
+    }
+
+    # Build the version in a temp dir and rename it into place, so a
+    # half-copied version is never visible
+    os.makedirs(root, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=root, prefix='.incoming-')
+    try:
+        shutil.copyfile(model_path, os.path.join(tmp_dir, meta['file']))
+        with open(os.path.join(tmp_dir, METADATA_FILE), 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=2)
+        os.rename(tmp_dir, version_dir)
+    finally:
+        if os.path.exists(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    meta['path'] = os.path.join(version_dir, meta['file'])
+    return meta
+
+
+# ── Active and shadow versions ────────────────────────────────────────────
+
+def _read_pointer(name):
+    try:
+        with open(os.path.join(registry_dir(), name), encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def active_version():
+    """Name of the active version, or None when the registry isn't in use."""
+    return _read_pointer(ACTIVE_FILE)
+
+
+def activate(version):
+    """Point ACTIVE at `version`; running predictors pick it up on their own."""
+    meta = get_version(version)
+    if not os.path.isfile(meta['path']):
+        raise RegistryError(f"Artifact missing for model version {version!r}")
+    _write_atomic(os.path.join(registry_dir(), ACTIVE_FILE), meta['version'] + '\n')
+    return meta
+
+
+def shadow_version():
+    """Candidate version run in shadow mode (utils/shadow.py), or None."""
+    return _read_pointer(SHADOW_FILE)
+
+
+def _set_pointer(name, version):
+    path = os.path.join(registry_dir(), name)
+    if version is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return None
+    meta = get_version(version)
+    _write_atomic(path, meta['version'] + '\n')
+    return meta
+
+
+def set_shadow(version):
+    """Start shadowing `version`, or stop with None."""
+    return _set_pointer(SHADOW_FILE, version)
+
+
+def triage_version():
+    """Cheap model that screens out confident normals first (cascade mode), or None."""
+    return _read_pointer(TRIAGE_FILE)
+
+
+def set_triage(version):
+    """Put `version` in front of the active model, or turn the cascade off with None."""
+    return _set_pointer(TRIAGE_FILE, version)
+
+
+def legacy_metadata():
+    """Metadata for the single ML_MODEL_PATH file used without a registry."""
+    path = str(settings.ML_MODEL_PATH)
+    try:
+        st = os.stat(path)
+        version = f"legacy-{st.st_mtime_ns:x}-{st.st_size:x}"
+    except OSError:
+        version = 'legacy'
+    return {
+        'version': version,
+        'path': path,
+        'classes': list(settings.DISEASE_CLASSES),
+        'input_size': settings.MODEL_INPUT_SIZE,
+        'backend': 'tensorflow',
+        'metrics': {},
+    }
+
+
+def resolve_active():
+    """Metadata of the model the predictor should load."""
+    version = active_version()
+    if version is None:
+        return legacy_metadata()
+    return get_version(version)
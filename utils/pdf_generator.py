@@ -21,7 +21,6 @@ from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY, TA_RIGHT
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from PIL import Image as PILImage
-import json
 
 
 DISEASE_COLORS = {
@@ -70,9 +69,10 @@ class ConfidenceBar(Flowable):
         self.canv.rect(0, 0, self.max_width, self.height, fill=0, stroke=1)
 
 
-def get_image_thumbnail(image_path, max_width=2*inch, max_height=2*inch):
+def get_image_thumbnail(image_path, max_width=2*inch, max_height=2*inch, dpi=216):
     """
-    Load and resize image for embedding in PDF.
+    Load and resize image for embedding in PDF, keeping its aspect ratio
+    within max_width × max_height points at `dpi` resolution.
     Returns Image object or None if file not found.
     """
     try:
@@ -87,14 +87,17 @@ def get_image_thumbnail(image_path, max_width=2*inch, max_height=2*inch):
             rgb_img.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
             img = rgb_img
         
-        img.thumbnail((max_width, max_height), PILImage.Resampling.LANCZOS)
+        # Points are 1/72 inch; resample to `dpi` so the photo stays sharp
+        scale = dpi / 72
+        img.thumbnail((int(max_width * scale), int(max_height * scale)), PILImage.Resampling.LANCZOS)
         
         # Create a temporary resized version
         temp_path = image_path.replace('.jpg', '_thumb.jpg').replace('.png', '_thumb.jpg').replace('.webp', '_thumb.jpg')
         img.save(temp_path, 'JPEG', quality=85)
         
-        # Return ReportLab Image object
-        return Image(temp_path, width=max_width, height=max_height)
+        # Return ReportLab Image object, sized to fit without distortion
+        fit = min(max_width / img.width, max_height / img.height)
+        return Image(temp_path, width=img.width * fit, height=img.height * fit)
     except Exception as e:
         print(f"[WARNING] Image loading error: {e}")
         return None
@@ -106,7 +109,8 @@ def generate_pdf(detection) -> str:
     Includes patient photo, confidence metrics, and clinical recommendations.
     Returns the output file path.
     """
-    reports_dir = os.path.join('media', 'reports')
+    from django.conf import settings
+    reports_dir = os.path.join(settings.MEDIA_ROOT, 'reports')
     os.makedirs(reports_dir, exist_ok=True)
     filename = f'report_{detection.detection_id}.pdf'
     outpath = os.path.join(reports_dir, filename)
@@ -224,6 +228,7 @@ def generate_pdf(detection) -> str:
 
     # ── Patient Photo + Info Section ─────────────────────────────
     photo = None
+    # The stored original (EXIF-free, upright), not the square model input
     image_path = detection.image.path if detection.image else None
     if image_path and os.path.exists(image_path):
         photo = get_image_thumbnail(image_path, max_width=1.5*inch, max_height=1.5*inch)
@@ -291,13 +296,7 @@ def generate_pdf(detection) -> str:
     story.append(HRFlowable(width="100%", thickness=0.8, color=colors.HexColor('#c7d2fe')))
     story.append(Spacer(1, 0.05 * inch))
 
-    # Try to parse all probabilities
-    all_probs = {}
-    try:
-        if detection.all_probabilities:
-            all_probs = json.loads(detection.all_probabilities)
-    except:
-        pass
+    all_probs = detection.all_probabilities or {}
 
     # Create probability breakdown table
     prob_rows = [['Disease', 'Probability', '']]
@@ -344,16 +343,15 @@ def generate_pdf(detection) -> str:
         ("🛡️  Prevention & Care Tips", detection.prevention),
     ]
 
-    for heading, text_content in sections:
-        if text_content:
+    for heading, points in sections:
+        if points:
             story.append(KeepTogether([
                 Paragraph(heading, style_section_title),
                 HRFlowable(width="100%", thickness=0.8, color=colors.HexColor('#c7d2fe')),
                 Spacer(1, 0.04 * inch),
                 *[
-                    Paragraph(f"• {line.strip()}", style_bullet)
-                    for line in text_content.split('\n')
-                    if line.strip()
+                    Paragraph(f"• {point}", style_bullet)
+                    for point in points
                 ],
             ]))
             story.append(Spacer(1, 0.08 * inch))
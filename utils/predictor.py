@@ -2,12 +2,25 @@
 Eye Disease Prediction Engine
 Loads ResNet50-based model and predicts disease from eye images.
 Falls back to demo mode if model file not found.
+
+The module-level predictor loads lazily, so importing this module does not
+import TensorFlow; predictions wait for the model to finish loading.
 """
 
 import numpy as np
 from PIL import Image
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import glob
+import hashlib
 import os
 import json
+import tempfile
+import threading
+import time
+
+from .tta import MAX_VIEWS, average_probs, make_views
 
 CLASSES = ['cataract', 'diabetic_retinopathy', 'glaucoma', 'normal']
 
@@ -19,14 +32,31 @@ DISEASE_INFO = {
 }
 
 
+def _file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def fixed_model_path(model_path, digest):
+    """Where the patched copy of `model_path` with content hash `digest` is kept."""
+    root, ext = os.path.splitext(model_path)
+    return f"{root}.fixed-{digest[:16]}{ext or '.h5'}"
+
+
 def fix_model_config(model_path):
     """
     Fix deprecated batch_shape parameter in model config for Keras compatibility.
     Converts batch_shape to input_shape in InputLayer config.
+
+    The patched model is written once next to the original, named by the
+    original's SHA-256, and reused by later processes until the original
+    changes.
     """
     try:
         import h5py
-        import tempfile
         import shutil
         
         # Open the h5 file and check if it has model_config
@@ -51,6 +81,10 @@ def fix_model_config(model_path):
         
         if not need_fix:
             return model_path
+
+        fixed_path = fixed_model_path(model_path, _file_sha256(model_path))
+        if os.path.exists(fixed_path):
+            return fixed_path
         
         # Fix the config
         for layer in config['config']['layers']:
@@ -61,91 +95,496 @@ def fix_model_config(model_path):
                     if batch_shape and len(batch_shape) > 1:
                         layer_config['input_shape'] = batch_shape[1:]
         
-        # Create a temporary fixed model
-        with tempfile.NamedTemporaryFile(suffix='.h5', delete=False) as tmp:
-            tmp_path = tmp.name
-        
-        # Copy and fix the model
-        shutil.copy2(model_path, tmp_path)
-        
-        with h5py.File(tmp_path, 'r+') as f:
-            f.attrs['model_config'] = json.dumps(config).encode('utf-8')
-        
-        return tmp_path
+        # Copy and fix the model, then move it into place atomically so a
+        # concurrent worker never loads a half-written file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(fixed_path), suffix='.tmp')
+        os.close(fd)
+        try:
+            shutil.copyfile(model_path, tmp_path)
+            with h5py.File(tmp_path, 'r+') as f:
+                f.attrs['model_config'] = json.dumps(config).encode('utf-8')
+            os.replace(tmp_path, fixed_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        # Drop copies made for earlier versions of the model
+        root, ext = os.path.splitext(model_path)
+        for stale in glob.glob(f"{glob.escape(root)}.fixed-*{ext}"):
+            if stale != fixed_path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+
+        print(f"[OK] Fixed model config saved to {fixed_path}")
+        return fixed_path
         
     except Exception as e:
         print(f"[WARNING] Could not fix model config: {str(e)[:60]}")
         return model_path
 
 
+class ModelNotReady(RuntimeError):
+    """Raised when the model is still loading after MODEL_READY_TIMEOUT."""
+
+
+class InferenceBusy(RuntimeError):
+    """
+    Raised when INFERENCE_QUEUE_SIZE predictions are already waiting. The
+    model is loaded; callers should ask the client to retry shortly.
+    """
+
+
+def configure_tensorflow_env():
+    """Environment TF reads at import time (oneDNN); call before importing it."""
+    from django.conf import settings
+    if settings.TF_ENABLE_ONEDNN is not None:
+        os.environ['TF_ENABLE_ONEDNN_OPTS'] = '1' if settings.TF_ENABLE_ONEDNN else '0'
+
+
+def configure_tensorflow_threads(tf):
+    """Apply TF_INTRA_OP_THREADS / TF_INTER_OP_THREADS (0 keeps TF's default)."""
+    from django.conf import settings
+    try:
+        if settings.TF_INTRA_OP_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(settings.TF_INTRA_OP_THREADS)
+        if settings.TF_INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(settings.TF_INTER_OP_THREADS)
+    except RuntimeError as e:
+        # TF was already initialized in this process
+        print(f"[WARNING] Could not set TensorFlow threads: {str(e)[:80]}")
+
+
+class InferenceExecutor:
+    """
+    Runs model calls on INFERENCE_CONCURRENCY threads, so concurrent
+    requests in one worker don't all hit TF at once and oversubscribe the
+    cores. At most INFERENCE_QUEUE_SIZE calls may wait for a thread; past
+    that InferenceBusy is raised instead of queueing without bound.
+    """
+
+    def __init__(self, workers, queue_size):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inference')
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise InferenceBusy('Too many predictions in progress.')
+        try:
+            return self._pool.submit(fn, *args, **kwargs).result()
+        finally:
+            self._slots.release()
+
+
+def load_keras_model(tf, model_path):
+    """Load an .h5/.keras model, working around older Keras configs. None on failure."""
+    try:
+        # Try standard loading first
+        return tf.keras.models.load_model(model_path)
+    except Exception as e:
+        # Try alternative loading methods
+        try:
+            # Try with safe_mode=False (Keras 3.x)
+            return tf.keras.models.load_model(model_path, safe_mode=False)
+        except TypeError:
+            # Try without safe_mode for older versions
+            try:
+                fixed_path = fix_model_config(model_path)
+                return tf.keras.models.load_model(fixed_path)
+            except:
+                pass
+    return None
+
+
+def is_confident_normal(result, normal_threshold, max_disease_prob):
+    """
+    Whether a triage result may be served without the full model: 'normal'
+    with at least normal_threshold probability and no disease class above
+    max_disease_prob (both 0-1; result['all_probs'] is in percent).
+    """
+    if result.get('error') or result['disease'] != 'normal':
+        return False
+    probs = result['all_probs']
+    if probs.get('normal', 0) < normal_threshold * 100:
+        return False
+    return all(p <= max_disease_prob * 100 for cls, p in probs.items() if cls != 'normal')
+
+
+# A model and its registry metadata, swapped in as one reference so a
+# request never mixes one version's weights with another's classes
+LoadedModel = namedtuple('LoadedModel', ['model', 'meta'])
+
+DEMO_MODEL = LoadedModel(None, {'version': 'demo', 'classes': CLASSES, 'input_size': 224})
+
+
 class EyePredictor:
-    def __init__(self):
-        self.model = None
-        self._load_model()
+    """
+    With lazy=True nothing is loaded until start_loading() (called from
+    DetectionConfig.ready) or the first prediction; TensorFlow is then
+    imported and the model loaded and warmed up in a background thread.
+    is_ready tells whether that has finished — in demo mode too; status()
+    says which.
 
-    def _load_model(self):
+    The model comes from the registry's active version (utils/model_registry.py),
+    or ML_MODEL_PATH without one. When ACTIVE changes, the new version is
+    loaded and warmed up in the background while requests keep using the
+    old one, then swapped in.
+
+    With a registry TRIAGE version set, predictions run it first and only
+    escalate to the active model when it isn't a confident normal
+    (CASCADE_NORMAL_THRESHOLD / CASCADE_MAX_DISEASE_PROB).
+    """
+
+    def __init__(self, lazy=False):
+        self._current = DEMO_MODEL
+        self.backend = 'demo'
+        self.load_seconds = None
+        self.warmup_ms = {}
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._loader = None
+        self._executor = None
+        self._next_reload_check = 0.0
+        self._swapping = False
+        self._failed_version = None
+        self.shadow = None
+        self.triage = None
+        self._triage_version = None
+        self.cascade_counts = {'triage': 0, 'escalated': 0}
+        if not lazy:
+            self._load()
+
+    @property
+    def model(self):
+        return self._current.model
+
+    @property
+    def model_version(self) -> str:
+        return self._current.meta['version'] if self._current.model is not None else 'demo'
+
+    def _load(self):
+        started = time.perf_counter()
         try:
-            import tensorflow as tf
+            loaded = self._load_model(initial=True)
+            if loaded is not None:
+                self.warmup_ms = self.warm_up(loaded.model, loaded.meta.get('input_size'))
+                self._current = loaded
+                self._sync_triage(background=False)
+            self._sync_shadow()
+        finally:
+            self.load_seconds = round(time.perf_counter() - started, 2)
+            self._ready.set()
+        print(f"[OK] Predictor ready in {self.load_seconds:.1f}s")
+
+    def warm_up(self, model=None, size=None):
+        """
+        Run a dummy batch of each MODEL_WARMUP_BATCH_SIZES size, so graph
+        building and kernel setup happen before the first real request.
+        Returns the latency of the last (warm) run per batch size.
+        """
+        model = model if model is not None else self.model
+        if model is None:
+            return {}
+        from django.conf import settings
+        size = size or settings.MODEL_INPUT_SIZE
+        timings = {}
+        # TTA requests run batches of their view count
+        batches = set(settings.MODEL_WARMUP_BATCH_SIZES)
+        batches |= {min(v, MAX_VIEWS) for v in (settings.TTA_VIEWS, settings.WEBCAM_TTA_VIEWS) if v > 1}
+        for batch in sorted(batches):
+            dummy = np.zeros((batch, size, size, 3), dtype=np.float32)
+            try:
+                for _ in range(2):  # the first run traces, the second is timed
+                    started = time.perf_counter()
+                    self._executor.run(model.predict, dummy, batch_size=batch, verbose=0)
+                timings[batch] = round((time.perf_counter() - started) * 1000, 1)
+            except Exception as e:
+                print(f"[WARNING] Warm-up with batch size {batch} failed: {str(e)[:80]}")
+        return timings
+
+    def status(self) -> dict:
+        """Readiness details for the /health and /ready endpoints."""
+        ready = self._ready.is_set()
+        return {
+            'ready': ready,
+            'mode': ('model' if self.model is not None else 'demo') if ready else 'loading',
+            'backend': self.backend,
+            'model_version': self.model_version if ready else None,
+            'swapping': self._swapping,
+            'shadow_version': self.shadow.version if self.shadow else None,
+            'triage_version': self.triage.meta['version'] if self.triage else None,
+            'cascade': dict(self.cascade_counts),
+            'load_seconds': self.load_seconds,
+            'warmup_ms': {str(batch): ms for batch, ms in self.warmup_ms.items()},
+        }
+
+    def start_loading(self):
+        """Start loading the model in a background thread, once."""
+        with self._lock:
+            if self._ready.is_set() or (self._loader is not None and self._loader.is_alive()):
+                return
+            self._loader = threading.Thread(target=self._load, name='model-loader', daemon=True)
+            self._loader.start()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: float = None):
+        """Block until the model is loaded; raises ModelNotReady on timeout."""
+        if self._ready.is_set():
+            return
+        # Also restarts loading in a forked worker whose loader thread was lost
+        self.start_loading()
+        if timeout is None:
             from django.conf import settings
-            model_path = str(settings.ML_MODEL_PATH)
+            timeout = settings.MODEL_READY_TIMEOUT
+        if not self._ready.wait(timeout):
+            raise ModelNotReady('The prediction model is still loading.')
+
+    def _load_model(self, meta=None, initial=False):
+        """Load the active (or given) registry version; None means demo mode."""
+        from django.conf import settings
+        from . import model_registry
+        try:
+            if initial:
+                configure_tensorflow_env()
+            import tensorflow as tf
+            if initial:
+                configure_tensorflow_threads(tf)
+            meta = meta or model_registry.resolve_active()
+            model_path = meta['path']
 
             if os.path.exists(model_path):
-                try:
-                    # Try standard loading first
-                    self.model = tf.keras.models.load_model(model_path)
-                except Exception as e:
-                    # Try alternative loading methods
-                    try:
-                        # Try with safe_mode=False (Keras 3.x)
-                        self.model = tf.keras.models.load_model(model_path, safe_mode=False)
-                    except TypeError:
-                        # Try without safe_mode for older versions
-                        try:
-                            fixed_path = fix_model_config(model_path)
-                            self.model = tf.keras.models.load_model(fixed_path)
-                        except:
-                            pass
-                
-                if self.model is not None:
-                    print(f"[OK] Eye disease model loaded from {model_path}")
-                else:
-                    print(f"[WARNING] Model could not be deserialized - running DEMO mode")
+                model = load_keras_model(tf, model_path)
+                if model is not None:
+                    self.backend = f"tensorflow {tf.__version__}"
+                    if self._executor is None:
+                        self._executor = InferenceExecutor(
+                            settings.INFERENCE_CONCURRENCY, settings.INFERENCE_QUEUE_SIZE
+                        )
+                    print(f"[OK] Eye disease model {meta['version']} loaded from {model_path}")
+                    return LoadedModel(model, meta)
+                print(f"[WARNING] Model could not be deserialized - running DEMO mode")
             else:
                 print(f"[WARNING] Model file not found at {model_path} - running DEMO mode")
         except ImportError:
             print("[WARNING] TensorFlow not installed - running DEMO mode")
         except Exception as e:
             print(f"[WARNING] Model load error: {str(e)[:80]} - running DEMO mode")
+        return None
+
+    # ── Hot swap ──────────────────────────────────────────────────────────
+
+    def _maybe_swap(self):
+        """Every MODEL_RELOAD_INTERVAL seconds, start loading a newly activated version."""
+        from django.conf import settings
+        from . import model_registry
+
+        interval = settings.MODEL_RELOAD_INTERVAL
+        now = time.monotonic()
+        if interval <= 0 or now < self._next_reload_check:
+            return
+        self._next_reload_check = now + interval
 
-    def predict(self, image_path: str) -> dict:
+        self._sync_shadow()
+        if self.model is not None:
+            self._sync_triage()
+        version = model_registry.active_version()
+        if version is None or version in (self.model_version, self._failed_version):
+            return
+        with self._lock:
+            if self._swapping:
+                return
+            self._swapping = True
+        threading.Thread(target=self._swap, args=(version,), name='model-swap', daemon=True).start()
+
+    def _swap(self, version):
+        from . import model_registry
+        try:
+            loaded = self._load_model(model_registry.get_version(version))
+            if loaded is None:
+                self._failed_version = version
+                print(f"[WARNING] Keeping model {self.model_version}; {version} failed to load")
+                return
+            self.warmup_ms = self.warm_up(loaded.model, loaded.meta.get('input_size'))
+            previous, self._current = self.model_version, loaded
+            self._failed_version = None
+            print(f"[OK] Swapped model {previous} -> {version}")
+        except model_registry.RegistryError as e:
+            self._failed_version = version
+            print(f"[WARNING] {e}")
+        finally:
+            self._swapping = False
+
+    def _sync_shadow(self):
+        """Follow the registry's SHADOW pointer (see utils/shadow.py)."""
+        from django.conf import settings
+        from . import model_registry
+        from .shadow import ShadowRunner
+
+        version = model_registry.shadow_version()
+        if version == self.model_version or settings.MODEL_SHADOW_SAMPLE_RATE <= 0:
+            version = None
+        if version == (self.shadow.version if self.shadow else None):
+            return
+        previous, self.shadow = self.shadow, None
+        if previous:
+            previous.stop()
+        if version:
+            self.shadow = ShadowRunner(self, version, settings.MODEL_SHADOW_SAMPLE_RATE)
+            print(f"[OK] Shadowing {settings.MODEL_SHADOW_SAMPLE_RATE:.0%} of predictions with {version}")
+
+    def _sync_triage(self, background=True):
+        """Follow the registry's TRIAGE pointer (cascade mode)."""
+        from . import model_registry
+
+        version = model_registry.triage_version()
+        with self._lock:
+            if version == self._triage_version:
+                return
+            self._triage_version = version
+        if version is None:
+            if self.triage is not None:
+                print("[OK] Cascade off")
+            self.triage = None
+        elif background:
+            threading.Thread(
+                target=self._load_triage, args=(version,), name='model-triage', daemon=True
+            ).start()
+        else:
+            self._load_triage(version)
+
+    def _load_triage(self, version):
+        from . import model_registry
+        try:
+            loaded = self._load_model(model_registry.get_version(version))
+        except model_registry.RegistryError as e:
+            print(f"[WARNING] Cascade disabled: {e}")
+            return
+        if loaded is None:
+            print(f"[WARNING] Triage model {version} could not be loaded - cascade disabled")
+            return
+        self.warm_up(loaded.model, loaded.meta.get('input_size'))
+        # The pointer may have moved on while this version was loading
+        if self._triage_version == version:
+            self.triage = loaded
+            print(f"[OK] Cascade on: triage model {version} screens confident normals")
+
+    def _shadow(self, image_path, result, started, digest=None, views=1):
+        shadow = self.shadow
+        if shadow is not None and not result.get('error'):
+            shadow.submit(image_path, result, (time.perf_counter() - started) * 1000, digest, views)
+
+    # ── Prediction ────────────────────────────────────────────────────────
+
+    def predict_cached(self, image_path: str, digest: str = None, tta_views: int = None) -> dict:
+        """
+        predict(), memoized by the image's content hash (see
+        detection/storage.py), the model version and the TTA view count,
+        plus the triage version and cascade thresholds in cascade mode.
+        Failed predictions are not cached.
+        """
+        if not digest:
+            return self.predict(image_path, tta_views)
+        self.wait_ready()
+        self._maybe_swap()
+        from django.conf import settings
+        from django.core.cache import cache
+
+        views = self._tta_views(tta_views)
+        current, triage = self._current, self.triage
+        version = current.meta['version'] if current.model is not None else 'demo'
+        key = f'pred:{version}:{digest}' + (f':tta{views}' if views > 1 else '')
+        if triage is not None and current.model is not None:
+            # Changing a threshold changes which images the triage model answers
+            key += (f":tri-{triage.meta['version']}"
+                    f"-{settings.CASCADE_NORMAL_THRESHOLD:g}-{settings.CASCADE_MAX_DISEASE_PROB:g}")
+        result = cache.get(key)
+        if result is None:
+            started = time.perf_counter()
+            result = self._cascade(image_path, current, triage, views)
+            self._shadow(image_path, result, started, digest, views)
+            if not result.get('error'):
+                cache.set(key, result, settings.PREDICTION_CACHE_TIMEOUT)
+        return result
+
+    def predict(self, image_path: str, tta_views: int = None) -> dict:
         """
         Predict eye disease from an image file path.
-        Returns: dict with disease, confidence, severity, all_probs
+        tta_views > 1 averages that many augmented views (utils/tta.py),
+        scored in one batch; defaults to TTA_VIEWS.
+        Returns: dict with disease, confidence, severity, all_probs and
+        model_version (plus error=True if the image could not be processed).
+        Raises ModelNotReady if the model does not finish loading in time.
         """
+        self.wait_ready()
+        self._maybe_swap()
+        views = self._tta_views(tta_views)
+        started = time.perf_counter()
+        result = self._cascade(image_path, self._current, self.triage, views)
+        self._shadow(image_path, result, started, views=views)
+        return result
+
+    def _tta_views(self, tta_views):
+        from django.conf import settings
+        views = settings.TTA_VIEWS if tta_views is None else tta_views
+        return max(1, min(int(views), MAX_VIEWS))
+
+    def _cascade(self, image_path, current, triage, views):
+        """Serve confident normals from `triage`; everything else goes to `current`."""
+        if triage is None or current.model is None:
+            return self._predict(image_path, current, views=views)
+        from django.conf import settings
+
+        result = self._predict(image_path, triage, views=views)
+        stage = 'triage' if is_confident_normal(
+            result, settings.CASCADE_NORMAL_THRESHOLD, settings.CASCADE_MAX_DISEASE_PROB
+        ) else 'escalated'
+        if stage == 'escalated':
+            result = self._predict(image_path, current, views=views)
+        result['cascade'] = stage
+        with self._lock:
+            self.cascade_counts[stage] += 1
+        return result
+
+    def _predict(self, image_path, current, direct=False, views=1):
+        """Score one image with `current` (a LoadedModel); direct skips the executor."""
+        model, meta = current
+        classes = meta['classes'] if model is not None else CLASSES
+        size = meta.get('input_size', 224)
+        failed = False
         try:
             img = Image.open(image_path).convert('RGB')
-            img = img.resize((224, 224), Image.Resampling.LANCZOS)
+            img = img.resize((size, size), Image.Resampling.LANCZOS)
             arr = np.array(img, dtype=np.float32) / 255.0
-            arr = np.expand_dims(arr, axis=0)
 
-            if self.model is not None:
-                probs = self.model.predict(arr, verbose=0)[0]
+            if model is not None:
+                # One forward pass over all views
+                batch = make_views(arr, views) if views > 1 else np.expand_dims(arr, axis=0)
+                run = model.predict if direct else partial(self._executor.run, model.predict)
+                probs = average_probs(run(batch, batch_size=len(batch), verbose=0))
                 idx = int(np.argmax(probs))
                 conf = float(probs[idx]) * 100
             else:
                 # Demo mode — simulate realistic probabilities
-                probs = np.random.dirichlet(np.ones(4) * 0.5)
+                probs = np.random.dirichlet(np.ones(len(classes)) * 0.5)
                 idx = int(np.argmax(probs))
                 conf = float(probs[idx]) * 100
 
+        except (ModelNotReady, InferenceBusy):
+            raise
         except Exception as e:
             print(f"Prediction error: {e}")
+            failed = True
             # Safe fallback
+            classes = CLASSES
             idx = 0
             conf = 78.5
             probs = np.array([0.785, 0.1, 0.08, 0.035])
 
-        disease = CLASSES[idx]
+        disease = classes[idx]
 
         # Determine severity
         if disease == 'normal':
@@ -158,18 +597,33 @@ class EyePredictor:
             severity = 'MILD'
 
         all_probs = {
-            CLASSES[i]: round(float(probs[i]) * 100, 2)
-            for i in range(4)
+            classes[i]: round(float(probs[i]) * 100, 2)
+            for i in range(len(classes))
         }
 
-        return {
+        result = {
             'disease': disease,
             'confidence': round(conf, 2),
             'severity': severity,
             'all_probs': all_probs,
             'info': DISEASE_INFO.get(disease, {}),
+            'model_version': meta['version'] if model is not None else 'demo',
         }
+        if views > 1 and model is not None:
+            result['tta_views'] = views
+        if failed:
+            result['error'] = True
+        return result
+
+
+def _default_predictor():
+    from django.conf import settings
+    if settings.INFERENCE_SOCKET:
+        # The model lives in `manage.py run_inference_worker`
+        from .inference_server import RemotePredictor
+        return RemotePredictor(settings.INFERENCE_SOCKET)
+    return EyePredictor(lazy=True)
 
 
-# Singleton — loaded once at startup
-predictor = EyePredictor()
+# Singleton — loaded in the background at startup (see DetectionConfig.ready)
+predictor = _default_predictor()
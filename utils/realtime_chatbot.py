@@ -3,11 +3,15 @@ Dr. EyeBot - Premium Real-Time Chatbot Engine
 Advanced conversational AI with streaming support and human-like responses
 """
 
-from django.conf import settings
-import re
 import random
-import json
-from datetime import datetime
+
+from django.conf import settings
+
+from utils.answer_pipeline import (
+    build_pipeline, complete_chat,
+    CacheStage, KnowledgeBaseStage, LLMStage, FallbackStage,
+)
+from utils.chatbot_engine import score_keywords
 
 # ==================== ENHANCED KNOWLEDGE BASE ====================
 
@@ -139,45 +143,7 @@ PROFESSIONAL_CLOSING = {
 
 # ==================== REAL-TIME RESPONSE GENERATOR ====================
 
-def get_premium_response(message, language='en', session_history=None):
-    """
-    Generate premium, human-like real-time responses using multiple strategies:
-    1. OpenAI API for optimal quality
-    2. Keyword matching with contextual awareness
-    3. Conversation history integration
-    """
-    
-    if not message or not message.strip():
-        return "I'm here to help! Ask me anything about eye health. What's on your mind?"
-    
-    message = message.strip()
-    
-    # Try OpenAI first for best quality
-    openai_response = try_openai_streaming(message, language, session_history)
-    if openai_response:
-        return openai_response
-    
-    # Fall back to premium knowledge base response
-    return generate_premium_kb_response(message, language, session_history)
-
-
-def try_openai_streaming(message, language='en', session_history=None):
-    """
-    Try to get response from OpenAI with streaming support
-    Returns None if API unavailable
-    """
-    try:
-        import openai
-        
-        api_key = settings.OPENAI_API_KEY
-        if not api_key or api_key == '':
-            return None
-        
-        # Set API key for openai library
-        openai.api_key = api_key
-        
-        # Premium system prompt for human-like responses
-        system_prompt = """You are Dr. EyeBot, a warm, empathetic, and highly knowledgeable eye health assistant.
+PREMIUM_SYSTEM_PROMPT = """You are Dr. EyeBot, a warm, empathetic, and highly knowledgeable eye health assistant.
         
 Your personality:
 - Friendly and conversational (not robotic)
@@ -201,28 +167,91 @@ Format:
 2. Provide key information
 3. Explain what they should do
 4. Recommend professional follow-up"""
-        
-        # Build conversation context
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        if session_history:
-            messages.extend(session_history[-4:])  # Last 4 messages for context
-        
-        messages.append({"role": "user", "content": message})
-        
-        response = openai.ChatCompletion.create(
-            model="gpt-3.5-turbo",
-            messages=messages,
-            max_tokens=300,
-            temperature=0.7,
-            top_p=0.95
-        )
-        
-        return response.choices[0]['message']['content']
-        
-    except Exception as e:
-        print(f"[OpenAI API] Backup to knowledge base: {str(e)[:50]}")
+
+
+def build_premium_prompt(language='en'):
+    return PREMIUM_SYSTEM_PROMPT
+
+
+_pipeline = None
+
+
+def get_pipeline():
+    """Answer pipeline for the premium engine (built once per process)."""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = build_pipeline('realtime_chatbot', {
+            'cache': CacheStage('premium'),
+            'knowledge_base': KnowledgeBaseStage(match_disease_kb_response),
+            'llm': LLMStage(build_premium_prompt, model="gpt-3.5-turbo", max_tokens=300,
+                            temperature=0.7, history_limit=4, top_p=0.95),
+            'fallback': FallbackStage(generate_premium_kb_response),
+        })
+    return _pipeline
+
+
+def get_premium_response(message, language='en', session_history=None):
+    """
+    Generate premium, human-like real-time responses using the answer pipeline:
+    1. Cached answers for repeated questions
+    2. Disease knowledge base when the question names a condition
+    3. OpenAI API for everything else
+    4. General knowledge base fallback
+    """
+    
+    if not message or not message.strip():
+        return "I'm here to help! Ask me anything about eye health. What's on your mind?"
+    
+    message = message.strip()
+    return get_pipeline().answer(message, language, session_history)
+
+
+def try_openai_streaming(message, language='en', session_history=None):
+    """
+    Try to get response from OpenAI with streaming support
+    Returns None if API unavailable
+    """
+    if session_history:
+        session_history = session_history[-4:]  # Last 4 messages for context
+    return complete_chat(
+        PREMIUM_SYSTEM_PROMPT,
+        message,
+        session_history=session_history,
+        model="gpt-3.5-turbo",
+        max_tokens=300,
+        temperature=0.7,
+        top_p=0.95,
+    )
+
+
+DISEASE_KEYWORDS = {
+    'cataract': ['cataract', 'cloudy', 'blur', 'lens', 'cloud', 'hazy'],
+    'glaucoma': ['glaucoma', 'pressure', 'optic nerve', 'peripheral', 'silent thief'],
+    'diabetic_retinopathy': ['diabetes', 'diabetic', 'retina', 'retinopathy', 'floaters'],
+}
+
+
+def detect_disease(message, min_confidence=0.0):
+    """
+    The disease whose keywords best match the message as whole words, if
+    they cover at least min_confidence of its content words; else None.
+    """
+    disease, confidence = score_keywords(message, DISEASE_KEYWORDS)
+    if disease is None or confidence < min_confidence:
+        return None
+    return disease
+
+
+def match_disease_kb_response(message, language='en', session_history=None):
+    """
+    Knowledge base stage: answer locally only when the question is about a
+    known condition (CHATBOT_KB_MIN_CONFIDENCE, as in the simple engine).
+    "Can I wear contact lenses overnight?" mentions a lens but is not about
+    cataract, so the pipeline moves on to the LLM.
+    """
+    if detect_disease(message, settings.CHATBOT_KB_MIN_CONFIDENCE) is None:
         return None
+    return generate_premium_kb_response(message, language, session_history)
 
 
 def generate_premium_kb_response(message, language='en', session_history=None):
@@ -230,21 +259,10 @@ def generate_premium_kb_response(message, language='en', session_history=None):
     Generate high-quality responses using enhanced knowledge base
     """
     
-    message_lower = message.lower()
     lang = language
     
     # Detect disease keywords
-    disease_keywords = {
-        'cataract': ['cataract', 'cloudy', 'blur', 'lens', 'cloud', 'hazy'],
-        'glaucoma': ['glaucoma', 'pressure', 'optic nerve', 'peripheral', 'silent thief'],
-        'diabetic_retinopathy': ['diabetes', 'diabetic', 'retina', 'retinopathy', 'floaters'],
-    }
-    
-    detected_disease = None
-    for disease, keywords in disease_keywords.items():
-        if any(kw in message_lower for kw in keywords):
-            detected_disease = disease
-            break
+    detected_disease = detect_disease(message)
     
     # Build response
     response = ""
@@ -293,10 +311,16 @@ def get_session_context(session_id):
     Get conversation context for multi-turn interactions
     """
     from detection.models import ChatMessage
+    from utils.chat_buffer import get_chat_buffer
     
-    messages = ChatMessage.objects.filter(
+    messages = list(ChatMessage.objects.filter(
         session_id=session_id
-    ).order_by('timestamp')[:10]
+    ).order_by('timestamp', 'id')[:10])
+    
+    # Include turns still waiting in the write-behind buffer
+    buffer = get_chat_buffer()
+    if buffer is not None and len(messages) < 10:
+        messages.extend(buffer.pending_for(session_id)[:10 - len(messages)])
     
     context = []
     for msg in messages:
@@ -308,9 +332,16 @@ def get_session_context(session_id):
 
 def save_chat_message(session_id, message, response, language='en'):
     """
-    Save conversation to database
+    Save conversation to database.
+    Queued in the write-behind buffer when enabled, else written directly.
     """
     from detection.models import ChatMessage
+    from utils.chat_buffer import get_chat_buffer
+    
+    buffer = get_chat_buffer()
+    if buffer is not None:
+        buffer.add(session_id, message, response, language)
+        return
     
     ChatMessage.objects.create(
         session_id=session_id,
@@ -0,0 +1,133 @@
+"""
+Shadow inference — score a candidate model on live traffic without serving it.
+
+With a shadow version set (`manage.py model_registry shadow <version>`),
+MODEL_SHADOW_SAMPLE_RATE of the predictions the active model makes are
+queued, after the response is ready, for the candidate. A single background
+thread loads the candidate, runs it outside the inference executor and
+writes both outputs and latencies as ShadowPrediction rows in batches. The
+queue is bounded and drops samples when full, so a slow candidate never
+holds up a request. `manage.py shadow_report` summarizes agreement and
+latency.
+"""
+
+import queue
+import random
+import threading
+import time
+
+from django.utils import timezone
+
+
+class ShadowRunner:
+    def __init__(self, owner, version, sample_rate, queue_size=100, batch_size=20):
+        self.owner = owner            # the EyePredictor whose loader/predict we reuse
+        self.version = version
+        self.sample_rate = sample_rate
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._loaded = None
+        self._disabled = False
+        self._stopped = False
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, image_path, primary, primary_ms, digest='', views=1):
+        """Maybe queue a served prediction for the shadow model; never blocks."""
+        if self._disabled or self._stopped or random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait(
+                (image_path, primary, primary_ms, digest or '', views, timezone.now())
+            )
+        except queue.Full:
+            self.dropped += 1
+            return False
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='model-shadow', daemon=True
+                )
+                self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopped = True
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+
+    def _load(self):
+        from . import model_registry
+        try:
+            meta = model_registry.get_version(self.version)
+        except model_registry.RegistryError as e:
+            print(f"[WARNING] Shadow model disabled: {e}")
+            return None
+        loaded = self.owner._load_model(meta)
+        if loaded is None:
+            print(f"[WARNING] Shadow model {self.version} could not be loaded - shadow disabled")
+        return loaded
+
+    def _run(self):
+        from django.db import connections
+
+        if self._loaded is None:
+            self._loaded = self._load()
+            if self._loaded is None:
+                self._disabled = True
+                return
+
+        rows = []
+        while not self._stopped:
+            try:
+                # Flush what we have once the queue goes quiet
+                item = self._queue.get(timeout=None if not rows else 1.0)
+            except queue.Empty:
+                item = False
+            if item:
+                row = self._score(*item)
+                if row is not None:
+                    rows.append(row)
+            if rows and (not item or len(rows) >= self.batch_size):
+                self._write(rows)
+                rows = []
+                # This thread owns its own DB connection; don't leave it open
+                connections.close_all()
+        if rows:
+            self._write(rows)
+            connections.close_all()
+
+    def _score(self, image_path, primary, primary_ms, digest, views, created_at):
+        from detection.models import ShadowPrediction
+
+        started = time.perf_counter()
+        # Same TTA views as the primary, so the comparison is like for like
+        shadow = self.owner._predict(image_path, self._loaded, direct=True, views=views)
+        shadow_ms = (time.perf_counter() - started) * 1000
+        if shadow.get('error'):
+            return None
+        return ShadowPrediction(
+            created_at=created_at,
+            image_digest=digest,
+            primary_version=primary.get('model_version', ''),
+            shadow_version=self.version,
+            primary_disease=primary['disease'],
+            shadow_disease=shadow['disease'],
+            primary_confidence=primary['confidence'],
+            shadow_confidence=shadow['confidence'],
+            primary_probabilities=primary.get('all_probs', {}),
+            shadow_probabilities=shadow.get('all_probs', {}),
+            primary_ms=round(primary_ms, 2),
+            shadow_ms=round(shadow_ms, 2),
+            agree=primary['disease'] == shadow['disease'],
+        )
+
+    def _write(self, rows):
+        from detection.models import ShadowPrediction
+        try:
+            ShadowPrediction.objects.bulk_create(rows)
+        except Exception as e:
+            print(f"[WARNING] Could not save {len(rows)} shadow prediction(s): {str(e)[:80]}")
@@ -6,6 +6,16 @@ Run this from the utils/ directory or project root.
 Usage:
     cd eye_disease_project
     python utils/train_model.py
+    python utils/train_model.py --arch mobilenet_v3    # small triage model for cascade mode
+    python utils/train_model.py --arch mobilenet_v3 --distill    # student of the ResNet50 model
+
+Distillation (--distill) trains the small network's logits against the
+ResNet50 teacher's for the same augmented batch: alpha · T² · KL between
+the two temperature-T softmaxes, plus (1 − alpha) · cross-entropy with the
+true labels at T=1. The student thus learns which classes the teacher
+finds similar, not just the right answer. The exported student is the
+plain T=1 softmax model, saved as .h5 and .keras, which the predictor and
+model registry load like any other.
 
 Requirements:
     - Dataset in dataset/train/<class>/ and dataset/test/<class>/
@@ -13,8 +23,11 @@ Requirements:
     - 800+ images per class recommended
 """
 
+import argparse
+import json
 import os
 import sys
+import time
 import matplotlib
 matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
@@ -23,7 +36,7 @@ import matplotlib.pyplot as plt
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import tensorflow as tf
-from tensorflow.keras.applications import ResNet50
+from tensorflow.keras.applications import EfficientNetB0, MobileNetV3Small, ResNet50
 from tensorflow.keras import layers, Model
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 from tensorflow.keras.callbacks import (
@@ -33,6 +46,29 @@ from tensorflow.keras.optimizers import Adam
 import numpy as np
 
 # ── Configuration ──────────────────────────────────────────────────────────
+ARCHITECTURES = {
+    # name: (default output, Keras model_type recorded in class_info)
+    'resnet50': ('../ml_models/eye_disease_model.h5', 'ResNet50'),
+    'mobilenet_v3': ('../ml_models/triage_model.h5', 'MobileNetV3Small'),
+    'efficientnet_b0': ('../ml_models/efficientnet_model.h5', 'EfficientNetB0'),
+}
+
+parser = argparse.ArgumentParser(description='Train the eye disease classifier.')
+parser.add_argument('--arch', choices=sorted(ARCHITECTURES), default='resnet50',
+                    help='resnet50 (default), or a small network: mobilenet_v3 / efficientnet_b0.')
+parser.add_argument('--out', default=None, help='Model file to write (default depends on --arch).')
+parser.add_argument('--distill', action='store_true',
+                    help='Train a small --arch as a student of --teacher.')
+parser.add_argument('--teacher', default='../ml_models/eye_disease_model.h5',
+                    help='Trained ResNet50 model to distill from.')
+parser.add_argument('--temperature', type=float, default=4.0,
+                    help='Softens the teacher\'s predictions (default 4).')
+parser.add_argument('--alpha', type=float, default=0.7,
+                    help='Weight of the teacher\'s soft labels vs the true labels (default 0.7).')
+args = parser.parse_args()
+if args.distill and args.arch == 'resnet50':
+    parser.error('--distill trains a small student; pick --arch mobilenet_v3 or efficientnet_b0')
+
 IMG_SIZE = 224
 BATCH_SIZE = 32
 EPOCHS_FROZEN = 20       # Train only top layers first
@@ -43,8 +79,15 @@ LR_FINE_TUNE = 1e-5
 
 TRAIN_DIR = '../dataset/train'
 TEST_DIR = '../dataset/test'
-MODEL_OUT = '../ml_models/eye_disease_model.h5'
-LOG_DIR = '../logs/training'
+MODEL_OUT = args.out or (
+    f'../ml_models/student_{args.arch}.h5' if args.distill else ARCHITECTURES[args.arch][0]
+)
+MODEL_TYPE = ARCHITECTURES[args.arch][1]
+LOG_DIR = f"../logs/training/{args.arch}{'_distill' if args.distill else ''}"
+# Plots and class info sit next to the model; only the default ResNet50
+# output keeps the plain names
+OUT_PREFIX = '' if MODEL_OUT == ARCHITECTURES['resnet50'][0] else os.path.splitext(MODEL_OUT)[0] + '.'
+OUT_DIR = os.path.dirname(MODEL_OUT)
 
 os.makedirs(os.path.dirname(MODEL_OUT), exist_ok=True)
 os.makedirs(LOG_DIR, exist_ok=True)
@@ -100,83 +143,161 @@ print(f"   Classes: {train_gen.class_indices}")
 
 
 # ── Build Model ────────────────────────────────────────────────────────────
-print("\n🏗️  Building ResNet50 model...")
-
-base = ResNet50(
-    weights='imagenet',
-    include_top=False,
-    input_shape=(IMG_SIZE, IMG_SIZE, 3),
-)
-base.trainable = False  # Freeze base for phase 1
+print(f"\n🏗️  Building {MODEL_TYPE} model...")
 
 inp = tf.keras.Input(shape=(IMG_SIZE, IMG_SIZE, 3))
-x = base(inp, training=False)
-x = layers.GlobalAveragePooling2D()(x)
-x = layers.BatchNormalization()(x)
-x = layers.Dense(512, activation='relu')(x)
-x = layers.Dropout(0.5)(x)
-x = layers.Dense(256, activation='relu')(x)
-x = layers.Dropout(0.3)(x)
-x = layers.Dense(128, activation='relu')(x)
-x = layers.Dropout(0.2)(x)
-output = layers.Dense(CLASSES, activation='softmax')(x)
-
+if args.arch == 'mobilenet_v3':
+    base = MobileNetV3Small(
+        weights='imagenet',
+        include_top=False,
+        input_shape=(IMG_SIZE, IMG_SIZE, 3),
+        include_preprocessing=False,
+    )
+    base.trainable = False  # Freeze base for phase 1
+    # MobileNetV3 expects [-1, 1]; the predictor feeds [0, 1] like ResNet50
+    x = layers.Rescaling(2.0, offset=-1.0)(inp)
+    x = base(x, training=False)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+elif args.arch == 'efficientnet_b0':
+    base = EfficientNetB0(
+        weights='imagenet',
+        include_top=False,
+        input_shape=(IMG_SIZE, IMG_SIZE, 3),
+    )
+    base.trainable = False  # Freeze base for phase 1
+    # EfficientNet rescales [0, 255] itself; the predictor feeds [0, 1]
+    x = layers.Rescaling(255.0)(inp)
+    x = base(x, training=False)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.Dropout(0.2)(x)
+else:
+    base = ResNet50(
+        weights='imagenet',
+        include_top=False,
+        input_shape=(IMG_SIZE, IMG_SIZE, 3),
+    )
+    base.trainable = False  # Freeze base for phase 1
+    x = base(inp, training=False)
+    x = layers.GlobalAveragePooling2D()(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dense(512, activation='relu')(x)
+    x = layers.Dropout(0.5)(x)
+    x = layers.Dense(256, activation='relu')(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.Dense(128, activation='relu')(x)
+    x = layers.Dropout(0.2)(x)
+logits = layers.Dense(CLASSES, name='logits')(x)
+output = layers.Activation('softmax', name='probs')(logits)
+
+# The exported model; distillation fits its logits through fit_model
 model = Model(inp, output)
 model.summary()
 
+# ── Distillation ────────────────────────────────────────────────────────────
+teacher = None
+fit_model = model
+train_data, val_data, val_steps = train_gen, val_gen, None
+loss = 'categorical_crossentropy'
+fit_metrics = ['accuracy', tf.keras.metrics.AUC(name='auc')]
+if args.distill:
+    print(f"\n🎓 Distilling from teacher {args.teacher} (T={args.temperature}, alpha={args.alpha})...")
+    teacher = tf.keras.models.load_model(args.teacher, compile=False)
+    teacher.trainable = False
+
+    def distill_batches(gen):
+        """(x, [labels | teacher logits]); the teacher sees the same augmented images."""
+        while True:
+            x, y = next(gen)
+            # log of the teacher's softmax equals its logits up to a per-row constant
+            teacher_logits = np.log(np.clip(teacher.predict_on_batch(x), 1e-7, 1.0))
+            yield x, np.concatenate([y, teacher_logits], axis=1).astype(np.float32)
+
+    def distillation_loss(packed, student_logits):
+        """alpha · T² · KL(teacher_T ‖ student_T) + (1 − alpha) · CE(labels, student)."""
+        labels, teacher_logits = packed[:, :CLASSES], packed[:, CLASSES:]
+        T = args.temperature
+        teacher_log_soft = tf.nn.log_softmax(teacher_logits / T)
+        soft = tf.reduce_sum(
+            tf.exp(teacher_log_soft) * (teacher_log_soft - tf.nn.log_softmax(student_logits / T)),
+            axis=-1,
+        )
+        hard = tf.keras.losses.categorical_crossentropy(labels, student_logits, from_logits=True)
+        return args.alpha * T ** 2 * soft + (1 - args.alpha) * hard
+
+    def label_accuracy(packed, student_logits):
+        return tf.keras.metrics.categorical_accuracy(packed[:, :CLASSES], student_logits)
+
+    fit_model = Model(inp, logits)  # shares every layer with `model`
+    train_data = distill_batches(train_gen)
+    val_data, val_steps = distill_batches(val_gen), len(val_gen)
+    loss = distillation_loss
+    fit_metrics = [tf.keras.metrics.MeanMetricWrapper(label_accuracy, name='accuracy')]
+
+
+class ExportCheckpoint(ModelCheckpoint):
+    """ModelCheckpoint that saves the softmax `model` even while fitting its logits."""
+
+    def set_model(self, _fit_model):
+        super().set_model(model)
+
 # ── Phase 1: Train Top Layers ───────────────────────────────────────────────
 print("\n🚀 Phase 1: Training top layers (base frozen)...")
 
-model.compile(
+fit_model.compile(
     optimizer=Adam(learning_rate=LR_INITIAL),
-    loss='categorical_crossentropy',
-    metrics=['accuracy', tf.keras.metrics.AUC(name='auc')]
+    loss=loss,
+    metrics=fit_metrics,
 )
 
 callbacks_p1 = [
     EarlyStopping(monitor='val_accuracy', patience=7,
                   restore_best_weights=True, verbose=1),
-    ModelCheckpoint(MODEL_OUT, save_best_only=True,
+    ExportCheckpoint(MODEL_OUT, save_best_only=True,
                     monitor='val_accuracy', verbose=1),
     ReduceLROnPlateau(monitor='val_loss', factor=0.5,
                       patience=4, min_lr=1e-6, verbose=1),
     TensorBoard(log_dir=LOG_DIR + '/phase1'),
 ]
 
-history1 = model.fit(
-    train_gen,
-    validation_data=val_gen,
+history1 = fit_model.fit(
+    train_data,
+    steps_per_epoch=len(train_gen),
+    validation_data=val_data,
+    validation_steps=val_steps,
     epochs=EPOCHS_FROZEN,
     callbacks=callbacks_p1,
     verbose=1,
 )
 
 # ── Phase 2: Fine-tune ──────────────────────────────────────────────────────
-print("\n🔧 Phase 2: Fine-tuning last ResNet block...")
+print(f"\n🔧 Phase 2: Fine-tuning last {MODEL_TYPE} layers...")
 
 # Unfreeze last 30 layers
 for layer in base.layers[-30:]:
     layer.trainable = True
 
-model.compile(
+fit_model.compile(
     optimizer=Adam(learning_rate=LR_FINE_TUNE),
-    loss='categorical_crossentropy',
-    metrics=['accuracy', tf.keras.metrics.AUC(name='auc')]
+    loss=loss,
+    metrics=fit_metrics,
 )
 
 callbacks_p2 = [
     EarlyStopping(monitor='val_accuracy', patience=10,
                   restore_best_weights=True, verbose=1),
-    ModelCheckpoint(MODEL_OUT, save_best_only=True,
+    ExportCheckpoint(MODEL_OUT, save_best_only=True,
                     monitor='val_accuracy', verbose=1),
     ReduceLROnPlateau(monitor='val_loss', factor=0.3,
                       patience=5, min_lr=1e-8, verbose=1),
     TensorBoard(log_dir=LOG_DIR + '/phase2'),
 ]
 
-history2 = model.fit(
-    train_gen,
-    validation_data=val_gen,
+history2 = fit_model.fit(
+    train_data,
+    steps_per_epoch=len(train_gen),
+    validation_data=val_data,
+    validation_steps=val_steps,
     epochs=EPOCHS_FINE_TUNE,
     callbacks=callbacks_p2,
     verbose=1,
@@ -185,9 +306,35 @@ history2 = model.fit(
 
 # ── Evaluate ────────────────────────────────────────────────────────────────
 print("\n📊 Evaluating on test set...")
-loss, acc, auc = model.evaluate(test_gen, verbose=1)
+if fit_model is not model:
+    model.compile(loss='categorical_crossentropy',
+                  metrics=['accuracy', tf.keras.metrics.AUC(name='auc')])
+test_loss, acc, auc = model.evaluate(test_gen, verbose=1)
 print(f"\n✅ Test Accuracy: {acc * 100:.1f}%  |  AUC: {auc:.3f}")
 
+if teacher is not None:
+    teacher.compile(loss='categorical_crossentropy',
+                    metrics=['accuracy', tf.keras.metrics.AUC(name='auc')])
+    test_gen.reset()
+    _, teacher_acc, teacher_auc = teacher.evaluate(test_gen, verbose=0)
+
+    def cpu_ms(m, runs=20):
+        """Median single-image latency, as the predictor sees it."""
+        x = np.zeros((1, IMG_SIZE, IMG_SIZE, 3), dtype=np.float32)
+        m.predict(x, verbose=0)
+        timings = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            m.predict(x, verbose=0)
+            timings.append((time.perf_counter() - t0) * 1000)
+        return float(np.median(timings))
+
+    teacher_ms, student_ms = cpu_ms(teacher), cpu_ms(model)
+    print(f"   Teacher accuracy: {teacher_acc * 100:.1f}%  |  AUC: {teacher_auc:.3f}  "
+          f"→ Δ {(acc - teacher_acc) * 100:+.1f} pts")
+    print(f"   Latency per image: teacher {teacher_ms:.1f} ms, student {student_ms:.1f} ms "
+          f"({teacher_ms / student_ms:.1f}× faster)")
+
 # ── Confusion Matrix ────────────────────────────────────────────────────────
 from sklearn.metrics import classification_report, confusion_matrix
 import seaborn as sns
@@ -210,7 +357,7 @@ plt.title(f'Confusion Matrix — Test Accuracy: {acc * 100:.1f}%')
 plt.ylabel('True Label')
 plt.xlabel('Predicted Label')
 plt.tight_layout()
-plt.savefig('../ml_models/confusion_matrix.png', dpi=150)
+plt.savefig(os.path.join(OUT_DIR, f'{os.path.basename(OUT_PREFIX)}confusion_matrix.png'), dpi=150)
 plt.close()
 
 # Save training history plot
@@ -236,9 +383,45 @@ plt.axvline(x=len(history1.history['loss']) - 1,
 plt.title('Loss')
 plt.legend()
 plt.tight_layout()
-plt.savefig('../ml_models/training_history.png', dpi=150)
+plt.savefig(os.path.join(OUT_DIR, f'{os.path.basename(OUT_PREFIX)}training_history.png'), dpi=150)
 plt.close()
 
-print(f"\n✅ Model saved: {MODEL_OUT}")
-print("✅ Plots saved: confusion_matrix.png, training_history.png")
+# Save class order and metrics for the model registry
+class_info = {
+    'class_indices': test_gen.class_indices,
+    'class_names': class_names,
+    'num_classes': len(class_names),
+    'img_size': IMG_SIZE,
+    'test_accuracy': round(float(acc), 4),
+    'test_auc': round(float(auc), 4),
+    'model_type': MODEL_TYPE,
+}
+if teacher is not None:
+    class_info.update({
+        'distilled_from': os.path.abspath(args.teacher),
+        'temperature': args.temperature,
+        'alpha': args.alpha,
+        'teacher_test_accuracy': round(float(teacher_acc), 4),
+        'teacher_ms': round(teacher_ms, 1),
+        'student_ms': round(student_ms, 1),
+    })
+with open(f'{OUT_PREFIX}class_info.json' if OUT_PREFIX else os.path.join(OUT_DIR, 'class_info.json'), 'w') as f:
+    json.dump(class_info, f, indent=2)
+
+# EarlyStopping restored the best weights, which the checkpoint also holds
+# as .h5; export them in the native Keras format too, which the predictor
+# loads the same way
+KERAS_OUT = os.path.splitext(MODEL_OUT)[0] + '.keras'
+model.save(KERAS_OUT)
+
+print(f"\n✅ Model saved: {MODEL_OUT} (and {os.path.basename(KERAS_OUT)})")
+print(f"✅ Plots saved: {os.path.basename(OUT_PREFIX)}confusion_matrix.png, {os.path.basename(OUT_PREFIX)}training_history.png")
+print(f"✅ Class info saved: {os.path.basename(OUT_PREFIX)}class_info.json")
+if args.arch == 'resnet50' or args.distill:
+    print(f"   Register it: python manage.py model_registry register {MODEL_OUT.replace('../', '')} --activate")
+    if args.distill:
+        print("   or use it for cascade mode: python manage.py model_registry triage <version>")
+else:
+    print(f"   Use it for cascade mode: python manage.py model_registry register {MODEL_OUT.replace('../', '')}")
+    print("                            python manage.py model_registry triage <version>")
 print(f"\n🎯 Final Test Accuracy: {acc * 100:.1f}%")
@@ -0,0 +1,59 @@
+"""
+Test-time augmentation (TTA) views for the predictor.
+
+All views of an image are built in one vectorized NumPy gather: flips and
+crops are expressed as per-view row/column index maps into the source
+array, brightness as a per-view gain. The resulting (views, H, W, 3) batch
+goes through the model in a single forward pass and the class
+probabilities are averaged, so extra views cost a larger batch rather than
+extra model calls.
+"""
+
+import numpy as np
+
+# (horizontal flip, crop fraction, crop anchor, brightness gain), in the
+# order views are added; view 0 is always the plain image
+VIEW_SPECS = [
+    (False, 1.0, 'center', 1.0),
+    (True, 1.0, 'center', 1.0),
+    (False, 0.9, 'center', 1.0),
+    (False, 1.0, 'center', 1.1),
+    (True, 0.9, 'center', 1.0),
+    (False, 1.0, 'center', 0.9),
+    (False, 0.9, 'top_left', 1.0),
+    (False, 0.9, 'bottom_right', 1.0),
+]
+MAX_VIEWS = len(VIEW_SPECS)
+
+
+def _index_map(size, crop, anchor, flip):
+    """Source indices that crop `crop` of an axis and stretch it back to `size`."""
+    span = max(1, int(round(size * crop)))
+    start = {'center': (size - span) // 2, 'top_left': 0, 'bottom_right': size - span}[anchor]
+    idx = np.linspace(start, start + span - 1, size).round().astype(np.intp)
+    return idx[::-1] if flip else idx
+
+
+def make_views(arr, views):
+    """
+    Stack `views` augmented copies of `arr` (H, W, 3 float32 in [0, 1]) into
+    one (views, H, W, 3) batch.
+    """
+    views = max(1, min(int(views), MAX_VIEWS))
+    h, w = arr.shape[:2]
+    specs = VIEW_SPECS[:views]
+
+    rows = np.stack([_index_map(h, crop, anchor, False) for _, crop, anchor, _ in specs])
+    cols = np.stack([_index_map(w, crop, anchor, flip) for flip, crop, anchor, _ in specs])
+    gains = np.array([gain for *_, gain in specs], dtype=np.float32)
+
+    batch = arr[rows[:, :, None], cols[:, None, :]]          # (views, H, W, 3)
+    if np.any(gains != 1.0):
+        batch *= gains[:, None, None, None]
+        np.clip(batch, 0.0, 1.0, out=batch)
+    return batch
+
+
+def average_probs(probs):
+    """Mean class probabilities over the views of one image."""
+    return np.asarray(probs, dtype=np.float64).mean(axis=0)
@@ -2,7 +2,6 @@
 """Comprehensive verification of advanced PDF report system"""
 import os
 import django
-import json
 from datetime import datetime
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'eye_detection.settings')
@@ -66,13 +65,8 @@ else:
         print(f"    💊 Treatment: {'✓' if det.treatment else '✗'}")
         print(f"    🛡️  Prevention: {'✓' if det.prevention else '✗'}")
         
-        # Parse probabilities
-        try:
-            probs = json.loads(det.all_probabilities)
-            if probs:
-                print(f"    📊 Probabilities: {probs}")
-        except:
-            pass
+        if det.all_probabilities:
+            print(f"    📊 Probabilities: {det.all_probabilities}")
         
         print()
 